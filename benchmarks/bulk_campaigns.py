@@ -0,0 +1,134 @@
+"""
+Correctness check and timing for bulk campaign preference updates.
+
+Runs `Subscriber.bulk_update_campaigns` against a scratch collection. It
+checks these cases:
+- a mixed on/off payload combined with `active_only`, where turning a flag
+  off must not drop a subscriber from the selection before the other flags
+  are written;
+- ids that are invalid or missing;
+- counters and `campaign_mask` agreeing with the flags afterwards.
+Then it times one filtered update over `--subscribers` documents.
+
+Usage (from the repository root, with DB_URL/DB_NAME pointing at a test
+database, or STORAGE_BACKEND=sqlite):
+
+    python -m benchmarks.bulk_campaigns --subscribers 20000
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from server.collections.subscribers import CAMPAIGN_TYPES, Subscriber, selection_filter
+from server.schemas.subcribers_schema import campaign_mask
+
+ALL_OFF = {k: False for k in CAMPAIGN_TYPES}
+
+
+def insert(model: Subscriber, email: str, **flags: bool) -> ObjectId:
+    campaigns = {**ALL_OFF, **flags}
+    now = datetime.now(timezone.utc)
+    return model.collection.insert_one({
+        "email": email,
+        "email_normalized": email,
+        "campaigns": campaigns,
+        "campaign_mask": campaign_mask(campaigns),
+        "created_at": now,
+        "updated_at": now,
+    }).inserted_id
+
+
+def flags(model: Subscriber, subscriber_id: ObjectId) -> dict[str, bool]:
+    return model.collection.find_one({"_id": subscriber_id})["campaigns"]
+
+
+def check(failures: list[str], name: str, ok: bool, detail: object = "") -> None:
+    print(f"{'PASS' if ok else 'FAIL'}  {name}{f'  ({detail})' if not ok and detail != '' else ''}")
+    if not ok:
+        failures.append(name)
+
+
+def consistent(model: Subscriber) -> bool:
+    counters = model.get_counters()
+    recount = model.reconcile_counters()
+    masks = all(
+        doc.get("campaign_mask") == campaign_mask(doc.get("campaigns"))
+        for doc in model.collection.find({}, {"campaigns": 1, "campaign_mask": 1})
+    )
+    return counters == recount and masks
+
+
+def run_checks(model: Subscriber) -> list[str]:
+    failures: list[str] = []
+    only_updates = insert(model, "updates-only@example.com", updates=True)
+    inactive = insert(model, "inactive@example.com")
+    both = insert(model, "both@example.com", updates=True, marketing=True)
+    model.reconcile_counters()
+
+    filters = selection_filter(None, True, model.mask_ready())
+    result = model.bulk_update_campaigns({"updates": False, "marketing": True}, filters=filters)
+    check(failures, "active_only mixed payload keeps later flags",
+          flags(model, only_updates) == {**ALL_OFF, "marketing": True}, flags(model, only_updates))
+    check(failures, "active_only leaves inactive subscribers alone", flags(model, inactive) == ALL_OFF)
+    check(failures, "matched counts the selection", result["matched"] == 2, result)
+    check(failures, "modified counts flag changes",
+          result["campaigns"] == {"updates": 2, "marketing": 1} and result["modified"] == 3, result)
+    check(failures, "flags of the second subscriber", flags(model, both) == {**ALL_OFF, "marketing": True})
+
+    result = model.bulk_update_campaigns(
+        {"seasonal": True}, subscriber_ids=[str(inactive), "not-an-id", str(ObjectId())]
+    )
+    check(failures, "ids: only existing ids match", result["matched"] == 1 and result["modified"] == 1, result)
+
+    result = model.bulk_update_campaigns({"seasonal": True}, subscriber_ids=[str(inactive)])
+    check(failures, "repeat is a no-op", result["modified"] == 0, result)
+    check(failures, "counters and masks agree with the flags", consistent(model))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=20_000)
+    parser.add_argument("--collection", default="bench_bulk_campaigns")
+    args = parser.parse_args()
+
+    model = Subscriber(args.collection)
+    model.collection.delete_many({})
+    model.counters.delete_one({"_id": model._counter_id})
+    try:
+        failures = run_checks(model)
+
+        model.collection.delete_many({})
+        now = datetime.now(timezone.utc)
+        docs = []
+        for i in range(args.subscribers):
+            campaigns = {**ALL_OFF, "updates": i % 2 == 0, "newsletters": i % 3 == 0}
+            docs.append({
+                "email": f"user{i}@example.com",
+                "email_normalized": f"user{i}@example.com",
+                "campaigns": campaigns,
+                "campaign_mask": campaign_mask(campaigns),
+                "created_at": now,
+                "updated_at": now,
+            })
+        model.collection.insert_many(docs, ordered=False)
+        model.reconcile_counters()
+        started = time.perf_counter()
+        result = model.bulk_update_campaigns(
+            {"updates": False, "marketing": True}, filters=selection_filter(None, True, model.mask_ready())
+        )
+        elapsed = time.perf_counter() - started
+        print(f"bulk update of {result['matched']:,} matched subscribers: {elapsed * 1000:.0f} ms, {result}")
+        check(failures, "large run: counters and masks agree with the flags", consistent(model))
+    finally:
+        model.collection.delete_many({})
+        model.counters.delete_one({"_id": model._counter_id})
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Campaign dispatch throughput against the local SMTP sink.
+
+Starts `SMTPSink` in-process and pushes synthetic recipients through
+`CampaignDispatcher`, so no MongoDB or real relay is needed. Reports
+messages per second, per-batch latency and failures.
+
+`--domains` spreads recipients over that many domains (the first one gets
+half of them) and `--domain-rate` sends through the per-domain scheduler
+with that many messages per second per domain.
+
+Usage (from the repository root):
+
+    python -m benchmarks.dispatch --recipients 20000 --pool-size 8 --batch-size 100
+    python -m benchmarks.dispatch --recipients 5000 --domains 5 --domain-rate 500
+"""
+import argparse
+import asyncio
+import json
+
+from server.config.app_config import DomainBudget, SMTPConfig, ThrottleConfig
+from server.services.dispatch import CampaignDispatcher, DispatchReport
+from server.services.templates import CampaignRenderer
+from server.services.throttle import DomainScheduler
+
+from .smtp_sink import SMTPSink
+
+
+def synthetic_batches(total: int, batch_size: int, domains: int = 1):
+    def domain(i: int) -> int:
+        # Half of the recipients share the first domain, like a big mailbox provider
+        return 0 if i % 2 == 0 or domains == 1 else 1 + (i // 2) % (domains - 1)
+
+    for start in range(0, total, batch_size):
+        yield [
+            {"_id": i, "email": f"user{i}@example{domain(i)}.com"}
+            for i in range(start, min(start + batch_size, total))
+        ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=20_000)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=2526)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated relay latency per message")
+    parser.add_argument("--domains", type=int, default=1)
+    parser.add_argument("--domain-rate", type=float, default=0.0, help="Per-domain messages/s; 0 disables the scheduler")
+    parser.add_argument("--domain-in-flight", type=int, default=2)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.reject_rate, args.latency_ms)
+    server = await sink.start("127.0.0.1", args.port)
+    config = SMTPConfig(HOST="127.0.0.1", PORT=args.port, POOL_SIZE=args.pool_size, BATCH_SIZE=args.batch_size)
+
+    scheduler = None
+    if args.domain_rate:
+        scheduler = DomainScheduler(ThrottleConfig(DEFAULT=DomainBudget(
+            max_in_flight=args.domain_in_flight, rate=args.domain_rate, burst=int(args.domain_rate)
+        )))
+
+    async with server:
+        report = DispatchReport("newsletters")
+        await CampaignDispatcher(config, scheduler=scheduler).dispatch(
+            synthetic_batches(args.recipients, args.batch_size, args.domains),
+            CampaignRenderer(config.FROM_ADDRESS, "Benchmark", "<p>Hello {{ email }}</p>", "Hello {{ email }}"),
+            report,
+        )
+
+    result = report.to_dict()
+    result["failures"] = result["failures"][:5]
+    print(json.dumps(result, indent=2, default=str))
+    print(f"sink accepted {sink.stats.messages:,} messages over {sink.stats.connections} connection(s)")
+    if scheduler:
+        for domain, stats in scheduler.stats().items():
+            print(f"{domain}: sent {stats['sent']:,}, deferrals {stats['deferrals']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+HTTP startup and throughput benchmark.
+
+Measures requests per second and latency percentiles for one endpoint, either
+against a running deployment (`--url`, e.g. the Vercel URL) or against a
+server this script starts with `python -m server serve` (`--spawn`), in which
+case time-to-first-response is reported too.
+
+Usage (from the repository root):
+
+    python -m benchmarks.http_throughput --spawn --workers 4 --path /health
+    python -m benchmarks.http_throughput --url https://<deployment> --path /health
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def spawn_server(port: int, workers: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "server", "serve", "--port", str(port), "--workers", str(workers)],
+        env={**os.environ},
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float) -> float:
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"server at {base_url} not ready after {timeout}s")
+
+
+async def run_load(base_url: str, path: str, concurrency: int, duration: float, headers: dict) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers=headers, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Benchmark an existing deployment")
+    parser.add_argument("--spawn", action="store_true", help="Start `python -m server serve` locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--token", default=None, help="Bearer token for authenticated paths")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    if not args.url and not args.spawn:
+        parser.error("pass --url or --spawn")
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    process = None
+    base_url = args.url
+    try:
+        if args.spawn:
+            base_url = f"http://127.0.0.1:{args.port}"
+            process = spawn_server(args.port, args.workers)
+            startup = await wait_until_ready(base_url, timeout=60)
+            print(f"startup (spawn to first 200): {startup * 1000:.0f} ms")
+
+        result = await run_load(base_url, args.path, args.concurrency, args.duration, headers)
+        print(f"target: {base_url}{args.path}  concurrency: {args.concurrency}  duration: {args.duration:.0f}s")
+        print(f"requests: {result['requests']:,}  errors: {result['errors']:,}")
+        print(f"throughput: {result['rps']:.0f} req/s")
+        print(f"latency p50: {result['p50_ms']:.2f} ms  p99: {result['p99_ms']:.2f} ms")
+    finally:
+        if process:
+            process.send_signal(signal.SIGINT)
+            process.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Campaign template rendering throughput.
+
+Renders a personalised HTML + text campaign for synthetic recipients, first
+inline on one core, then through `RenderPool` across `--processes` cores.
+Reports rendered messages per second, in total and per core.
+
+Usage (from the repository root):
+
+    python -m benchmarks.render --recipients 50000 --processes 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from server.services.templates import CampaignRenderer, RenderPool, close_render_pools
+
+SUBJECT = "{{ app_name }} weekly digest"
+HTML = """<html><body>
+<h1>{{ app_name }} weekly digest</h1>
+<p>Hi {{ email }},</p>
+{% for item in items %}<div class="item"><h2>{{ item.title }}</h2><p>{{ item.body }}</p></div>
+{% endfor %}
+<p>You receive this because {{ campaign_type }} is enabled for {{ email }}.</p>
+</body></html>"""
+TEXT = """Hi {{ email }},
+{% for item in items %}
+* {{ item.title }}: {{ item.body }}
+{% endfor %}
+"""
+CONTEXT = {
+    "app_name": "Biddius",
+    "items": [{"title": f"Story {i}", "body": "Lorem ipsum dolor sit amet " * 8} for i in range(8)],
+}
+
+
+def recipients(total: int, batch_size: int):
+    return [
+        [{"_id": i, "email": f"user{i}@example.com"} for i in range(start, min(start + batch_size, total))]
+        for start in range(0, total, batch_size)
+    ]
+
+
+async def run_pool(renderer: CampaignRenderer, batches: list, processes: int) -> float:
+    pool = RenderPool(renderer, processes)
+    try:
+        await pool.render(batches[0][:1])  # start workers and compile before timing
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.render(batch) for batch in batches))
+        return time.perf_counter() - started
+    finally:
+        await close_render_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    renderer = CampaignRenderer("news@example.com", SUBJECT, HTML, TEXT, CONTEXT, "newsletters")
+    batches = recipients(args.recipients, args.batch_size)
+
+    started = time.perf_counter()
+    for batch in batches:
+        renderer.render_batch(batch)
+    inline = args.recipients / (time.perf_counter() - started)
+    print(f"inline (1 core):      {inline:,.0f} msg/s")
+
+    elapsed = asyncio.run(run_pool(renderer, batches, args.processes))
+    pooled = args.recipients / elapsed
+    print(f"pool ({args.processes} processes): {pooled:,.0f} msg/s  ({pooled / args.processes:,.0f} msg/s per core)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Local SMTP stand-in that accepts (and discards) everything.
+
+Advertises PIPELINING, answers replies in order, and counts accepted
+messages. `--reject-rate` makes RCPT TO fail with 550 for a fraction of
+recipients so failure reporting can be exercised.
+
+Usage:
+
+    python -m benchmarks.smtp_sink --port 2525
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 python -m server serve
+"""
+import argparse
+import asyncio
+import random
+import time
+
+
+class SinkStats:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+        self.bytes = 0
+
+
+class SMTPSink:
+    def __init__(self, reject_rate: float = 0.0, latency_ms: float = 0.0):
+        self.reject_rate = reject_rate
+        self.latency = latency_ms / 1000
+        self.stats = SinkStats()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats.connections += 1
+        writer.write(b"220 sink ESMTP ready\r\n")
+        recipients = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    writer.write(b"250-sink\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 AUTH PLAIN\r\n")
+                elif command.startswith("AUTH"):
+                    writer.write(b"235 2.7.0 Authentication successful\r\n")
+                elif command.startswith("MAIL FROM"):
+                    recipients = 0
+                    writer.write(b"250 2.1.0 OK\r\n")
+                elif command.startswith("RCPT TO"):
+                    if random.random() < self.reject_rate:
+                        self.stats.rejected += 1
+                        writer.write(b"550 5.1.1 Mailbox unavailable\r\n")
+                    else:
+                        recipients += 1
+                        writer.write(b"250 2.1.5 OK\r\n")
+                elif command == "DATA":
+                    if not recipients:
+                        writer.write(b"554 5.5.1 No valid recipients\r\n")
+                        continue
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    while True:
+                        chunk = await reader.readline()
+                        if not chunk or chunk == b".\r\n":
+                            break
+                        self.stats.bytes += len(chunk)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.stats.messages += 1
+                    writer.write(b"250 2.0.0 Queued\r\n")
+                elif command in ("RSET", "NOOP"):
+                    recipients = 0
+                    writer.write(b"250 2.0.0 OK\r\n")
+                elif command == "QUIT":
+                    writer.write(b"221 2.0.0 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"502 5.5.2 Command not recognized\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 2525) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before acknowledging each message")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.reject_rate, args.latency_ms)
+    server = await sink.start(args.host, args.port)
+    print(f"SMTP sink listening on {args.host}:{args.port}")
+    last, last_time = 0, time.perf_counter()
+    async with server:
+        while True:
+            await asyncio.sleep(1)
+            now = time.perf_counter()
+            rate = (sink.stats.messages - last) / (now - last_time)
+            last, last_time = sink.stats.messages, now
+            if rate:
+                print(f"messages: {sink.stats.messages:,}  rejected: {sink.stats.rejected:,}  "
+                      f"connections: {sink.stats.connections}  rate: {rate:,.0f}/s")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
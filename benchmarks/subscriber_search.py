@@ -0,0 +1,105 @@
+"""
+Latency benchmark for the subscriber email typeahead.
+
+Seeds a scratch subscriber collection, then times `Subscriber.search_by_email`
+with random prefixes taken from the seeded emails. The target is a p99 under
+20 ms on a million-subscriber tenant.
+
+Usage (from the repository root, with DB_URL/DB_NAME pointing at a test database):
+
+    python -m benchmarks.subscriber_search --subscribers 1000000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+from datetime import datetime, timezone
+
+from server.collections.subscribers import Subscriber, normalize_email
+from server.schemas.subcribers_schema import CampaignObj
+
+TARGET_P99_MS = 20.0
+DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "proton.me", "example.org"]
+
+
+def random_email(rng: random.Random) -> str:
+    local = "".join(rng.choices(string.ascii_lowercase + string.digits + ".", k=rng.randint(5, 14)))
+    return f"{local.strip('.') or 'x'}{rng.randint(0, 99999)}@{rng.choice(DOMAINS)}"
+
+
+def seed(model: Subscriber, total: int, batch_size: int, rng: random.Random) -> list[str]:
+    now = datetime.now(timezone.utc)
+    campaigns = CampaignObj().model_dump()
+    sample = []
+    inserted = 0
+    while inserted < total:
+        batch = []
+        for _ in range(min(batch_size, total - inserted)):
+            email = random_email(rng)
+            batch.append({
+                "email": email,
+                "email_normalized": normalize_email(email),
+                "campaigns": campaigns,
+                "created_at": now,
+                "updated_at": now,
+            })
+        model.collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+        sample.extend(doc["email"] for doc in rng.sample(batch, min(10, len(batch))))
+        print(f"\rseeded {inserted:,}/{total:,}", end="", flush=True)
+    print()
+    return sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--collection", default="bench_subscriber_search")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded collection for later runs")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    model = Subscriber(args.collection)
+
+    existing = model.collection.estimated_document_count()
+    if existing >= args.subscribers:
+        print(f"reusing {existing:,} seeded subscribers")
+        sample = [doc["email"] for doc in model.collection.aggregate([{"$sample": {"size": 1000}}])]
+    else:
+        model.collection.drop()
+        model.collection.create_index("email_normalized")
+        sample = seed(model, args.subscribers, args.batch_size, rng)
+
+    # Warm the index pages before timing
+    for email in sample[:50]:
+        model.search_by_email(email[:3], limit=args.limit)
+
+    latencies = []
+    for _ in range(args.queries):
+        email = rng.choice(sample)
+        prefix = email[:rng.randint(1, min(8, len(email)))]
+        started = time.perf_counter()
+        model.search_by_email(prefix, limit=args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"queries: {len(latencies):,}  limit: {args.limit}")
+    print(f"p50: {statistics.median(latencies):.2f} ms")
+    print(f"p95: {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms")
+    print(f"p99: {p99:.2f} ms")
+    print(f"max: {latencies[-1]:.2f} ms")
+    print(f"target p99 < {TARGET_P99_MS:.0f} ms: {'PASS' if p99 < TARGET_P99_MS else 'FAIL'}")
+
+    if not args.keep:
+        model.collection.drop()
+        model.counters.delete_one({"_id": model._counter_id})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+import time
 import traceback
 from contextlib import asynccontextmanager
 
@@ -7,15 +8,80 @@ from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config.app_config import app_config
-from .config.database import create_client
+from .config.database import create_client, close_mongo_connection
+from .routes.admin import router as admin_router
 from .routes.appClient import router as app_router
+from .routes.campaigns import router as campaign_router
+from .routes.preferences import router as preference_router
 from .routes.subscriber import router as sub_router
 from .routes.trackingAndAnalytics import router as tracking_router
+from .routes.webhooks import router as webhook_router
+from .services.dispatch import dispatch_stats, stop_dispatches
+from .services.engagement import engagement_aggregator
+from .services.overview import tenant_overview
+from .services.preferences import preference_buffer
+from .services.revocation import revocation_list
+from .services.templates import close_render_pools
+from .services.throttle import throttle_stats
+from .services.webhooks import webhook_dispatcher
+from .utils.admission import (
+    AdmissionControlMiddleware,
+    admission_stats,
+    configure_threadpool,
+    threadpool_stats
+)
+from .utils.cache import analytics_cache
+from .utils.lifecycle import on_shutdown, on_startup, run_shutdown_hooks, run_startup_hooks
+from .utils.metrics import collect_metrics, register_metrics
+from .utils.query_monitor import slow_query_monitor
 
 
 def create_app():
+    boot_started = time.perf_counter()
     create_client()
 
+    on_startup(configure_threadpool)
+    register_metrics("threadpool", threadpool_stats)
+    register_metrics("admission", admission_stats)
+    register_metrics("dispatch", dispatch_stats)
+    on_shutdown(close_render_pools)
+    on_shutdown(stop_dispatches)
+    register_metrics("throttle", throttle_stats)
+    register_metrics("analytics_cache", analytics_cache.stats)
+
+    on_startup(preference_buffer.start)
+    on_shutdown(preference_buffer.stop)
+    register_metrics("preferences", preference_buffer.stats)
+
+    on_startup(revocation_list.start)
+    on_shutdown(revocation_list.stop)
+    register_metrics("revocation", revocation_list.stats)
+
+    on_startup(engagement_aggregator.start)
+    on_shutdown(engagement_aggregator.stop)
+    register_metrics("engagement", engagement_aggregator.stats)
+
+    on_startup(webhook_dispatcher.start)
+    on_shutdown(webhook_dispatcher.stop)
+    register_metrics("webhooks", webhook_dispatcher.stats)
+
+    on_startup(tenant_overview.start)
+    on_shutdown(tenant_overview.stop)
+    register_metrics("overview", tenant_overview.stats)
+
+    on_startup(slow_query_monitor.start)
+    on_shutdown(slow_query_monitor.stop)
+    register_metrics("slow_queries", slow_query_monitor.stats)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await run_startup_hooks()
+        print(f"Startup complete in {(time.perf_counter() - boot_started) * 1000:.0f} ms")
+        yield
+        # Flush buffered writes before the database connection goes away
+        await run_shutdown_hooks()
+        close_mongo_connection()
+
     app = FastAPI(
         title=app_config.app_name,
         debug=app_config.debug,
@@ -24,9 +90,12 @@ def create_app():
         redoc_url="/redoc",
         openapi_url="/openapi.json",
         description="API for News Letter and Tracking App",
-        # lifespan=lifespan
+        lifespan=lifespan
     )
 
+    # Added before CORS so that shed responses still carry CORS headers
+    app.add_middleware(AdmissionControlMiddleware)
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=app_config.CORS_ORIGINS,
@@ -57,6 +126,10 @@ def create_app():
     async def health_check():
         return {"status": "Running ✅"}
     
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return collect_metrics()
+
     @app.get("/version", include_in_schema=False)
     async def version():
         return {"version": app_config.version}
@@ -64,7 +137,7 @@ def create_app():
     @app.get("/info", include_in_schema=True)
     async def info():
         if app_config.ENV == "development":
-            return app_config.model_dump(exclude=['JWT_SECRET_KEY'])
+            return app_config.model_dump(exclude={"JWT_SECRET_KEY": True, "ADMIN_API_KEY": True, "SMTP": {"PASSWORD"}, "CLIENT_TOKEN": {"PRIVATE_KEY"}})
         else:
             return {"app_name": app_config.app_name, "version": app_config.version}
     
@@ -72,6 +145,10 @@ def create_app():
     app.include_router(app_router)
     app.include_router(sub_router)
     app.include_router(tracking_router)
+    app.include_router(campaign_router)
+    app.include_router(preference_router)
+    app.include_router(webhook_router)
+    app.include_router(admin_router)
 
     @app.api_route("/{full_path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"], include_in_schema=False)
     async def catch_all(full_path: str, request: Request):
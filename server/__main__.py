@@ -0,0 +1,196 @@
+"""
+Command line entry point: `python -m server <command>`.
+
+    serve                  run the API with uvicorn workers (uvloop + httptools)
+    reconcile-counters     recount every tenant's subscriber counters
+    backfill-emails        populate email_normalized on older subscriber documents
+    migrate-campaign-mask  write campaign_mask from the campaigns flags
+    outbox-worker          claim and send queued campaign messages
+    backup                 dump one tenant to compressed files, in parallel
+    restore                load a tenant backup, in parallel
+    compact-tracking       fold old daily/hourly tracking documents into monthly archives
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+
+def serve(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from .config.app_config import app_config
+
+    settings = app_config.SERVER
+    workers = args.workers if args.workers is not None else settings.WORKERS
+    workers = workers or os.cpu_count() or 1
+
+    loop, http = settings.LOOP, settings.HTTP
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        print("uvloop not available, falling back to asyncio")
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+    except ImportError:
+        print("httptools not available, falling back to h11")
+        http = "h11"
+
+    print(f"Starting {workers} worker(s) on {args.host or settings.HOST}:{args.port or settings.PORT} "
+          f"(loop={loop}, http={http})")
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=args.host or settings.HOST,
+        port=args.port or settings.PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        backlog=settings.BACKLOG,
+        limit_concurrency=settings.LIMIT_CONCURRENCY,
+        limit_max_requests=settings.LIMIT_MAX_REQUESTS,
+        timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        access_log=args.access_log,
+    )
+
+
+def reconcile_counters(args: argparse.Namespace) -> None:
+    from .collections.subscribers import reconcile_all_subscriber_counters
+
+    for collection_name, counts in reconcile_all_subscriber_counters().items():
+        print(f"{collection_name}: {counts}")
+
+
+def _subscriber_collections() -> list[str]:
+    from .config.database import get_db
+
+    clients = get_db()["appClient"].find({}, {"collection_name": 1})
+    return [client["collection_name"] for client in clients if client.get("collection_name")]
+
+
+def backfill_emails(args: argparse.Namespace) -> None:
+    from .collections.subscribers import Subscriber
+
+    for collection_name in _subscriber_collections():
+        updated = Subscriber(collection_name).backfill_email_normalized()
+        print(f"{collection_name}: {updated} updated")
+
+
+def migrate_campaign_mask(args: argparse.Namespace) -> None:
+    from .collections.subscribers import Subscriber
+
+    for collection_name in _subscriber_collections():
+        updated = Subscriber(collection_name).backfill_campaign_mask()
+        print(f"{collection_name}: {updated} updated")
+
+
+def outbox_worker(args: argparse.Namespace) -> None:
+    import signal
+
+    from .config.app_config import app_config
+    from .services.outbox_worker import OutboxWorker
+
+    settings = app_config.OUTBOX.model_copy(update={
+        k: v for k, v in {"BATCH_SIZE": args.batch_size, "LEASE_SECONDS": args.lease_seconds}.items() if v
+    })
+    smtp = app_config.SMTP.model_copy(update={"POOL_SIZE": args.connections} if args.connections else {})
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        # The leased batch in flight is finished before exiting
+        await OutboxWorker(smtp, settings).run(stop)
+
+    asyncio.run(run())
+
+
+def backup(args: argparse.Namespace) -> None:
+    from .services.backup import backup_tenant, format_throughput
+
+    manifest = backup_tenant(args.app_name, args.directory, jobs=args.jobs, fmt=args.format, batch_size=args.batch_size)
+    print(f"Backed up {args.app_name} to {args.directory}")
+    print(format_throughput(manifest["throughput"]))
+
+
+def restore(args: argparse.Namespace) -> None:
+    from .services.backup import format_throughput, restore_tenant
+
+    result = restore_tenant(args.directory, jobs=args.jobs, batch_size=args.batch_size)
+    print(f"Restored {result['app_name']} from {args.directory}; subscriber counters: {result['counters']}")
+    print(format_throughput(result["throughput"]))
+
+
+def compact_tracking(args: argparse.Namespace) -> None:
+    from .collections.trackingAndAnalytics import TrackerAndAnalytics
+    from .config.app_config import app_config
+    from .config.database import get_db
+
+    retention_days = args.retention_days if args.retention_days is not None else app_config.TRACKING_COMPACTION.RETENTION_DAYS
+    names = args.app_name or [client["name"] for client in get_db()["appClient"].find({}, {"name": 1})]
+    for name in names:
+        started = time.perf_counter()
+        stats = TrackerAndAnalytics(f"{name}_tracking_and_analytics", name).compact(retention_days)
+        print(f"{name}: {stats['months']} month(s) archived from {stats['daily']} daily and "
+              f"{stats['hourly']} hourly document(s) in {time.perf_counter() - started:.2f} s")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m server", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the API server")
+    serve_parser.add_argument("--host", default=None)
+    serve_parser.add_argument("--port", type=int, default=None)
+    serve_parser.add_argument("--workers", type=int, default=None, help="0 means one per CPU")
+    serve_parser.add_argument("--access-log", action="store_true")
+    serve_parser.set_defaults(func=serve)
+
+    commands.add_parser("reconcile-counters", help="Repair subscriber counter drift").set_defaults(func=reconcile_counters)
+    commands.add_parser("backfill-emails", help="Populate email_normalized").set_defaults(func=backfill_emails)
+    commands.add_parser(
+        "migrate-campaign-mask", help="Write campaign_mask on existing subscribers"
+    ).set_defaults(func=migrate_campaign_mask)
+
+    worker_parser = commands.add_parser("outbox-worker", help="Send queued campaign messages")
+    worker_parser.add_argument("--batch-size", type=int, default=None)
+    worker_parser.add_argument("--lease-seconds", type=int, default=None)
+    worker_parser.add_argument("--connections", type=int, default=None, help="SMTP sessions per worker")
+    worker_parser.set_defaults(func=outbox_worker)
+
+    backup_parser = commands.add_parser("backup", help="Dump a tenant's app client, subscribers and tracking data")
+    backup_parser.add_argument("app_name")
+    backup_parser.add_argument("directory")
+    backup_parser.add_argument("--format", choices=("bson", "ndjson"), default="bson")
+    backup_parser.add_argument("--jobs", type=int, default=4, help="Parallel readers")
+    backup_parser.add_argument("--batch-size", type=int, default=1000)
+    backup_parser.set_defaults(func=backup)
+
+    restore_parser = commands.add_parser("restore", help="Load a tenant backup")
+    restore_parser.add_argument("directory")
+    restore_parser.add_argument("--jobs", type=int, default=4, help="Parallel writers")
+    restore_parser.add_argument("--batch-size", type=int, default=1000, help="Documents per insert_many")
+    restore_parser.set_defaults(func=restore)
+
+    compact_parser = commands.add_parser("compact-tracking", help="Archive old tracking documents by month")
+    compact_parser.add_argument("--app-name", action="append", help="Only this tenant (repeatable); all by default")
+    compact_parser.add_argument("--retention-days", type=int, default=None,
+                                help="Keep daily documents this recent (default TRACKING_COMPACTION_RETENTION_DAYS)")
+    compact_parser.set_defaults(func=compact_tracking)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,13 @@
 import jwt
 import secrets
 import hashlib
+import uuid
 
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
 from datetime import datetime, timedelta, timezone
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 from fastapi import HTTPException
 
 from ..config.database import get_db, app_config
@@ -15,6 +17,12 @@ from ..schemas.app_client_schema import (
     AppClientRead,
     AppClientUpdate
 )
+from ..services.revocation import revocation_list
+from ..utils.projection import json_value, sparse_page
+from ..utils.signing import decode_client_token, encode_client_token
+
+# Names accepted by `fields=` on the list endpoint; secrets are never among them
+SPARSE_FIELDS = ("_id", *(name for name in AppClientRead.model_fields if name != "id"))
 
 
 if TYPE_CHECKING:
@@ -27,6 +35,28 @@ class AppClient:
     def __init__(self):
         # Directly bind the collection
         self.collection = get_db()["appClient"]
+        self.counters = get_db()["counters"]
+        # Listings tolerate replica lag; auth and writes stay on `collection`
+        self.list_reads = get_db("lists")["appClient"]
+
+    def _bump_version(self) -> None:
+        self.counters.update_one({"_id": "appClient"}, {"$inc": {"version": 1}}, upsert=True)
+
+    def get_version(self, session=None) -> int:
+        """Changes once per app client write; list ETags are derived from it. Read like the lists."""
+        doc = get_db("lists")["counters"].find_one({"_id": "appClient"}, {"version": 1}, session=session)
+        return (doc or {}).get("version", 0)
+
+    def get_modified_at(self, app_client_id: str) -> Optional[datetime]:
+        """`updated_at` (or `created_at`) alone, for conditional GETs."""
+        try:
+            oid = ObjectId(app_client_id)
+        except (InvalidId, TypeError):
+            return None
+        doc = self.collection.find_one({"_id": oid}, {"updated_at": 1, "created_at": 1})
+        if doc is None:
+            return None
+        return doc.get("updated_at") or doc.get("created_at") or datetime.min
 
     def get_by_id(self, app_client_id: str) -> Optional[AppClientRead]:
         if not app_client_id:
@@ -44,13 +74,14 @@ class AppClient:
         self,
         filters: dict[str, Any] = None,
         limit: int = 50,
-        skip: int = 0
+        skip: int = 0,
+        session=None
     ) -> PaginatedResponse[AppClientRead]:
         filters = filters or {}
 
-        total = self.collection.count_documents(filters)
+        total = self.list_reads.count_documents(filters, session=session)
 
-        cursor = self.collection.find(filters).skip(skip).limit(limit)
+        cursor = self.list_reads.find(filters, session=session).skip(skip).limit(limit)
         docs = cursor.to_list(length=limit)
         items = [AppClientRead(**doc) for doc in docs if doc]
         return PaginatedResponse[AppClientRead](
@@ -61,6 +92,22 @@ class AppClient:
             items=items,
         )
 
+    def list_fields(
+        self,
+        fields: List[str],
+        filters: dict[str, Any] = None,
+        limit: int = 50,
+        skip: int = 0,
+        session=None
+    ) -> dict[str, Any]:
+        """Like `list`, but only `fields` (see SPARSE_FIELDS) are fetched and returned."""
+        filters = filters or {}
+        projection = {"_id": 1 if "_id" in fields else 0, **{name: 1 for name in fields if name != "_id"}}
+        total = self.list_reads.count_documents(filters, session=session)
+        cursor = self.list_reads.find(filters, projection, session=session).skip(skip).limit(limit)
+        items = [{name: json_value(value) for name, value in doc.items()} for doc in cursor]
+        return sparse_page(total, skip, limit, items)
+
     def exists(self, attr: dict[str, Any]) -> bool:
         return self.collection.find_one(attr) is not None
 
@@ -79,16 +126,29 @@ class AppClient:
         if "updated_at" not in update_data:
             update_data["updated_at"] = datetime.now(timezone.utc)
 
-        # Perform the update
-        result = self.collection.update_one({"_id": oid}, {"$set": update_data})
+        # Perform the update; the pre-image tells whether issued tokens went stale
+        before = self.collection.find_one_and_update(
+            {"_id": oid}, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+        )
 
-        if result.matched_count == 0:
+        if before is None:
             return {"success": False, "reason": "No document found"}
-        elif result.modified_count == 0:
+        after = {**before, **update_data}
+        if after == before:
             return {"success": True, "reason": "No changes made"}
-        else:
+        self._bump_version()
+        deactivated = before.get("is_active", True) and not after.get("is_active", True)
+        if self._client_data(after) == self._client_data(before) and not deactivated:
             return {"success": True, "reason": "Updated successfully"}
 
+        if deactivated:
+            revocation_list.revoke_client(app_client_id)
+            return {"success": True, "reason": "Updated successfully; tokens revoked"}
+        # EdDSA tokens embed the old client data; refuse every token issued so
+        # far (JWT `iat` has whole seconds) and hand out one with the new data
+        revocation_list.revoke_client(app_client_id, before=datetime.now(timezone.utc).replace(microsecond=0))
+        return {"success": True, "reason": "Updated successfully; tokens reissued", **self.issue_token(after)}
+
     def delete(self, app_client_id: str) -> dict:
         if not app_client_id:
             return {"success": False, "reason": "Missing ID"}
@@ -102,6 +162,9 @@ class AppClient:
 
         if result.deleted_count == 0:
             return {"success": False, "reason": "No document found"}
+        self._bump_version()
+        # Offline-verified tokens outlive the document; refuse them from now on
+        revocation_list.revoke_client(app_client_id)
         return {"success": True, "reason": "Delete successfully"}
 
     def create(self, document: AppClientCreate) -> dict[str, str | int | datetime]:
@@ -127,38 +190,78 @@ class AppClient:
         })
         
         result = self.collection.insert_one(doc_dict)
-        
-        # Create JWT secret by combining master secret with client salt
-        jwt_secret = hashlib.sha256(f"{app_config.JWT_SECRET_KEY}:{client_salt}".encode()).hexdigest()
-        
-        # Generate JWT token
-        payload = {
-            "api_key": api_key,
-            "client_id": str(result.inserted_id),
-            "client_name": doc_dict["name"],
-            "collection_name": doc_dict["collection_name"],
-            "exp": datetime.now(timezone.utc) + timedelta(days=365),
-            "iat": datetime.now(timezone.utc),
-            "iss": "your-api-service",
-            "sub": api_key
-        }
-        
-        access_token = jwt.encode(payload, jwt_secret, algorithm="HS256")
-        
+        doc_dict["_id"] = result.inserted_id
+        self._bump_version()
+
         return {
             "id": str(result.inserted_id),
             "name": doc_dict["name"],
             "api_key": api_key,
+            **self.issue_token(doc_dict),
+            "message": "Store the access_token securely. Use it in Authorization header as 'Bearer <token>'"
+        }
+
+    @staticmethod
+    def _client_data(client: dict) -> dict[str, str]:
+        return {
+            "id": str(client["_id"]),
+            "name": client["name"],
+            "website": client["website"],
+            "email": client["email"],
+            "collection_name": client["collection_name"]
+        }
+
+    def issue_token(self, client: dict) -> dict[str, str | int]:
+        """
+        Issue an access token for `client` (an appClient document).
+
+        With CLIENT_TOKEN_ALGORITHM=EdDSA the token embeds the client data
+        and a `jti`, and is verified offline. HS256 keeps the legacy
+        per-client-salt tokens, which need a lookup to verify.
+        """
+        settings = app_config.CLIENT_TOKEN
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(days=settings.TTL_DAYS)
+        payload = {
+            "api_key": client["API_KEY"],
+            "client_id": str(client["_id"]),
+            "client_name": client["name"],
+            "collection_name": client["collection_name"],
+            "exp": expires_at,
+            "iat": now,
+            "iss": "your-api-service",
+            "sub": client["API_KEY"]
+        }
+        if settings.ALGORITHM == "EdDSA":
+            payload.update({"jti": uuid.uuid4().hex, "client_data": self._client_data(client)})
+            access_token = encode_client_token(payload)
+        else:
+            jwt_secret = hashlib.sha256(f"{app_config.JWT_SECRET_KEY}:{client['client_salt']}".encode()).hexdigest()
+            access_token = jwt.encode(payload, jwt_secret, algorithm="HS256")
+
+        return {
             "access_token": access_token,
             "token_type": "Bearer",
-            "expires_in": 31536000,
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=365)).isoformat(),
-            "message": "Store the access_token securely. Use it in Authorization header as 'Bearer <token>'"
+            "expires_in": int((expires_at - now).total_seconds()),
+            "expires_at": expires_at.isoformat()
         }
 
+    def revoke_token(self, payload: dict) -> bool:
+        """Revoke one EdDSA token by its `jti`; legacy tokens have none."""
+        if not payload.get("jti"):
+            return False
+        revocation_list.revoke_token(payload["jti"], datetime.fromtimestamp(payload["exp"], timezone.utc))
+        return True
+
     def verify_jwt_token(self, token: str) -> dict:
-        """Verify JWT token using master secret approach"""
+        """Verify JWT token; EdDSA tokens offline, legacy HS256 tokens against the client record"""
         try:
+            if jwt.get_unverified_header(token).get("alg") == "EdDSA":
+                payload = decode_client_token(token)
+                if revocation_list.is_revoked(payload):
+                    raise HTTPException(status_code=401, detail="Token has been revoked")
+                return payload
+
             # First decode without verification to get the API key
             unverified_payload = jwt.decode(token, options={"verify_signature": False})
             api_key = unverified_payload.get("api_key")
@@ -179,13 +282,7 @@ class AppClient:
             payload = jwt.decode(token, jwt_secret, algorithms=["HS256"])
             
             # Add client info to payload
-            payload["client_data"] = {
-                "id": str(client["_id"]),
-                "name": client["name"],
-                "website": client["website"],
-                "email": client["email"],
-                "collection_name": client["collection_name"]
-            }
+            payload["client_data"] = self._client_data(client)
             
             return payload
             
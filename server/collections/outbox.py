@@ -0,0 +1,242 @@
+import random
+import threading
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from ..config.app_config import app_config
+from ..config.database import get_db
+from .subscribers import Subscriber
+
+if TYPE_CHECKING:
+    from pymongo.collection import Collection
+
+# Message states: pending -> leased -> sent, or back to pending (retry) / dead
+PENDING, LEASED, SENT, DEAD = "pending", "leased", "sent", "dead"
+# Campaign states: enqueueing -> enqueued
+ENQUEUEING, ENQUEUED = "enqueueing", "enqueued"
+DUPLICATE_KEY = 11000
+
+_indexes_ready = False
+
+
+class Outbox:
+    """
+    Mongo-backed queue of campaign messages, shared by any number of workers.
+
+    Workers claim messages with an atomic `find_one_and_update` that sets a
+    lease (owner + expiry). A lease that expires, because its worker died, is
+    claimable again. Acknowledgements are conditional on still holding the
+    lease, so a worker that lost its lease cannot overwrite the new owner's
+    state.
+
+    Enqueueing a campaign is leased the same way, on the campaign document,
+    and resumes from an `_id` watermark when its enqueuer stops renewing.
+    """
+    collection: "Collection"
+
+    def __init__(self):
+        self.collection = get_db()["outbox"]
+        self.campaigns = get_db()["outbox_campaigns"]
+        self.settings = app_config.OUTBOX
+        self.ensure_indexes()
+
+    def ensure_indexes(self) -> None:
+        global _indexes_ready
+        if _indexes_ready:
+            return
+        self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        self.collection.create_index([("campaign_id", ASCENDING), ("status", ASCENDING)])
+        # One message per subscriber, however often enqueueing is resumed
+        self.collection.create_index([("campaign_id", ASCENDING), ("subscriber_id", ASCENDING)], unique=True)
+        self.campaigns.create_index([("status", ASCENDING), ("enqueue_lease_expires_at", ASCENDING)])
+        _indexes_ready = True
+
+    def create_campaign(
+        self,
+        collection_name: str,
+        campaign_type: str,
+        content: dict[str, Any],
+        worker_id: str
+    ) -> ObjectId:
+        """Create a campaign whose enqueueing is leased to `worker_id`."""
+        now = datetime.now(timezone.utc)
+        result = self.campaigns.insert_one({
+            "collection_name": collection_name,
+            "campaign_type": campaign_type,
+            "status": ENQUEUEING,
+            "enqueued": 0,
+            "enqueue_owner": worker_id,
+            "enqueue_lease_expires_at": now + timedelta(seconds=self.settings.LEASE_SECONDS),
+            "created_at": now,
+            **content,
+        })
+        return result.inserted_id
+
+    def get_campaign(self, campaign_id: ObjectId) -> Optional[dict]:
+        return self.campaigns.find_one({"_id": campaign_id})
+
+    def claim_enqueue(self, worker_id: str) -> Optional[dict]:
+        """Take over a campaign whose enqueuer stopped renewing its lease, e.g. because it died."""
+        now = datetime.now(timezone.utc)
+        return self.campaigns.find_one_and_update(
+            {"status": ENQUEUEING, "$or": [
+                {"enqueue_lease_expires_at": {"$lte": now}},
+                # Campaigns created before enqueueing was leased
+                {"enqueue_lease_expires_at": {"$exists": False}},
+            ]},
+            {"$set": {
+                "enqueue_owner": worker_id,
+                "enqueue_lease_expires_at": now + timedelta(seconds=self.settings.LEASE_SECONDS),
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def enqueue(
+        self,
+        campaign_id: ObjectId,
+        worker_id: str,
+        batch_size: int = 1000,
+        stop: Optional[threading.Event] = None
+    ) -> int:
+        """
+        Insert one pending message per opted-in subscriber; returns how many
+        were queued by this call.
+
+        Subscribers are read in `_id` order from the campaign's
+        `enqueued_through` watermark, which is advanced (and the lease
+        renewed) after every batch. Messages that already exist are skipped,
+        so a batch repeated after a crash is not queued twice. Stops early,
+        leaving the rest to whoever claims the campaign next, when the lease
+        is lost or `stop` is set.
+        """
+        campaign = self.get_campaign(campaign_id)
+        if campaign is None or campaign["status"] != ENQUEUEING:
+            return 0
+        owned = {"_id": campaign_id, "status": ENQUEUEING, "enqueue_owner": worker_id}
+        batches = Subscriber(campaign["collection_name"]).iter_campaign_recipients(
+            campaign["campaign_type"], batch_size, campaign.get("enqueued_through")
+        )
+        total = 0
+        for batch in batches:
+            inserted = self._insert_new(campaign_id, batch)
+            total += inserted
+            now = datetime.now(timezone.utc)
+            result = self.campaigns.update_one(owned, {
+                "$set": {
+                    "enqueued_through": batch[-1]["_id"],
+                    "enqueue_lease_expires_at": now + timedelta(seconds=self.settings.LEASE_SECONDS),
+                },
+                "$inc": {"enqueued": inserted},
+            })
+            if not result.matched_count:
+                return total
+            if stop is not None and stop.is_set():
+                # Hand over at once instead of when the lease runs out
+                self.campaigns.update_one(owned, {"$set": {"enqueue_lease_expires_at": now}})
+                return total
+        self.campaigns.update_one(owned, {
+            "$set": {"status": ENQUEUED},
+            "$unset": {"enqueue_owner": "", "enqueue_lease_expires_at": ""},
+        })
+        return total
+
+    def _insert_new(self, campaign_id: ObjectId, recipients: List[dict]) -> int:
+        """Insert pending messages for `recipients`, skipping those already queued."""
+        now = datetime.now(timezone.utc)
+        docs = [{
+            "campaign_id": campaign_id,
+            "subscriber_id": recipient["_id"],
+            "email": recipient["email"],
+            "status": PENDING,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+        } for recipient in recipients]
+        try:
+            return len(self.collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            return e.details.get("nInserted", 0)
+
+    def claim(self, worker_id: str, batch_size: int, lease_seconds: Optional[int] = None) -> List[dict]:
+        """Lease up to `batch_size` due messages for `worker_id`."""
+        lease = timedelta(seconds=lease_seconds or self.settings.LEASE_SECONDS)
+        claimed = []
+        for _ in range(batch_size):
+            now = datetime.now(timezone.utc)
+            doc = self.collection.find_one_and_update(
+                {"$or": [
+                    {"status": PENDING, "available_at": {"$lte": now}},
+                    {"status": LEASED, "lease_expires_at": {"$lte": now}},
+                ]},
+                {
+                    "$set": {"status": LEASED, "lease_owner": worker_id, "lease_expires_at": now + lease},
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("available_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            claimed.append(doc)
+        return claimed
+
+    def renew(self, ids: List[ObjectId], worker_id: str, lease_seconds: Optional[int] = None) -> set[ObjectId]:
+        """Extend the leases `worker_id` still holds among `ids`; returns those ids."""
+        expires = datetime.now(timezone.utc) + timedelta(seconds=lease_seconds or self.settings.LEASE_SECONDS)
+        query = {"_id": {"$in": ids}, "status": LEASED, "lease_owner": worker_id}
+        self.collection.update_many(query, {"$set": {"lease_expires_at": expires}})
+        return {doc["_id"] for doc in self.collection.find(query, {"_id": 1})}
+
+    def ack(self, message_id: ObjectId, worker_id: str) -> bool:
+        """Mark a leased message as sent. False means the lease was lost."""
+        result = self.collection.update_one(
+            {"_id": message_id, "status": LEASED, "lease_owner": worker_id},
+            {
+                "$set": {"status": SENT, "sent_at": datetime.now(timezone.utc)},
+                "$unset": {"lease_owner": "", "lease_expires_at": ""},
+            }
+        )
+        return result.modified_count > 0
+
+    def fail(self, message: dict, worker_id: str, error: str, permanent: bool = False) -> str:
+        """Schedule a retry with exponential backoff, or dead-letter the message."""
+        attempts = message.get("attempts", 1)
+        if permanent or attempts >= self.settings.MAX_ATTEMPTS:
+            update = {"$set": {"status": DEAD, "last_error": error, "dead_at": datetime.now(timezone.utc)}}
+            state = DEAD
+        else:
+            delay = min(self.settings.RETRY_BASE_SECONDS * 2 ** (attempts - 1), self.settings.RETRY_MAX_SECONDS)
+            # Jitter spreads retries of one failed batch across workers
+            delay *= random.uniform(0.8, 1.2)
+            update = {"$set": {
+                "status": PENDING,
+                "last_error": error,
+                "available_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+            }}
+            state = PENDING
+        update["$unset"] = {"lease_owner": "", "lease_expires_at": ""}
+        self.collection.update_one(
+            {"_id": message["_id"], "status": LEASED, "lease_owner": worker_id},
+            update
+        )
+        return state
+
+    def retry_dead(self, campaign_id: ObjectId) -> int:
+        result = self.collection.update_many(
+            {"campaign_id": campaign_id, "status": DEAD},
+            {"$set": {"status": PENDING, "attempts": 0, "available_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    def stats(self, campaign_id: ObjectId) -> dict[str, int]:
+        return {
+            state: self.collection.count_documents({"campaign_id": campaign_id, "status": state})
+            for state in (PENDING, LEASED, SENT, DEAD)
+        }
@@ -1,18 +1,85 @@
 import csv
+import re
+import time
+from datetime import datetime, timezone
 from io import StringIO
 from bson import ObjectId
-from typing import TYPE_CHECKING, Any, List, Optional
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
 from uuid import uuid4
 from fastapi import HTTPException, status
 
 from ..schemas import PaginatedResponse
 from ..config.database import get_db
+from ..services.webhooks import webhook_dispatcher
+from ..utils.projection import json_value, sparse_page
 from ..schemas.subcribers_schema import (
+    ALL_CAMPAIGNS_MASK,
+    CAMPAIGN_BITS,
+    CampaignObj,
     SubscriberCreate,
     SubscriberRead,
-    SubscriberUpdate
+    SubscriberUpdate,
+    campaign_mask
 )
 
+CAMPAIGN_TYPES = tuple(CampaignObj.model_fields)
+
+# Names accepted by `fields=` on the list endpoint
+SPARSE_FIELDS = ("_id", "email", "created_at", "updated_at", "campaigns", *(f"campaigns.{k}" for k in CAMPAIGN_TYPES))
+# Lets `email` plus campaign flags be answered from the index alone
+EMAIL_MASK_INDEX = [("email", ASCENDING), ("campaign_mask", ASCENDING)]
+
+# Ids per `$in` chunk in bulk preference updates
+BULK_CHUNK_SIZE = 1000
+
+# Collections whose indexes were already ensured by this process
+_indexed_collections: set[str] = set()
+# Collections whose `campaign_mask` backfill is recorded as done; others are
+# re-checked at most every MASK_RECHECK_SECONDS
+_masked_collections: set[str] = set()
+_mask_checked_at: dict[str, float] = {}
+MASK_RECHECK_SECONDS = 60.0
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def campaign_filter(campaign_type: str, enabled: bool = True, masked: bool = True) -> dict[str, Any]:
+    """
+    Subscribers with `campaign_type` on (or off), as one predicate on
+    `campaign_mask`. With `masked=False` (see `Subscriber.mask_ready`) the
+    `campaigns` flag is queried instead.
+    """
+    if not masked:
+        return {f"campaigns.{campaign_type}": True if enabled else {"$ne": True}}
+    operator = "$bitsAllSet" if enabled else "$bitsAllClear"
+    return {"campaign_mask": {operator: CAMPAIGN_BITS[campaign_type]}}
+
+
+def active_filter(masked: bool = True) -> dict[str, Any]:
+    """Subscribers with at least one campaign on."""
+    if not masked:
+        return {"$or": [{f"campaigns.{k}": True} for k in CAMPAIGN_TYPES]}
+    return {"campaign_mask": {"$bitsAnySet": ALL_CAMPAIGNS_MASK}}
+
+
+def selection_filter(email_filter: Optional[str] = None, active_only: bool = False, masked: bool = True) -> dict[str, Any]:
+    """Query for the export-style selection: an email pattern and/or an active campaign."""
+    query = {}
+    if email_filter:
+        query["email"] = {"$regex": email_filter, "$options": "i"}
+    if active_only:
+        query.update(active_filter(masked))
+    return query
+
+
+def _mask_update(campaign_type: str, enabled: bool) -> dict[str, Any]:
+    """`$bit` update keeping `campaign_mask` in step with one flag change."""
+    bit = CAMPAIGN_BITS[campaign_type]
+    return {"campaign_mask": {"or": bit} if enabled else {"and": ALL_CAMPAIGNS_MASK ^ bit}}
+
 if TYPE_CHECKING:
     from motor.motor_asyncio import AsyncIOMotorCollection
 
@@ -23,9 +90,177 @@ class Subscriber:
     def __init__(self, collection_name: str = "subscribers"):
         # Directly bind the collection
         self.collection = get_db()[collection_name]
+        self.collection_name = collection_name
+        # Per-tenant counter documents, kept in step by every write path
+        self.counters = get_db()["counters"]
+        self.ensure_indexes()
+
+    def _reader(self, operation: str):
+        """This collection read with the read preference of `operation` ("lists", "exports", ...)."""
+        return get_db(operation)[self.collection_name]
+
+    def ensure_indexes(self) -> None:
+        if self.collection_name in _indexed_collections:
+            return
+        self.collection.create_index([("email_normalized", ASCENDING)])
+        self.collection.create_index([("campaign_mask", ASCENDING)])
+        self.collection.create_index(EMAIL_MASK_INDEX)
+        # Nothing to backfill in a collection whose documents all carry a mask
+        if self.collection.find_one({"campaign_mask": {"$exists": False}}, {"_id": 1}) is None:
+            self._record_mask_backfill()
+        _indexed_collections.add(self.collection_name)
+
+    @property
+    def _migration_id(self) -> str:
+        return f"campaign_mask:{self.collection_name}"
+
+    def _record_mask_backfill(self) -> None:
+        get_db()["migrations"].update_one(
+            {"_id": self._migration_id},
+            {"$setOnInsert": {"done_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        _masked_collections.add(self.collection_name)
+
+    def mask_ready(self) -> bool:
+        """
+        Whether reads may rely on `campaign_mask`.
+
+        Until `backfill_campaign_mask` is recorded as done, older documents
+        lack the mask (or hold one built by `$bit` from a missing mask), so
+        filters and sparse lists use the `campaigns` flags instead.
+        """
+        if self.collection_name in _masked_collections:
+            return True
+        now = time.monotonic()
+        checked_at = _mask_checked_at.get(self.collection_name)
+        if checked_at is not None and now - checked_at < MASK_RECHECK_SECONDS:
+            return False
+        _mask_checked_at[self.collection_name] = now
+        if get_db()["migrations"].find_one({"_id": self._migration_id}) is None:
+            return False
+        _masked_collections.add(self.collection_name)
+        return True
+
+    @property
+    def _counter_id(self) -> str:
+        return f"subscribers:{self.collection_name}"
+
+    @staticmethod
+    def _campaign_delta(before: Optional[dict], after: Optional[dict], sign: int = 1) -> dict[str, int]:
+        """Per-campaign opt-in change between two `campaigns` subdocuments."""
+        before = before or {}
+        after = after or {}
+        delta = {}
+        for campaign in CAMPAIGN_TYPES:
+            change = int(bool(after.get(campaign))) - int(bool(before.get(campaign)))
+            if change:
+                delta[campaign] = change * sign
+        return delta
+
+    def _bump_counters(self, total: int = 0, campaigns: Optional[dict[str, int]] = None) -> None:
+        """
+        Apply counter deltas after a write; every call also bumps the list `version`.
+
+        Deltas only apply to a document that was built by `reconcile_counters`.
+        Otherwise the collection is recounted instead, which already includes
+        this write, so a tenant with existing subscribers never starts from a
+        partial total.
+        """
+        inc = {f"campaigns.{k}": v for k, v in (campaigns or {}).items() if v}
+        if total:
+            inc["total"] = total
+        inc["version"] = 1
+        result = self.counters.update_one({"_id": self._counter_id, "reconciled_at": {"$exists": True}}, {"$inc": inc})
+        if result.matched_count:
+            return
+        self.reconcile_counters()
+        self.counters.update_one({"_id": self._counter_id}, {"$inc": {"version": 1}}, upsert=True)
+
+    def _emit(self, event_type: str, data: dict[str, Any]) -> None:
+        """Queue a webhook event for this tenant; never blocks the write."""
+        webhook_dispatcher.emit(self.collection_name, event_type, data)
+
+    def get_version(self, session=None) -> int:
+        """
+        Changes once per subscriber write; list ETags are derived from it.
+        Read like the lists themselves; pass the `read_session()` the page
+        is read with so the page is never older than the version.
+        """
+        doc = get_db("lists")["counters"].find_one({"_id": self._counter_id}, {"version": 1}, session=session)
+        return (doc or {}).get("version", 0)
+
+    def get_counters(self) -> dict[str, Any]:
+        """Read the maintained counters, building them on first use."""
+        doc = self.counters.find_one({"_id": self._counter_id})
+        if doc is None or "reconciled_at" not in doc:
+            return self.reconcile_counters()
+        campaigns = doc.get("campaigns", {})
+        return {
+            "total": doc.get("total", 0),
+            "campaigns": {k: campaigns.get(k, 0) for k in CAMPAIGN_TYPES},
+        }
+
+    def reconcile_counters(self) -> dict[str, Any]:
+        """
+        Recount the collection and overwrite the counter document.
+
+        Repairs drift left by interrupted writes; this is the only path that
+        scans the collection. `reconciled_at` marks the document as a full
+        count that deltas may be applied to.
+        """
+        counts = {
+            "total": self.collection.count_documents({}),
+            "campaigns": {
+                k: self.collection.count_documents({f"campaigns.{k}": True})
+                for k in CAMPAIGN_TYPES
+            },
+        }
+        self.counters.update_one(
+            {"_id": self._counter_id},
+            {"$set": {**counts, "reconciled_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        return counts
+
+    def count(self, filters: dict[str, Any] = None, operation: str = "primary", session=None) -> int:
+        """
+        Count subscribers matching `filters`.
+
+        No filter and single-campaign filters (`campaign_filter` or a
+        `campaigns.<type>` flag) are answered from the counter document;
+        anything else falls back to `count_documents`, read as `operation`.
+        """
+        if not filters:
+            return self.get_counters()["total"]
+        if len(filters) == 1:
+            (key, value), = filters.items()
+            campaign, enabled = None, None
+            if key.startswith("campaigns.") and isinstance(value, bool):
+                campaign, enabled = key.partition("campaigns.")[2], value
+            elif key.startswith("campaigns.") and value == {"$ne": True}:
+                campaign, enabled = key.partition("campaigns.")[2], False
+            elif key == "campaign_mask" and isinstance(value, dict) and len(value) == 1:
+                (operator, bits), = value.items()
+                campaign = next((k for k, bit in CAMPAIGN_BITS.items() if bit == bits), None)
+                enabled = {"$bitsAllSet": True, "$bitsAllClear": False}.get(operator)
+            if campaign in CAMPAIGN_TYPES and enabled is not None:
+                counters = self.get_counters()
+                opted_in = counters["campaigns"][campaign]
+                return opted_in if enabled else counters["total"] - opted_in
+        return self._reader(operation).count_documents(filters, session=session)
 
     def sub_count(self) -> int:
-        return self.collection.count_documents({})
+        return self.count()
+
+    def get_modified_at(self, subscriber_id: str) -> Optional[datetime]:
+        """`updated_at` alone, for conditional GETs; None when there is no such subscriber."""
+        if not ObjectId.is_valid(subscriber_id):
+            return None
+        doc = self.collection.find_one({"_id": ObjectId(subscriber_id)}, {"updated_at": 1, "created_at": 1})
+        if doc is None:
+            return None
+        return doc.get("updated_at") or doc.get("created_at") or datetime.min
 
     def get_by_id(self, subscriber_id: str) -> Optional[SubscriberRead]:
         if not ObjectId.is_valid(subscriber_id):
@@ -41,13 +276,15 @@ class Subscriber:
         self,
         filters: dict[str, Any] = None,
         limit: int = 50,
-        skip: int = 0
+        skip: int = 0,
+        operation: str = "lists",
+        session=None
     ) -> PaginatedResponse[SubscriberRead]:
         filters = filters or {}
 
-        total = self.collection.count_documents(filters)
+        total = self.count(filters, operation, session)
 
-        cursor = self.collection.find(filters).skip(skip).limit(limit)
+        cursor = self._reader(operation).find(filters, session=session).skip(skip).limit(limit)
         docs = cursor.to_list(length=limit)
 
         return PaginatedResponse[SubscriberRead](
@@ -58,11 +295,153 @@ class Subscriber:
             items=[SubscriberRead(**doc) for doc in docs],
         )
 
+    def list_fields(
+        self,
+        fields: List[str],
+        filters: dict[str, Any] = None,
+        limit: int = 50,
+        skip: int = 0,
+        session=None
+    ) -> dict[str, Any]:
+        """
+        Like `list`, but only `fields` (see SPARSE_FIELDS) are fetched and
+        returned, as plain JSON-ready dicts; `_id` only when asked for.
+
+        Campaign flags are decoded from `campaign_mask`, so without a filter
+        `email` plus any flags is a covered query on EMAIL_MASK_INDEX. Until
+        the mask backfill is done (`mask_ready`) they are read from the
+        `campaigns` flags instead.
+        """
+        filters = filters or {}
+        flags = list(CAMPAIGN_TYPES) if "campaigns" in fields else [
+            name.partition(".")[2] for name in fields if name.startswith("campaigns.")
+        ]
+        masked = self.mask_ready()
+        projection = {"_id": 1 if "_id" in fields else 0}
+        projection.update({name: 1 for name in fields if name in ("email", "created_at", "updated_at")})
+        if flags:
+            projection["campaign_mask" if masked else "campaigns"] = 1
+
+        total = self.count(filters, "lists", session)
+        cursor = self._reader("lists").find(filters, projection, session=session).skip(skip).limit(limit)
+        if not filters and not projection["_id"] and set(projection) <= {"_id", "email", "campaign_mask"}:
+            cursor = cursor.hint(EMAIL_MASK_INDEX)
+
+        items = []
+        for doc in cursor:
+            item = {
+                name: json_value(doc[name]) for name in projection
+                if name not in ("campaign_mask", "campaigns") and name in doc
+            }
+            if flags and masked:
+                mask = doc.get("campaign_mask", 0)
+                item["campaigns"] = {name: bool(mask & CAMPAIGN_BITS[name]) for name in flags}
+            elif flags:
+                campaigns = doc.get("campaigns") or {}
+                item["campaigns"] = {name: bool(campaigns.get(name)) for name in flags}
+            items.append(item)
+        return sparse_page(total, skip, limit, items)
+
     def exists(self, attr: dict[str, Any]) -> bool:
         return self.collection.find_one(attr) is not None
 
+    def search_by_email(self, query: str, limit: int = 10) -> List[dict[str, str]]:
+        """
+        Typeahead lookup: subscribers whose normalized email starts with `query`.
+
+        An anchored, case-sensitive regex on `email_normalized` becomes a
+        bounded scan of its index, so cost depends on `limit`, not on the
+        collection size.
+        """
+        prefix = normalize_email(query)
+        if not prefix:
+            return []
+        cursor = self._reader("lists").find(
+            {"email_normalized": {"$regex": f"^{re.escape(prefix)}"}},
+            {"email": 1}
+        ).sort("email_normalized", ASCENDING).limit(limit)
+        return [{"id": str(doc["_id"]), "email": doc["email"]} for doc in cursor]
+
+    def iter_campaign_recipients(
+        self,
+        campaign_type: str,
+        batch_size: int = 500,
+        after_id: Optional[ObjectId] = None
+    ) -> Iterator[List[dict]]:
+        """
+        Stream `{_id, email}` documents opted in to `campaign_type`, in batches.
+        With `after_id`, documents are streamed in `_id` order starting after
+        it, so an interrupted pass can resume from the last `_id` it handled.
+        """
+        query = campaign_filter(campaign_type, masked=self.mask_ready())
+        cursor = self.collection.find(
+            {**query, "_id": {"$gt": after_id}} if after_id is not None else query,
+            {"email": 1}
+        ).sort("_id", ASCENDING).batch_size(batch_size)
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def backfill_email_normalized(self, batch_size: int = 1000) -> int:
+        """Populate `email_normalized` on documents written before it existed."""
+        updated = 0
+        batch = []
+        for doc in self.collection.find({"email_normalized": {"$exists": False}}, {"email": 1}):
+            batch.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"email_normalized": normalize_email(doc.get("email", ""))}}
+            ))
+            if len(batch) >= batch_size:
+                updated += self.collection.bulk_write(batch, ordered=False).modified_count
+                batch = []
+        if batch:
+            updated += self.collection.bulk_write(batch, ordered=False).modified_count
+        return updated
+
+    def backfill_campaign_mask(self, batch_size: int = 1000) -> int:
+        """
+        Migration: write `campaign_mask` from the `campaigns` flags wherever
+        it is missing or disagrees with them, then record it as done so reads
+        switch to the mask (`mask_ready`). Safe to re-run.
+
+        Each write only applies if the flags are unchanged since they were
+        read; the pass repeats until no write was skipped that way.
+        """
+        updated = 0
+        while True:
+            skipped = 0
+            batch = []
+            for doc in self.collection.find({}, {"campaigns": 1, "campaign_mask": 1}):
+                mask = campaign_mask(doc.get("campaigns"))
+                if doc.get("campaign_mask") == mask:
+                    continue
+                batch.append(UpdateOne(
+                    {"_id": doc["_id"], "campaigns": doc.get("campaigns")},
+                    {"$set": {"campaign_mask": mask}}
+                ))
+                if len(batch) >= batch_size:
+                    result = self.collection.bulk_write(batch, ordered=False)
+                    updated += result.modified_count
+                    skipped += len(batch) - result.matched_count
+                    batch = []
+            if batch:
+                result = self.collection.bulk_write(batch, ordered=False)
+                updated += result.modified_count
+                skipped += len(batch) - result.matched_count
+            if not skipped:
+                break
+        self._record_mask_backfill()
+        return updated
+
     def create(self, document: SubscriberCreate) -> SubscriberRead:
         doc_dict = document.model_dump()
+        doc_dict["email_normalized"] = normalize_email(doc_dict["email"])
+        doc_dict["campaign_mask"] = document.campaigns.to_mask()
         exists = self.exists({"email": doc_dict["email"]})
         if exists:
             raise HTTPException(
@@ -71,6 +450,12 @@ class Subscriber:
             )
         result = self.collection.insert_one(doc_dict)
         if result:
+            self._bump_counters(1, self._campaign_delta(None, doc_dict.get("campaigns")))
+            self._emit("subscriber.created", {
+                "id": result.inserted_id,
+                "email": doc_dict["email"],
+                "campaigns": doc_dict["campaigns"],
+            })
             return SubscriberRead(id=str(result.inserted_id), **doc_dict)
         raise HTTPException(
             detail="Failed to create subscriber.",
@@ -80,17 +465,222 @@ class Subscriber:
     def update(self, subscriber_id: str, updates: SubscriberUpdate) -> bool:
         if not ObjectId.is_valid(subscriber_id):
             return False
+        update_data = updates.model_dump(exclude_unset=True)
+        # A caller-supplied `updated_at` is a timestamp, not a change
+        changes = {k: v for k, v in update_data.items() if k != "updated_at"}
+        if not changes:
+            return False
+        # `exclude_unset` drops the default `updated_at`, which validators rely on
+        update_data.setdefault("updated_at", datetime.now(timezone.utc))
+        if update_data.get("email"):
+            update_data["email_normalized"] = normalize_email(update_data["email"])
+        if "campaigns" in update_data:
+            update_data["campaign_mask"] = campaign_mask(update_data["campaigns"])
+        # The pre-image tells us exactly which campaign flags flipped. Only a
+        # document that differs in a requested field matches, so a no-op update
+        # returns False and leaves `updated_at` alone.
+        before = self.collection.find_one_and_update(
+            {"_id": ObjectId(subscriber_id), "$or": [{k: {"$ne": v}} for k, v in changes.items()]},
+            {"$set": update_data},
+            projection={"campaigns": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return False
+        delta = self._campaign_delta(before.get("campaigns"), update_data["campaigns"]) if "campaigns" in update_data else None
+        self._bump_counters(campaigns=delta)
+        self._emit("subscriber.updated", {
+            "id": subscriber_id,
+            **{k: update_data[k] for k in ("email", "campaigns", "updated_at") if k in update_data},
+        })
+        return True
+
+    def set_campaign_preference(self, subscriber_id: str, campaign_type: str, enabled: bool) -> bool:
+        """
+        Flip one campaign flag (or all of them with `campaign_type="*"`).
+
+        A single targeted write; the flag condition in the filter makes the
+        modified count equal to the counter delta. Returns whether anything
+        changed.
+        """
+        if not ObjectId.is_valid(subscriber_id):
+            return False
+        now = datetime.now(timezone.utc)
+        if campaign_type == "*":
+            before = self.collection.find_one_and_update(
+                {"_id": ObjectId(subscriber_id)},
+                {"$set": {
+                    **{f"campaigns.{k}": enabled for k in CAMPAIGN_TYPES},
+                    "campaign_mask": ALL_CAMPAIGNS_MASK if enabled else 0,
+                    "updated_at": now,
+                }},
+                projection={"campaigns": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if before is None:
+                return False
+            after = {k: enabled for k in CAMPAIGN_TYPES}
+            delta = self._campaign_delta(before.get("campaigns"), after)
+            self._bump_counters(campaigns=delta)
+            if delta:
+                self._emit("subscriber.updated", {"id": subscriber_id, "campaigns": after, "updated_at": now})
+            return bool(delta)
+
         result = self.collection.update_one(
-            {"_id": ObjectId(subscriber_id)},
-            {"$set": updates.model_dump(exclude_unset=True)}
+            {"_id": ObjectId(subscriber_id), f"campaigns.{campaign_type}": {"$ne": enabled}},
+            {
+                "$set": {f"campaigns.{campaign_type}": enabled, "updated_at": now},
+                "$bit": _mask_update(campaign_type, enabled),
+            }
         )
+        if result.modified_count:
+            self._bump_counters(campaigns={campaign_type: 1 if enabled else -1})
+            self._emit("subscriber.updated", {
+                "id": subscriber_id,
+                "campaigns": {campaign_type: enabled},
+                "updated_at": now,
+            })
         return result.modified_count > 0
 
+    def set_campaign_preference_bulk(self, subscriber_ids: List[str], campaign_type: str, enabled: bool) -> int:
+        """
+        Apply one flag change to many subscribers in a single unordered bulk_write.
+
+        The ids whose flag differs are looked up first, so only those are
+        written and only those get a `subscriber.updated` event.
+        """
+        now = datetime.now(timezone.utc)
+        oids = list(dict.fromkeys(ObjectId(i) for i in subscriber_ids if ObjectId.is_valid(i)))
+        changing = [
+            doc["_id"]
+            for start in range(0, len(oids), BULK_CHUNK_SIZE)
+            for doc in self.collection.find(
+                {"_id": {"$in": oids[start:start + BULK_CHUNK_SIZE]}, f"campaigns.{campaign_type}": {"$ne": enabled}},
+                {"_id": 1}
+            )
+        ]
+        if not changing:
+            return 0
+        operations = [
+            UpdateOne(
+                # The flag condition stays, so the modified count is exact under concurrent writes
+                {"_id": subscriber_id, f"campaigns.{campaign_type}": {"$ne": enabled}},
+                {
+                    "$set": {f"campaigns.{campaign_type}": enabled, "updated_at": now},
+                    "$bit": _mask_update(campaign_type, enabled),
+                }
+            )
+            for subscriber_id in changing
+        ]
+        modified = self.collection.bulk_write(operations, ordered=False).modified_count
+        if modified:
+            self._bump_counters(campaigns={campaign_type: modified if enabled else -modified})
+            for subscriber_id in changing:
+                self._emit("subscriber.updated", {
+                    "id": str(subscriber_id),
+                    "campaigns": {campaign_type: enabled},
+                    "updated_at": now,
+                })
+        return modified
+
+    def _bulk_id_chunks(
+        self,
+        subscriber_ids: Optional[List[str]],
+        filters: Optional[dict[str, Any]]
+    ) -> Iterator[List[ObjectId]]:
+        """
+        Existing subscriber ids of a bulk selection, BULK_CHUNK_SIZE at a time.
+
+        A chunk is resolved only after the previous one was written. With
+        `filters` the chunks are `_id` ranges, so writes to earlier chunks
+        cannot move documents into or out of later ones.
+        """
+        if subscriber_ids is not None:
+            oids = list(dict.fromkeys(ObjectId(i) for i in subscriber_ids if ObjectId.is_valid(i)))
+            for start in range(0, len(oids), BULK_CHUNK_SIZE):
+                chunk = oids[start:start + BULK_CHUNK_SIZE]
+                yield [doc["_id"] for doc in self.collection.find({"_id": {"$in": chunk}}, {"_id": 1})]
+            return
+        filters = filters or {}
+        after = None
+        while True:
+            query = {**filters, "_id": {"$gt": after}} if after is not None else filters
+            ids = [
+                doc["_id"] for doc in
+                self.collection.find(query, {"_id": 1}).sort("_id", ASCENDING).limit(BULK_CHUNK_SIZE)
+            ]
+            if not ids:
+                return
+            yield ids
+            after = ids[-1]
+
+    def bulk_update_campaigns(
+        self,
+        campaigns: dict[str, bool],
+        subscriber_ids: Optional[List[str]] = None,
+        filters: Optional[dict[str, Any]] = None
+    ) -> dict[str, Any]:
+        """
+        Set campaign flags on every subscriber in `subscriber_ids` or
+        matching `filters`.
+
+        The selection is resolved to ids once per chunk (`_bulk_id_chunks`)
+        before anything is written, so a filter such as `active_only` is not
+        re-evaluated between flags. Each chunk then gets one `update_many`
+        setting every flag, with a combined `$bit` for `campaign_mask`. Counter
+        deltas are counted per flag on the same ids just before the write.
+        `modified` counts flag changes; a subscriber changed in two flags
+        counts twice.
+        """
+        now = datetime.now(timezone.utc)
+        cleared = sum(CAMPAIGN_BITS[k] for k, enabled in campaigns.items() if not enabled)
+        added = sum(CAMPAIGN_BITS[k] for k, enabled in campaigns.items() if enabled)
+        bit = {}
+        if cleared:
+            bit["and"] = ALL_CAMPAIGNS_MASK ^ cleared
+        if added:
+            bit["or"] = added
+
+        matched = 0
+        delta = {campaign_type: 0 for campaign_type in campaigns}
+        for ids in self._bulk_id_chunks(subscriber_ids, filters):
+            if not ids:
+                continue
+            matched += len(ids)
+            selection = {"_id": {"$in": ids}}
+            for campaign_type, enabled in campaigns.items():
+                changing = self.collection.count_documents({**selection, f"campaigns.{campaign_type}": {"$ne": enabled}})
+                delta[campaign_type] += changing if enabled else -changing
+            self.collection.update_many(
+                {**selection, "$or": [{f"campaigns.{k}": {"$ne": enabled}} for k, enabled in campaigns.items()]},
+                {
+                    "$set": {**{f"campaigns.{k}": enabled for k, enabled in campaigns.items()}, "updated_at": now},
+                    "$bit": {"campaign_mask": bit},
+                }
+            )
+
+        modified = {campaign_type: abs(change) for campaign_type, change in delta.items()}
+        result = {"matched": matched, "modified": sum(modified.values()), "campaigns": modified}
+        if any(modified.values()):
+            self._bump_counters(campaigns=delta)
+            # One event for the whole cohort rather than one per subscriber. It
+            # carries counts and the criteria, never the id list (up to 50,000)
+            selection = {"requested_ids": len(subscriber_ids)} if subscriber_ids is not None else {"filter": filters or {}}
+            self._emit("subscribers.bulk_updated", {**result, "set": campaigns, "updated_at": now, "selection": selection})
+        return result
+
     def delete(self, subscriber_id: str) -> bool:
         if not ObjectId.is_valid(subscriber_id):
             return False
-        result = self.collection.delete_one({"_id": ObjectId(subscriber_id)})
-        return result.deleted_count > 0
+        deleted = self.collection.find_one_and_delete(
+            {"_id": ObjectId(subscriber_id)},
+            projection={"campaigns": 1, "email": 1}
+        )
+        if deleted is None:
+            return False
+        self._bump_counters(-1, self._campaign_delta(None, deleted.get("campaigns"), sign=-1))
+        self._emit("subscriber.deleted", {"id": subscriber_id, "email": deleted.get("email")})
+        return True
 
     def _create_csv_content(self, items: List[SubscriberRead]) -> str:
         """
@@ -132,3 +722,13 @@ class Subscriber:
         output.close()
         
         return csv_content
+
+
+def reconcile_all_subscriber_counters() -> dict[str, dict[str, Any]]:
+    """Reconciliation job: recount every tenant's subscriber collection."""
+    results = {}
+    for client in get_db()["appClient"].find({}, {"collection_name": 1}):
+        collection_name = client.get("collection_name")
+        if collection_name:
+            results[collection_name] = Subscriber(collection_name).reconcile_counters()
+    return results
@@ -1,13 +1,20 @@
+import calendar
 import csv
-from datetime import datetime
+import heapq
+from datetime import date, datetime, time, timedelta, timezone
 from io import StringIO
+from itertools import groupby
 from bson import ObjectId
+from pymongo import ReturnDocument
 from typing import TYPE_CHECKING, Any, List, Optional
 from uuid import uuid4
+from zoneinfo import ZoneInfo
+import numpy as np
 from fastapi import HTTPException, status
 
 # from ..schemas import PaginatedResponse
 from ..config.database import get_db
+from ..utils.cache import analytics_cache
 
 if TYPE_CHECKING:
     from pymongo.collection import Collection
@@ -19,48 +26,125 @@ class TrackerAndAnalytics:
     def __init__(self, collection_name: str = "tracking_and_analytics", name: str = "default"):
         # Directly bind the collection
         self.collection = get_db()[collection_name]
+        # Range and report reads tolerate replica lag; counter writes and today's counts use `collection`
+        self.analytics = get_db("analytics")[collection_name]
         self.name = name
 
+    def _day_key(self, moment: datetime) -> str:
+        return f'{self.name}_{moment.strftime("%Y-%m-%d")}'
+
+    def _hour_key(self, moment: datetime) -> str:
+        """
+        Hourly buckets live next to the daily documents under a `_h_` prefix.
+        The prefix sorts after every digit, so daily `_id` range scans never
+        pick them up.
+        """
+        return f'{self.name}_h_{moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H")}'
+
+    def _month_key(self, month: date) -> str:
+        """Monthly archives use an `_m_` prefix, which daily and hourly range scans never reach."""
+        return f'{self.name}_m_{month.strftime("%Y-%m")}'
+
+    def _archives(self, start: date, end: date, fields: tuple[str, ...]):
+        """Monthly archive documents overlapping `start`..`end`, with only `fields`."""
+        return self.analytics.find(
+            {"_id": {"$gte": self._month_key(start), "$lte": self._month_key(end)}},
+            {field: 1 for field in fields}
+        )
+
+    def _daily_counts(self, start: date, end: date) -> dict[str, tuple[int, int]]:
+        """
+        (unique, non-unique) per UTC day in `start`..`end`, for days that have
+        data, from monthly archives and live daily documents. A live document
+        wins over an archived value for the same day, so reads stay correct
+        while a compaction is half done.
+        """
+        days = {}
+        for doc in self._archives(start, end, ("count", "nonunique_count")):
+            first = date.fromisoformat(doc["_id"].rsplit("_", 1)[-1] + "-01")
+            for offset, (count, nonunique) in enumerate(zip(doc.get("count", []), doc.get("nonunique_count", []))):
+                day = first + timedelta(days=offset)
+                if (count is not None or nonunique is not None) and start <= day <= end:
+                    days[str(day)] = (count or 0, nonunique or 0)
+        cursor = self.analytics.find(
+            {"_id": {"$gte": self._day_key(start), "$lte": self._day_key(end)}},
+            {"count": 1, "nonunique_count": 1}
+        )
+        for doc in cursor:
+            days[doc["_id"].split("_")[-1]] = (doc.get("count", 0), doc.get("nonunique_count", 0))
+        return days
+
+    def _hourly_counts(self, utc_start: datetime, utc_end: datetime) -> dict[datetime, tuple[int, int]]:
+        """(unique, non-unique) per UTC hour in [`utc_start`, `utc_end`), archived and live."""
+        hours = {}
+        last_hour = utc_end - timedelta(hours=1)
+        for doc in self._archives(utc_start.date(), last_hour.date(), ("hourly_count", "hourly_nonunique_count")):
+            month = date.fromisoformat(doc["_id"].rsplit("_", 1)[-1] + "-01")
+            first = datetime.combine(month, time.min, timezone.utc)
+            pairs = zip(doc.get("hourly_count", []), doc.get("hourly_nonunique_count", []))
+            for offset, (count, nonunique) in enumerate(pairs):
+                hour = first + timedelta(hours=offset)
+                if (count is not None or nonunique is not None) and utc_start <= hour < utc_end:
+                    hours[hour] = (count or 0, nonunique or 0)
+        cursor = self.analytics.find({
+            "_id": {"$gte": self._hour_key(utc_start), "$lt": self._hour_key(utc_end)}
+        })
+        for doc in cursor:
+            hour = datetime.strptime(doc["_id"].split("_h_")[-1], "%Y-%m-%dT%H").replace(tzinfo=timezone.utc)
+            hours[hour] = (doc.get("count", 0), doc.get("nonunique_count", 0))
+        return hours
+
+    def _increment(self, field: str) -> dict[str, Any]:
+        """Bump `field` in today's daily bucket and the current hourly bucket (UTC)."""
+        now = datetime.now(timezone.utc)
+        self.collection.update_one({"_id": self._hour_key(now)}, {"$inc": {field: 1}}, upsert=True)
+        return self.collection.find_one_and_update(
+            {"_id": self._day_key(now)},
+            {"$inc": {field: 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
     def increase_visitor_count(self) -> dict[str, int]:
         """Increase the visitor count by 1."""
-        key = f'{self.name}_{datetime.now().strftime("%Y-%m-%d")}'
-        exist = self.collection.find_one({"_id": key})
-        if exist:
-            self.collection.update_one({"_id": key}, {"$inc": {"count": 1}})
-            return {"count": exist["count"] + 1}
-        else:
-            self.collection.insert_one({"_id": key, "count": 1})
-            return {"count": 1}
+        doc = self._increment("count")
+        return {"count": doc["count"]}
 
     def increase_non_unique_visitor_count(self) -> dict[str, int]:
         """Increase the visitor count by 1."""
-        key = f'{self.name}_{datetime.now().strftime("%Y-%m-%d")}'
-        exist = self.collection.find_one({"_id": key})
-        if exist:
-            self.collection.update_one({"_id": key}, {"$inc": {"nonunique_count": 1}})
-            return {"nonunique_count": exist["nonunique_count"] + 1}
-        else:
-            self.collection.insert_one({"_id": key, "nonunique_count": 1})
-            return {"nonunique_count": 1}
+        doc = self._increment("nonunique_count")
+        return {"nonunique_count": doc["nonunique_count"]}
+
+    def _cached(self, key: tuple, loader) -> Any:
+        """Serve `loader()` through the shared analytics cache, scoped to this tenant."""
+        return analytics_cache.get((self.collection.name, self.name, *key), loader)
+
+    def get_today_counts(self) -> dict[str, int]:
+        """Unique and non-unique visitors for today (UTC) from a single read."""
+        key = self._day_key(datetime.now(timezone.utc))
+
+        def load() -> dict[str, int]:
+            doc = self.collection.find_one({"_id": key}, {"count": 1, "nonunique_count": 1}) or {}
+            return {"count": doc.get("count", 0), "nonunique_count": doc.get("nonunique_count", 0)}
+
+        return self._cached(("day", key), load)
 
     def get_visitor_count(self) -> int:
         """Get the total visitor count."""
-        key = f'{self.name}_{datetime.now().strftime("%Y-%m-%d")}'
-        doc = self.collection.find_one({"_id": key})
-        return doc["count"] if doc else 0
+        return self.get_today_counts()["count"]
 
     def get_visitor_count_range(self, start_date: datetime, end_date: datetime) -> dict[str, int]:
         """Get the total visitor count within a date range."""
         start_key = f'{self.name}_{start_date.strftime("%Y-%m-%d")}'
         end_key = f'{self.name}_{end_date.strftime("%Y-%m-%d")}'
-        
-        cursor = self.collection.find({"_id": {"$gte": start_key, "$lte": end_key}})
-        unique = {}
-        non_unique = {}
-        for doc in cursor:
-            date = doc["_id"].split("_")[-1]
-            unique[date] = doc.get("count", 0)
-            non_unique[date] = doc.get("nonunique_count", 0)
+        return self._cached(("range", start_key, end_key), lambda: self._load_count_range(start_key, end_key))
+
+    def _load_count_range(self, start_key: str, end_key: str) -> dict[str, Any]:
+        days = self._daily_counts(
+            date.fromisoformat(start_key.split("_")[-1]), date.fromisoformat(end_key.split("_")[-1])
+        )
+        unique = {day: counts[0] for day, counts in sorted(days.items())}
+        non_unique = {day: counts[1] for day, counts in sorted(days.items())}
 
         return {
             "unique": unique,
@@ -70,11 +154,174 @@ class TrackerAndAnalytics:
             "total_nonunique_count": sum(non_unique.values()),
         }
 
+    def get_daily_series(self, start_date: date, end_date: date) -> dict[str, Any]:
+        """
+        Daily counts for `start_date`..`end_date` (UTC days) as int64 arrays,
+        one slot per day with missing days filled with zero.
+        """
+        start = np.datetime64(start_date, "D")
+        days = int((np.datetime64(end_date, "D") - start).astype(np.int64)) + 1
+        unique = np.zeros(days, dtype=np.int64)
+        non_unique = np.zeros(days, dtype=np.int64)
+
+        counts = self._daily_counts(start_date, end_date)
+        if counts:
+            index = (np.array(list(counts), dtype="datetime64[D]") - start).astype(np.int64)
+            unique[index] = [pair[0] for pair in counts.values()]
+            non_unique[index] = [pair[1] for pair in counts.values()]
+        return {"unique": unique, "non_unique": non_unique, "missing_days": days - len(counts)}
+
     def get_non_unique_visitor_count(self) -> int:
         """Get the total visitor count."""
-        key = f'{self.name}_{datetime.now().strftime("%Y-%m-%d")}'
-        doc = self.collection.find_one({"_id": key})
-        return doc["nonunique_count"] if doc else 0
+        return self.get_today_counts()["nonunique_count"]
+
+    def get_visitor_count_by_timezone(
+        self,
+        tz: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> dict[str, Any]:
+        """
+        Get daily visitor totals for local calendar days in the IANA timezone `tz`.
+
+        Totals are assembled from the hourly UTC buckets, so any timezone is
+        answered from pre-aggregated documents. Each hour is attributed to the
+        local day its start falls on; for zones with a non-whole-hour offset
+        that shifts at most one partial hour per day. `start_date` defaults
+        to "today" in `tz` and `end_date` to `start_date`; a range that ends
+        before it starts raises ValueError.
+        """
+        zone = ZoneInfo(tz)
+        today = datetime.now(zone).date()
+        start_date = start_date or today
+        end_date = end_date or start_date
+        if start_date > end_date:
+            raise ValueError("start_date must be before or equal to end_date")
+
+        utc_start = datetime.combine(start_date, time.min, zone).astimezone(timezone.utc)
+        utc_end = datetime.combine(end_date + timedelta(days=1), time.min, zone).astimezone(timezone.utc)
+
+        days = (end_date - start_date).days + 1
+        unique = {str(start_date + timedelta(days=i)): 0 for i in range(days)}
+        non_unique = dict(unique)
+
+        for hour, (count, nonunique) in self._hourly_counts(utc_start, utc_end).items():
+            local_day = str(hour.astimezone(zone).date())
+            if local_day not in unique:
+                continue
+            unique[local_day] += count
+            non_unique[local_day] += nonunique
+
+        return {
+            "unique": unique,
+            "non_unique": non_unique,
+            "app_name": self.name,
+            "timezone": tz,
+            "total_unique_count": sum(unique.values()),
+            "total_nonunique_count": sum(non_unique.values()),
+        }
+
+    def compact(self, retention_days: int, now: Optional[datetime] = None) -> dict[str, int]:
+        """
+        Fold daily and hourly documents of every month that ended more than
+        `retention_days` ago into one `_m_` archive per month.
+
+        An archive holds per-day `count`/`nonunique_count` arrays and
+        per-hour `hourly_count`/`hourly_nonunique_count` arrays, with null
+        where there was no document. Archives are written before the folded
+        documents are deleted, and a live document wins over an archived value
+        on read. A rerun after a crash therefore repeats the same fold.
+        Folding into an existing archive overwrites only the slots present.
+        """
+        today = (now or datetime.now(timezone.utc)).date()
+        first_live_month = (today - timedelta(days=retention_days)).replace(day=1)
+        daily = self.collection.find(
+            {"_id": {"$gte": f"{self.name}_0", "$lt": self._day_key(first_live_month)}}
+        ).sort("_id", 1)
+        hourly = self.collection.find(
+            {"_id": {"$gte": f"{self.name}_h_", "$lt": self._hour_key(datetime.combine(first_live_month, time.min, timezone.utc))}}
+        ).sort("_id", 1)
+
+        # Both streams are in `_id` order, so merging by "YYYY-MM" yields one month at a time
+        entries = heapq.merge(
+            ((doc["_id"].split("_")[-1][:7], False, doc) for doc in daily),
+            ((doc["_id"].split("_h_")[-1][:7], True, doc) for doc in hourly),
+            key=lambda entry: entry[0]
+        )
+        stats = {"months": 0, "daily": 0, "hourly": 0}
+        for month, month_entries in groupby(entries, key=lambda entry: entry[0]):
+            folded = self._fold_month(date.fromisoformat(f"{month}-01"), [entry[1:] for entry in month_entries])
+            stats["months"] += 1
+            stats["daily"] += folded["daily"]
+            stats["hourly"] += folded["hourly"]
+        return stats
+
+    def _fold_month(self, month: date, entries: List[tuple[bool, dict[str, Any]]]) -> dict[str, int]:
+        days = calendar.monthrange(month.year, month.month)[1]
+        key = self._month_key(month)
+        archive = self.collection.find_one({"_id": key}) or {}
+        arrays = {
+            field: list(archive.get(field) or [None] * size)
+            for field, size in (
+                ("count", days), ("nonunique_count", days),
+                ("hourly_count", days * 24), ("hourly_nonunique_count", days * 24),
+            )
+        }
+        folded = {"daily": 0, "hourly": 0}
+        for hourly, doc in entries:
+            if hourly:
+                hour = datetime.strptime(doc["_id"].split("_h_")[-1], "%Y-%m-%dT%H")
+                slot, prefix = (hour.day - 1) * 24 + hour.hour, "hourly_"
+            else:
+                slot, prefix = int(doc["_id"][-2:]) - 1, ""
+            arrays[f"{prefix}count"][slot] = doc.get("count", 0)
+            arrays[f"{prefix}nonunique_count"][slot] = doc.get("nonunique_count", 0)
+            folded["hourly" if hourly else "daily"] += 1
+
+        self.collection.update_one(
+            {"_id": key},
+            {"$set": {**arrays, "month": str(month)[:7], "compacted_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        self.collection.delete_many({"_id": {"$in": [doc["_id"] for _, doc in entries]}})
+        return folded
+
+    def _engagement_prefix(self, campaign_id: str) -> str:
+        """Campaign opens/clicks are daily documents under an `_e_` prefix, outside daily range scans."""
+        return f'{self.name}_e_{campaign_id}_'
+
+    def get_campaign_engagement(
+        self,
+        campaign_id: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> dict[str, Any]:
+        """Get opens and clicks of a campaign per day and per link (UTC days)."""
+        prefix = self._engagement_prefix(campaign_id)
+        start_key = f'{prefix}{start_date}' if start_date else prefix
+        # "~" sorts after every date character
+        end_key = f'{prefix}{end_date}' if end_date else f'{prefix}~'
+
+        opens = {}
+        clicks = {}
+        links: dict[str, dict[str, Any]] = {}
+        for doc in self.analytics.find({"_id": {"$gte": start_key, "$lte": end_key}}):
+            day = doc["_id"][len(prefix):]
+            opens[day] = doc.get("opens", 0)
+            clicks[day] = doc.get("clicks", 0)
+            for key, link in doc.get("links", {}).items():
+                total = links.setdefault(key, {"url": link.get("url"), "clicks": 0})
+                total["clicks"] += link.get("clicks", 0)
+
+        return {
+            "campaign_id": campaign_id,
+            "app_name": self.name,
+            "opens": opens,
+            "clicks": clicks,
+            "links": sorted(links.values(), key=lambda link: link["clicks"], reverse=True),
+            "total_opens": sum(opens.values()),
+            "total_clicks": sum(clicks.values()),
+        }
 
     def get_unique_visitors(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[str]:
         """Get unique visitors within a date range."""
@@ -83,11 +330,8 @@ class TrackerAndAnalytics:
         if end_date is None:
             end_date = datetime.max
 
-        start_key = f'{self.name}_{start_date.strftime("%Y-%m-%d")}'
-        end_key = f'{self.name}_{end_date.strftime("%Y-%m-%d")}'
-        
-        cursor = self.collection.find({"_id": {"$gte": start_key, "$lte": end_key}})
-        return [doc["_id"] for doc in cursor]
+        days = self._daily_counts(start_date.date(), end_date.date())
+        return [f"{self.name}_{day}" for day in sorted(days)]
 
     def get_unique_visitor_count(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> int:
         """Get the count of unique visitors within a date range."""
@@ -0,0 +1,52 @@
+import secrets
+from datetime import datetime, timezone
+from typing import Any, List
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+from ..config.database import get_db
+from ..schemas.webhook_schema import WebhookCreate, WebhookRead
+
+_indexes_ready = False
+
+
+class Webhook:
+    """Webhook endpoints of one tenant, keyed by its subscriber `collection_name`."""
+
+    def __init__(self, collection_name: str):
+        global _indexes_ready
+        self.collection = get_db()["webhooks"]
+        self.collection_name = collection_name
+        if not _indexes_ready:
+            self.collection.create_index([("collection_name", ASCENDING)])
+            _indexes_ready = True
+
+    def create(self, document: WebhookCreate) -> dict[str, Any]:
+        """Register an endpoint. The signing secret is only returned here."""
+        doc = {
+            "collection_name": self.collection_name,
+            "url": str(document.url),
+            "events": document.events,
+            "secret": f"whsec_{secrets.token_urlsafe(32)}",
+            "created_at": datetime.now(timezone.utc),
+        }
+        self.collection.insert_one(doc)
+        return {
+            **WebhookRead(**doc).model_dump(),
+            "secret": doc["secret"],
+        }
+
+    def list(self) -> List[WebhookRead]:
+        cursor = self.collection.find({"collection_name": self.collection_name}, {"secret": 0})
+        return [WebhookRead(**doc) for doc in cursor]
+
+    def delete(self, webhook_id: str) -> bool:
+        if not ObjectId.is_valid(webhook_id):
+            return False
+        result = self.collection.delete_one({"_id": ObjectId(webhook_id), "collection_name": self.collection_name})
+        return result.deleted_count > 0
+
+    def endpoints(self) -> List[dict[str, Any]]:
+        """Full endpoint documents, secrets included, for delivery."""
+        return list(self.collection.find({"collection_name": self.collection_name}))
@@ -1,11 +1,281 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
 from pydantic_settings import BaseSettings
 
 
 class DatabaseConfig(BaseSettings):
     URL: str = ""
     NAME: str =""
+    # "mongodb", or "sqlite" for an embedded single-file store (edge and test deployments)
+    STORAGE_BACKEND: str = "mongodb"
+    SQLITE_PATH: str = "newsletter.sqlite3"
+
+    model_config = {
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+ReadMode = Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+
+class ReadPreferenceConfig(BaseSettings):
+    """
+    Read preference per operation class (env prefix READ_PREFERENCE_).
+
+    Writes, auth and read-your-write lookups always use the primary. On a
+    standalone server every mode reads from it.
+    """
+    LISTS: ReadMode = "secondaryPreferred"
+    EXPORTS: ReadMode = "secondaryPreferred"
+    ANALYTICS: ReadMode = "secondaryPreferred"
+    MAX_STALENESS_SECONDS: int = 90  # -1 for no bound; MongoDB requires at least 90
+
+    model_config = {
+        "env_prefix": "READ_PREFERENCE_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+    @field_validator("MAX_STALENESS_SECONDS")
+    @classmethod
+    def _check_staleness(cls, value: int) -> int:
+        if value != -1 and value < 90:
+            raise ValueError("MAX_STALENESS_SECONDS must be -1 or at least 90")
+        return value
+
+class ServerConfig(BaseSettings):
+    """Settings for `python -m server serve` (env prefix SERVER_)."""
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0  # 0 means one worker per CPU
+    LOOP: str = "uvloop"
+    HTTP: str = "httptools"
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    KEEP_ALIVE_TIMEOUT: int = 5
+    LIMIT_CONCURRENCY: int | None = None
+    LIMIT_MAX_REQUESTS: int | None = None
+    BACKLOG: int = 2048
+
+    model_config = {
+        "env_prefix": "SERVER_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class SMTPConfig(BaseSettings):
+    """Outgoing mail relay used by campaign dispatch (env prefix SMTP_)."""
+    HOST: str = "localhost"
+    PORT: int = 25
+    USERNAME: str = ""
+    PASSWORD: str = ""
+    USE_TLS: bool = False
+    STARTTLS: bool = False
+    TIMEOUT: float = 30
+    FROM_ADDRESS: str = "newsletter@localhost"
+    POOL_SIZE: int = 8
+    BATCH_SIZE: int = 100
+
+    model_config = {
+        "env_prefix": "SMTP_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class DomainBudget(BaseModel):
+    max_in_flight: int = 0  # concurrent SMTP batches to the domain, 0 for unlimited
+    rate: float = 0  # messages per second, 0 for unlimited
+    burst: int = 0  # messages that may go out at once after an idle period, 0 for one second's worth
+
+    @model_validator(mode="after")
+    def _default_burst(self) -> "DomainBudget":
+        if self.rate and not self.burst:
+            self.burst = max(int(self.rate), 1)
+        return self
+
+class ThrottleConfig(BaseSettings):
+    """
+    Per-recipient-domain send budgets for campaign dispatch (env prefix
+    THROTTLE_). Off by default. DEFAULT is unlimited until a budget is set;
+    DOMAINS overrides it per domain and takes JSON, e.g.
+    THROTTLE_DOMAINS='{"gmail.com": {"max_in_flight": 4, "rate": 50, "burst": 100}}'.
+    """
+    ENABLED: bool = False
+    DEFAULT: DomainBudget = DomainBudget()
+    DOMAINS: dict[str, DomainBudget] = {}
+    MAX_PENDING: int = 20000  # recipients buffered ahead of the scheduler
+    DEFER_SECONDS: float = 30  # pause for a domain after a 4xx reply
+    MAX_DEFERRALS: int = 3  # 4xx replies per recipient before it is reported failed
+
+    model_config = {
+        "env_prefix": "THROTTLE_",
+        "env_nested_delimiter": "__",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class OutboxConfig(BaseSettings):
+    """Leased outbox workers (env prefix OUTBOX_)."""
+    BATCH_SIZE: int = 100
+    LEASE_SECONDS: int = 120
+    MAX_ATTEMPTS: int = 5
+    RETRY_BASE_SECONDS: float = 30
+    RETRY_MAX_SECONDS: float = 3600
+    IDLE_SLEEP_SECONDS: float = 1
+
+    model_config = {
+        "env_prefix": "OUTBOX_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class PreferenceConfig(BaseSettings):
+    """Signed preference links and spike buffering (env prefix PREFERENCES_)."""
+    TOKEN_TTL_DAYS: int = 90
+    BUFFER_ENABLED: bool = False
+    BUFFER_SPIKE_THRESHOLD: int = 50  # changes per second before buffering kicks in
+    BUFFER_MAX_BATCH: int = 500
+    BUFFER_FLUSH_INTERVAL: float = 1.0
+
+    model_config = {
+        "env_prefix": "PREFERENCES_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class ClientTokenConfig(BaseSettings):
+    """
+    App-client access tokens (env prefix CLIENT_TOKEN_). EdDSA tokens are
+    verified offline; PRIVATE_KEY is an Ed25519 PEM and, when empty, is
+    derived from JWT_SECRET_KEY so every worker shares it.
+    """
+    ALGORITHM: str = "EdDSA"  # "EdDSA" or the legacy per-client "HS256"
+    PRIVATE_KEY: str = ""
+    KEY_ID: str = "v1"
+    TTL_DAYS: int = 365
+    DENYLIST_REFRESH_SECONDS: float = 30
+
+    model_config = {
+        "env_prefix": "CLIENT_TOKEN_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class EngagementConfig(BaseSettings):
+    """Campaign open/click tracking (env prefix ENGAGEMENT_)."""
+    ENABLED: bool = True
+    TOKEN_TTL_DAYS: int = 365
+    FLUSH_INTERVAL: float = 5.0
+    MAX_KEYS: int = 10000  # pending counters that trigger an early flush
+
+    model_config = {
+        "env_prefix": "ENGAGEMENT_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class WebhookConfig(BaseSettings):
+    """Subscriber lifecycle webhooks (env prefix WEBHOOK_)."""
+    ENABLED: bool = True
+    MAX_QUEUE: int = 10000  # events buffered before new ones are dropped
+    BATCH_SIZE: int = 50  # events per POST
+    BATCH_WAIT_SECONDS: float = 1.0  # how long to gather a batch
+    TIMEOUT: float = 10
+    MAX_CONNECTIONS: int = 50
+    MAX_ATTEMPTS: int = 6
+    RETRY_BASE_SECONDS: float = 2
+    RETRY_MAX_SECONDS: float = 300
+    # Allow endpoints on loopback, private and link-local addresses (development only)
+    ALLOW_PRIVATE_NETWORKS: bool = False
+
+    model_config = {
+        "env_prefix": "WEBHOOK_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class OverviewConfig(BaseSettings):
+    """Operator overview across tenants (env prefix OVERVIEW_)."""
+    CONCURRENCY: int = 16  # tenants queried at once
+    TENANT_TIMEOUT: float = 10
+    REFRESH_SECONDS: float = 60  # background snapshot refresh; 0 disables it
+
+    model_config = {
+        "env_prefix": "OVERVIEW_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class AnalyticsCacheConfig(BaseSettings):
+    """Read-side cache for analytics queries (env prefix ANALYTICS_CACHE_)."""
+    ENABLED: bool = True
+    TTL_SECONDS: float = 2.0
+    MAX_ENTRIES: int = 10000
+
+    model_config = {
+        "env_prefix": "ANALYTICS_CACHE_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class TrackingCompactionConfig(BaseSettings):
+    """Folding of old tracking documents into monthly archives (env prefix TRACKING_COMPACTION_)."""
+    # Months ending more than this many days ago are archived
+    RETENTION_DAYS: int = 90
+
+    model_config = {
+        "env_prefix": "TRACKING_COMPACTION_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class SlowQueryConfig(BaseSettings):
+    """Slow-command capture and explain (env prefix SLOW_QUERY_)."""
+    ENABLED: bool = True
+    THRESHOLD_MS: float = 100.0
+    EXPLAIN: bool = True
+    MAX_SHAPES: int = 500
+    EXPLAIN_QUEUE: int = 100
+    LOG_INTERVAL_SECONDS: float = 300.0  # 0 disables the periodic summary
+
+    model_config = {
+        "env_prefix": "SLOW_QUERY_",
+        "env_file": ".env",
+        "env_file_encoding": "utf-8",
+        "extra": "ignore"
+    }
+
+class AdmissionBudget(BaseModel):
+    max_in_flight: int
+    max_queue: int
+    max_queue_wait_ms: int
+
+class AdmissionConfig(BaseSettings):
+    """
+    Load shedding per route class (env prefix ADMISSION_, nested with "__",
+    e.g. ADMISSION_TRACKING__MAX_IN_FLIGHT=64).
+    """
+    ENABLED: bool = True
+    RETRY_AFTER_SECONDS: int = 2
+    TRACKING: AdmissionBudget = AdmissionBudget(max_in_flight=32, max_queue=256, max_queue_wait_ms=500)
+    SUBSCRIBER: AdmissionBudget = AdmissionBudget(max_in_flight=16, max_queue=128, max_queue_wait_ms=1000)
+    EXPORT: AdmissionBudget = AdmissionBudget(max_in_flight=2, max_queue=4, max_queue_wait_ms=2000)
 
     model_config = {
+        "env_prefix": "ADMISSION_",
+        "env_nested_delimiter": "__",
         "env_file": ".env",
         "env_file_encoding": "utf-8",
         "extra": "ignore"
@@ -17,7 +287,25 @@ class AppConfig(BaseSettings):
     ENV: str = "development"
     debug: bool = False if ENV == "development" else True
     DB: DatabaseConfig
+    READ_PREFERENCE: ReadPreferenceConfig = Field(default_factory=ReadPreferenceConfig)
+    SERVER: ServerConfig = Field(default_factory=ServerConfig)
+    ADMISSION: AdmissionConfig = Field(default_factory=AdmissionConfig)
+    THREADPOOL_SIZE: int = 40
+    SMTP: SMTPConfig = Field(default_factory=SMTPConfig)
+    THROTTLE: ThrottleConfig = Field(default_factory=ThrottleConfig)
+    OUTBOX: OutboxConfig = Field(default_factory=OutboxConfig)
+    PREFERENCES: PreferenceConfig = Field(default_factory=PreferenceConfig)
+    ENGAGEMENT: EngagementConfig = Field(default_factory=EngagementConfig)
+    ANALYTICS_CACHE: AnalyticsCacheConfig = Field(default_factory=AnalyticsCacheConfig)
+    WEBHOOK: WebhookConfig = Field(default_factory=WebhookConfig)
+    OVERVIEW: OverviewConfig = Field(default_factory=OverviewConfig)
+    SLOW_QUERY: SlowQueryConfig = Field(default_factory=SlowQueryConfig)
+    TRACKING_COMPACTION: TrackingCompactionConfig = Field(default_factory=TrackingCompactionConfig)
+    CLIENT_TOKEN: ClientTokenConfig = Field(default_factory=ClientTokenConfig)
+    PUBLIC_BASE_URL: str = ""  # absolute http(s) URL for links in emails; no unsubscribe links without it
+    RENDER_PROCESSES: int = 0  # 0 renders on the event loop; >0 uses a process pool
     JWT_SECRET_KEY: str
+    ADMIN_API_KEY: str = ""  # X-Admin-Key for /admin; the admin API is off while empty
     CORS_ORIGINS: list[str] = [
             "http://localhost:5173", "http://localhost:5174",
             "https://biddius.com", "https://www.biddius.com",
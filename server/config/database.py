@@ -1,11 +1,31 @@
+from contextlib import nullcontext
+
 from pymongo import server_api, MongoClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
 
 from server.config.app_config import app_config
+from server.config.sqlite import SQLiteClient
+from server.utils.query_monitor import slow_query_monitor
 
 client: MongoClient = None
+# Database handles per operation class, each with its own read preference
+_databases = {}
+
+READ_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# Operation classes that may read from secondaries; anything else uses the primary
+OPERATION_CLASSES = ("lists", "exports", "analytics")
     
 def create_client():
     global client
+    _databases.clear()
+    if app_config.DB.STORAGE_BACKEND == "sqlite":
+        client = SQLiteClient(app_config.DB.SQLITE_PATH)
+        return client
     try:
         client = MongoClient(
             app_config.DB.URL,
@@ -15,17 +35,53 @@ def create_client():
                 deprecation_errors=True
             ),
             connect=True,
+            event_listeners=[slow_query_monitor] if app_config.SLOW_QUERY.ENABLED else [],
         )
         return client
     except Exception as e:
         raise Exception(f"Failed to connect to MongoDB: {e}")
 
-def get_db ():
+def read_preference(operation: str):
+    """Read preference for an operation class, from READ_PREFERENCE_<CLASS>."""
+    mode = getattr(app_config.READ_PREFERENCE, operation.upper(), "primary") if operation in OPERATION_CLASSES else "primary"
+    if mode == "primary":
+        return Primary()
+    return READ_MODES[mode](max_staleness=app_config.READ_PREFERENCE.MAX_STALENESS_SECONDS)
+
+def get_db (operation: str = "primary"):
+    """
+    The app database. `operation` names the kind of read done through it:
+    "lists", "exports" and "analytics" follow their configured read
+    preference, anything else (writes, auth) reads from the primary.
+    """
     global client
     if client is None:
         create_client()
-    return client[app_config.DB.NAME]
+    if operation not in OPERATION_CLASSES or isinstance(client, SQLiteClient):
+        return client[app_config.DB.NAME]
+    db = _databases.get((operation, id(client)))
+    if db is None:
+        db = client.get_database(app_config.DB.NAME, read_preference=read_preference(operation))
+        _databases[(operation, id(client))] = db
+    return db
+
+def read_session():
+    """
+    Causally consistent session for reads that must not go back in time,
+    even when they land on different secondaries: a page read after a
+    version counter reflects at least that version.
+    """
+    if client is None:
+        create_client()
+    if isinstance(client, SQLiteClient):
+        return nullcontext()
+    return client.start_session(causal_consistency=True)
 
 def close_mongo_connection():
+    global client
+    if client is None:
+        return
     print("Closing MongoDB connection...")
     client.close()
+    client = None
+    _databases.clear()
@@ -0,0 +1,846 @@
+"""
+Embedded SQLite storage with the subset of the pymongo API the app uses.
+
+`get_db()` returns a `SQLiteDatabase` when DB STORAGE_BACKEND=sqlite, and the
+collection classes run unchanged on it. Each collection is a table of
+(`id`, JSON `doc`) rows. Filters are evaluated in Python with MongoDB
+semantics. Where a filter has `_id` conditions, or equality, ranges, `$in`
+or anchored regex prefixes on plain fields, those conditions are also
+pushed into SQL. There they can use the primary key or the expression
+indexes built by `create_index`. The database runs in WAL mode, so readers
+never wait on the writer.
+
+ObjectIds and datetimes are stored as tagged strings ("$oid:<hex>",
+"$date:<UTC ISO, ms>"). Tagged datetimes sort chronologically, so range
+queries on them work in SQL. As with pymongo, datetimes come back naive in UTC
+and truncated to milliseconds. Not supported: aggregation, array
+operators, transactions across calls and index uniqueness. TTL indexes
+are honoured by purging expired documents on later writes.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+OID_TAG = "$oid:"
+DATE_TAG = "$date:"
+PAGE_SIZE = 500
+TTL_PURGE_SECONDS = 60.0
+
+_MISSING = object()
+
+
+# --- value encoding ---------------------------------------------------------
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return OID_TAG + str(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return (
+            f"{DATE_TAG}{value.year:04d}-{value.month:02d}-{value.day:02d}T"
+            f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}.{value.microsecond // 1000:03d}"
+        )
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, str):
+        if value.startswith(OID_TAG) and len(value) == len(OID_TAG) + 24:
+            return ObjectId(value[len(OID_TAG):])
+        if value.startswith(DATE_TAG):
+            return datetime.strptime(value[len(DATE_TAG):], "%Y-%m-%dT%H:%M:%S.%f")
+        return value
+    if isinstance(value, dict):
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _normalize(value: Any) -> Any:
+    """A value as it would read back from storage (ms datetimes, naive UTC)."""
+    return _decode(_encode(value))
+
+
+def _json_path(field: str) -> str:
+    return "$" + "".join('."' + part.replace('"', '""') + '"' for part in field.split("."))
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# --- matching ---------------------------------------------------------------
+
+def _get_path(doc: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(doc, dict) and part in doc:
+            doc = doc[part]
+        else:
+            return _MISSING
+    return doc
+
+
+def _type_class(value: Any) -> int:
+    if value is None or value is _MISSING:
+        return 0
+    if isinstance(value, bool):
+        return 5
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 6
+    if isinstance(value, datetime):
+        return 7
+    return 8
+
+
+def _equals(actual: Any, expected: Any) -> bool:
+    if expected is None:
+        return actual is None or actual is _MISSING
+    if isinstance(actual, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in actual)
+    return _type_class(actual) == _type_class(expected) and actual == expected
+
+
+def _compare(actual: Any, expected: Any, op: str) -> bool:
+    candidates = actual if isinstance(actual, list) else [actual]
+    for item in candidates:
+        if _type_class(item) != _type_class(expected) or item is _MISSING:
+            continue
+        try:
+            if (op == "$gt" and item > expected) or (op == "$gte" and item >= expected) \
+                    or (op == "$lt" and item < expected) or (op == "$lte" and item <= expected):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+def _regex(pattern: Any, options: str = "") -> "re.Pattern":
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option, flag in (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL), ("x", re.VERBOSE)):
+        if option in options:
+            flags |= flag
+    return re.compile(pattern, flags)
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# `$in` lists of recent queries as sets, keyed by list identity; the
+# entry keeps its list alive, so the id is not reused while cached
+_in_sets: dict[int, tuple[list, Optional[frozenset]]] = {}
+MAX_IN_SETS = 64
+
+
+def _in(actual: Any, values: list[Any]) -> bool:
+    # A string or ObjectId only equals values of its own type, so a set
+    # lookup is exact; it keeps `_id: {$in: [...1000 ids]}` linear
+    if isinstance(actual, (str, ObjectId)):
+        cached = _in_sets.get(id(values))
+        if cached is None or cached[0] is not values:
+            try:
+                lookup = frozenset(values)
+            except TypeError:
+                lookup = None
+            if len(_in_sets) >= MAX_IN_SETS:
+                _in_sets.clear()
+            cached = _in_sets[id(values)] = (values, lookup)
+        if cached[1] is not None:
+            return actual in cached[1]
+    return any(_equals(actual, value) for value in values)
+
+
+def _match_operators(actual: Any, spec: dict[str, Any]) -> bool:
+    for op, expected in spec.items():
+        if op == "$options":
+            continue
+        if op == "$eq":
+            ok = _equals(actual, expected)
+        elif op == "$ne":
+            ok = not _equals(actual, expected)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = _compare(actual, expected, op)
+        elif op == "$in":
+            ok = _in(actual, expected)
+        elif op == "$nin":
+            ok = not _in(actual, expected)
+        elif op == "$exists":
+            ok = (actual is not _MISSING) == bool(expected)
+        elif op == "$regex":
+            pattern = _regex(expected, spec.get("$options", ""))
+            values = actual if isinstance(actual, list) else [actual]
+            ok = any(isinstance(value, str) and pattern.search(value) for value in values)
+        elif op == "$not":
+            ok = not _match_operators(actual, expected if isinstance(expected, dict) else {"$regex": expected})
+        elif op in ("$bitsAllSet", "$bitsAnySet", "$bitsAllClear", "$bitsAnyClear"):
+            bits = sum(1 << b for b in expected) if isinstance(expected, list) else expected
+            if not _is_int(actual):
+                ok = False
+            elif op == "$bitsAllSet":
+                ok = actual & bits == bits
+            elif op == "$bitsAnySet":
+                ok = bool(actual & bits)
+            elif op == "$bitsAllClear":
+                ok = not actual & bits
+            else:
+                ok = actual & bits != bits
+        else:
+            raise NotImplementedError(f"Query operator {op} is not supported by the SQLite backend")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: dict[str, Any], query: dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        else:
+            actual = _get_path(doc, key)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if not _match_operators(actual, condition):
+                    return False
+            elif isinstance(condition, re.Pattern):
+                if not (isinstance(actual, str) and condition.search(actual)):
+                    return False
+            elif not _equals(actual, condition):
+                return False
+    return True
+
+
+# --- updates ----------------------------------------------------------------
+
+def _set_path(doc: dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def apply_update(doc: dict[str, Any], update: dict[str, Any], inserting: bool = False) -> None:
+    if update and not any(key.startswith("$") for key in update):
+        # Replacement document
+        _id = doc.get("_id")
+        doc.clear()
+        doc.update(_normalize(update))
+        if _id is not None:
+            doc["_id"] = _id
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, _normalize(value))
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                current = _get_path(doc, path)
+                _set_path(doc, path, value if current is _MISSING or current is None else current + value)
+            elif op == "$bit":
+                current = _get_path(doc, path)
+                current = 0 if current is _MISSING or current is None else current
+                for bit_op, operand in value.items():
+                    if bit_op == "and":
+                        current &= operand
+                    elif bit_op == "or":
+                        current |= operand
+                    elif bit_op == "xor":
+                        current ^= operand
+                _set_path(doc, path, current)
+            elif op == "$setOnInsert":
+                continue
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the SQLite backend")
+
+
+def _upsert_seed(query: dict[str, Any]) -> dict[str, Any]:
+    """The document an upsert starts from: the filter's plain equality fields."""
+    doc: dict[str, Any] = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            if "$eq" in condition:
+                _set_path(doc, key, _normalize(condition["$eq"]))
+            continue
+        _set_path(doc, key, _normalize(condition))
+    return doc
+
+
+def project(doc: dict[str, Any], projection: Optional[Any]) -> dict[str, Any]:
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        result: dict[str, Any] = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    result = json.loads(json.dumps(_encode(doc)))
+    result = _decode(result)
+    for path in fields:
+        _unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_key(spec: list[tuple[str, int]]):
+    class Key:
+        __slots__ = ("doc",)
+
+        def __init__(self, doc):
+            self.doc = doc
+
+        def __lt__(self, other):
+            for field, direction in spec:
+                a, b = _get_path(self.doc, field), _get_path(other.doc, field)
+                ka, kb = (_type_class(a), a), (_type_class(b), b)
+                if ka[0] != kb[0]:
+                    less = ka[0] < kb[0]
+                elif ka[0] == 0 or a == b:
+                    continue
+                else:
+                    less = a < b
+                return less if direction >= 0 else not less
+            return False
+    return Key
+
+
+def _sort_spec(key_or_list: Any, direction: Optional[int] = None) -> list[tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction if direction is not None else 1)]
+    return [(field, int(way)) for field, way in key_or_list]
+
+
+# --- results ----------------------------------------------------------------
+
+class InsertOneResult:
+    def __init__(self, inserted_id: Any):
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids: List[Any]):
+        self.inserted_ids = inserted_ids
+        self.acknowledged = True
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.acknowledged = True
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+        self.acknowledged = True
+
+
+class BulkWriteResult:
+    def __init__(self):
+        self.inserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.upserted_count = 0
+        self.upserted_ids: dict[int, Any] = {}
+        self.acknowledged = True
+
+
+# --- cursor -----------------------------------------------------------------
+
+class SQLiteCursor:
+    def __init__(self, collection: "SQLiteCollection", query: dict[str, Any], projection: Any = None):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._page_size = PAGE_SIZE
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "SQLiteCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "SQLiteCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "SQLiteCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "SQLiteCursor":
+        self._page_size = max(batch_size, 1)
+        return self
+
+    def hint(self, index: Any) -> "SQLiteCursor":
+        # SQLite's planner picks the expression index by itself
+        return self
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        docs = self._collection._scan(self._query, self._sort, self._page_size)
+        skipped = returned = 0
+        for doc in docs:
+            if skipped < self._skip:
+                skipped += 1
+                continue
+            yield project(doc, self._projection)
+            returned += 1
+            if self._limit and returned >= self._limit:
+                return
+
+    def to_list(self, length: Optional[int] = None) -> List[dict[str, Any]]:
+        docs = []
+        for doc in self:
+            docs.append(doc)
+            if length and len(docs) >= length:
+                break
+        return docs
+
+
+# --- collection -------------------------------------------------------------
+
+class SQLiteCollection:
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._table = _quote(name)
+        database._ensure_table(name)
+
+    # SQL pushdown -------------------------------------------------------
+
+    def _pushdown(self, query: dict[str, Any]) -> tuple[list[str], list[Any]]:
+        """SQL conditions that every match of `query` satisfies (a superset)."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        for key, condition in query.items():
+            if key.startswith("$"):
+                continue
+            column = "id" if key == "_id" else f"json_extract(doc, '{_json_path(key)}')"
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                for op, value in condition.items():
+                    if op in ("$eq", "$gt", "$gte", "$lt", "$lte") and self._pushable(value):
+                        sql_op = {"$eq": "=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                        clauses.append(f"{column} {sql_op} ?")
+                        params.append(self._param(value))
+                    elif op == "$in" and value and all(self._pushable(v) for v in value):
+                        clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                        params.extend(self._param(v) for v in value)
+                    elif op == "$regex" and isinstance(value, str) and "i" not in condition.get("$options", ""):
+                        prefix = self._regex_prefix(value)
+                        if prefix:
+                            clauses.append(f"{column} >= ? AND {column} < ?")
+                            params.extend([prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)])
+            elif self._pushable(condition):
+                clauses.append(f"{column} = ?")
+                params.append(self._param(condition))
+        return clauses, params
+
+    @staticmethod
+    def _pushable(value: Any) -> bool:
+        return isinstance(value, (str, int, float, ObjectId, datetime))
+
+    @staticmethod
+    def _param(value: Any) -> Any:
+        value = _encode(value)
+        return int(value) if isinstance(value, bool) else value
+
+    @staticmethod
+    def _regex_prefix(pattern: str) -> str:
+        if not pattern.startswith("^"):
+            return ""
+        prefix = []
+        i = 1
+        while i < len(pattern):
+            char = pattern[i]
+            if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                prefix.append(pattern[i + 1])
+                i += 2
+            elif char in ".^$*+?{}[]|()\\":
+                # A quantifier applies to the previous literal, which is then optional
+                if char in "*?{" and prefix:
+                    prefix.pop()
+                break
+            else:
+                prefix.append(char)
+                i += 1
+        return "".join(prefix)
+
+    def _scan(self, query: dict[str, Any], sort: list[tuple[str, int]] = (), page_size: int = PAGE_SIZE,
+              conn: Optional[sqlite3.Connection] = None) -> Iterator[dict[str, Any]]:
+        """
+        Matching documents, in `sort` order if given. Rows are read in pages,
+        each fetched completely, so callers may write between pages.
+        """
+        conn = conn or self.database.connection()
+        # Compare against values as stored: aware datetimes become naive UTC
+        query = _normalize(query)
+        clauses, params = self._pushdown(query)
+        where = " AND ".join(clauses) or "1"
+        if sort and list(sort) != [("_id", 1)]:
+            # Keyset paging would need the sort values; sorted reads are small, so sort in Python
+            rows = conn.execute(f"SELECT id, doc FROM {self._table} WHERE {where}", params).fetchall()
+            docs = [doc for doc in (self._load(row) for row in rows) if matches(doc, query)]
+            docs.sort(key=_sort_key(list(sort)))
+            yield from docs
+            return
+        last = None
+        while True:
+            page_where = where if last is None else f"({where}) AND id > ?"
+            page_params = params if last is None else [*params, last]
+            rows = conn.execute(
+                f"SELECT id, doc FROM {self._table} WHERE {page_where} ORDER BY id LIMIT ?",
+                [*page_params, page_size]
+            ).fetchall()
+            for row in rows:
+                doc = self._load(row)
+                if matches(doc, query):
+                    yield doc
+            if len(rows) < page_size:
+                return
+            last = rows[-1][0]
+
+    @staticmethod
+    def _load(row: tuple) -> dict[str, Any]:
+        return {"_id": _decode(row[0]), **_decode(json.loads(row[1]))}
+
+    @staticmethod
+    def _dump(doc: dict[str, Any]) -> tuple[Any, str]:
+        body = {k: v for k, v in doc.items() if k != "_id"}
+        return _encode(doc["_id"]), json.dumps(_encode(body), separators=(",", ":"))
+
+    # reads --------------------------------------------------------------
+
+    def find(self, filter: Optional[dict[str, Any]] = None, projection: Any = None, **kwargs) -> SQLiteCursor:
+        cursor = SQLiteCursor(self, filter or {}, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, filter: Optional[dict[str, Any]] = None, projection: Any = None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        return next(iter(self.find(filter, projection, **kwargs).limit(1)), None)
+
+    def count_documents(self, filter: dict[str, Any], **kwargs) -> int:
+        if not filter:
+            return self.database.connection().execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        return sum(1 for _ in self._scan(filter))
+
+    def estimated_document_count(self) -> int:
+        return self.count_documents({})
+
+    # writes -------------------------------------------------------------
+
+    def _insert(self, conn: sqlite3.Connection, doc: dict[str, Any]) -> Any:
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        row = self._dump(doc)
+        try:
+            conn.execute(f"INSERT INTO {self._table} (id, doc) VALUES (?, ?)", row)
+        except sqlite3.IntegrityError as e:
+            # The primary key or a unique index
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']!r} ({e})")
+        return doc["_id"]
+
+    def insert_one(self, document: dict[str, Any], **kwargs) -> InsertOneResult:
+        with self.database.write(self) as conn:
+            return InsertOneResult(self._insert(conn, document))
+
+    def insert_many(self, documents: Iterable[dict[str, Any]], ordered: bool = True, **kwargs) -> InsertManyResult:
+        """Like pymongo: documents before a duplicate are kept and a `BulkWriteError` reports the rest."""
+        ids = []
+        errors = []
+        with self.database.write(self) as conn:
+            for index, document in enumerate(documents):
+                try:
+                    ids.append(self._insert(conn, document))
+                except DuplicateKeyError as e:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(ids), "nUpserted": 0,
+                "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(ids)
+
+    def _update(self, conn: sqlite3.Connection, filter: dict[str, Any], update: dict[str, Any],
+                upsert: bool, many: bool) -> UpdateResult:
+        matched = modified = 0
+        for doc in list(self._scan(filter, conn=conn)) if many else self._first(filter, conn):
+            matched += 1
+            before = self._dump(doc)
+            apply_update(doc, update)
+            after = self._dump(doc)
+            if after != before:
+                conn.execute(f"UPDATE {self._table} SET doc = ? WHERE id = ?", (after[1], after[0]))
+                modified += 1
+        if matched == 0 and upsert:
+            doc = _upsert_seed(filter)
+            apply_update(doc, update, inserting=True)
+            return UpdateResult(0, 0, self._insert(conn, doc))
+        return UpdateResult(matched, modified)
+
+    def _first(self, filter: dict[str, Any], conn: sqlite3.Connection, sort: Any = None) -> list[dict]:
+        docs = self._scan(filter, _sort_spec(sort) if sort else [], conn=conn)
+        first = next(docs, None)
+        docs.close()
+        return [first] if first is not None else []
+
+    def update_one(self, filter: dict[str, Any], update: dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        with self.database.write(self) as conn:
+            return self._update(conn, filter, update, upsert, many=False)
+
+    def update_many(self, filter: dict[str, Any], update: dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        with self.database.write(self) as conn:
+            return self._update(conn, filter, update, upsert, many=True)
+
+    def replace_one(self, filter: dict[str, Any], replacement: dict[str, Any], upsert: bool = False, **kwargs) -> UpdateResult:
+        with self.database.write(self) as conn:
+            return self._update(conn, filter, replacement, upsert, many=False)
+
+    def _delete(self, conn: sqlite3.Connection, filter: dict[str, Any], many: bool) -> int:
+        docs = list(self._scan(filter, conn=conn)) if many else self._first(filter, conn)
+        for doc in docs:
+            conn.execute(f"DELETE FROM {self._table} WHERE id = ?", (_encode(doc["_id"]),))
+        return len(docs)
+
+    def delete_one(self, filter: dict[str, Any], **kwargs) -> DeleteResult:
+        with self.database.write(self) as conn:
+            return DeleteResult(self._delete(conn, filter, many=False))
+
+    def delete_many(self, filter: dict[str, Any], **kwargs) -> DeleteResult:
+        with self.database.write(self) as conn:
+            return DeleteResult(self._delete(conn, filter, many=True))
+
+    def find_one_and_update(self, filter: dict[str, Any], update: dict[str, Any], projection: Any = None,
+                            sort: Any = None, upsert: bool = False, return_document: bool = False,
+                            **kwargs) -> Optional[dict]:
+        # BEGIN IMMEDIATE makes the read and the write one atomic step across workers
+        with self.database.write(self) as conn:
+            found = self._first(filter, conn, sort)
+            if not found:
+                if not upsert:
+                    return None
+                doc = _upsert_seed(filter)
+                apply_update(doc, update, inserting=True)
+                self._insert(conn, doc)
+                return project(doc, projection) if return_document else None
+            doc = found[0]
+            before = _decode(json.loads(json.dumps(_encode(doc))))
+            apply_update(doc, update)
+            row = self._dump(doc)
+            conn.execute(f"UPDATE {self._table} SET doc = ? WHERE id = ?", (row[1], row[0]))
+            return project(doc if return_document else before, projection)
+
+    def find_one_and_delete(self, filter: dict[str, Any], projection: Any = None, sort: Any = None,
+                            **kwargs) -> Optional[dict]:
+        with self.database.write(self) as conn:
+            found = self._first(filter, conn, sort)
+            if not found:
+                return None
+            conn.execute(f"DELETE FROM {self._table} WHERE id = ?", (_encode(found[0]["_id"]),))
+            return project(found[0], projection)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = BulkWriteResult()
+        with self.database.write(self) as conn:
+            for index, request in enumerate(requests):
+                if isinstance(request, InsertOne):
+                    self._insert(conn, request._doc)
+                    result.inserted_count += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    many = isinstance(request, UpdateMany)
+                    outcome = self._update(conn, request._filter, request._doc, request._upsert, many)
+                    result.matched_count += outcome.matched_count
+                    result.modified_count += outcome.modified_count
+                    if outcome.upserted_id is not None:
+                        result.upserted_count += 1
+                        result.upserted_ids[index] = outcome.upserted_id
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result.deleted_count += self._delete(conn, request._filter, isinstance(request, DeleteMany))
+                else:
+                    raise NotImplementedError(f"{type(request).__name__} is not supported by the SQLite backend")
+        return result
+
+    # indexes ------------------------------------------------------------
+
+    def create_index(self, keys: Any, **kwargs) -> str:
+        spec = _sort_spec(keys)
+        name = kwargs.get("name") or "_".join(f"{field}_{direction}" for field, direction in spec)
+        if kwargs.get("expireAfterSeconds") is not None:
+            self.database._ttl[self.name] = (spec[0][0], float(kwargs["expireAfterSeconds"]))
+        if [field for field, _ in spec] == ["_id"]:
+            return name
+        columns = ", ".join(
+            ("id" if field == "_id" else f"json_extract(doc, '{_json_path(field)}')") + (" DESC" if direction < 0 else "")
+            for field, direction in spec
+        )
+        unique = "UNIQUE " if kwargs.get("unique") else ""
+        with self.database.write() as conn:
+            conn.execute(f"CREATE {unique}INDEX IF NOT EXISTS {_quote(self.name + '__' + name)} ON {self._table} ({columns})")
+        return name
+
+    def drop(self) -> None:
+        with self.database.write() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {self._table}")
+        self.database._tables.discard(self.name)
+
+
+class SQLiteDatabase:
+    """One SQLite file; one thread-local connection per thread."""
+
+    def __init__(self, path: str, name: str = ""):
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        self._tables: set[str] = set()
+        self._ttl: dict[str, tuple[str, float]] = {}
+        self._purged_at: dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._connections: list[sqlite3.Connection] = []
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; writes open their own IMMEDIATE transactions
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False, cached_statements=512)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def write(self, collection: Optional[SQLiteCollection] = None) -> Iterator[sqlite3.Connection]:
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if collection is not None:
+                self._purge_expired(conn, collection)
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _purge_expired(self, conn: sqlite3.Connection, collection: SQLiteCollection) -> None:
+        ttl = self._ttl.get(collection.name)
+        now = time.monotonic()
+        if ttl is None or now - self._purged_at.get(collection.name, 0) < TTL_PURGE_SECONDS:
+            return
+        self._purged_at[collection.name] = now
+        field, seconds = ttl
+        cutoff = _encode(datetime.fromtimestamp(time.time() - seconds, timezone.utc))
+        conn.execute(
+            f"DELETE FROM {collection._table} WHERE json_extract(doc, '{_json_path(field)}') < ? "
+            f"AND json_extract(doc, '{_json_path(field)}') LIKE '{DATE_TAG}%'",
+            (cutoff,)
+        )
+
+    def _ensure_table(self, name: str) -> None:
+        if name in self._tables:
+            return
+        with self._lock:
+            if name not in self._tables:
+                self.connection().execute(
+                    f"CREATE TABLE IF NOT EXISTS {_quote(name)} (id PRIMARY KEY, doc TEXT NOT NULL) WITHOUT ROWID"
+                )
+                self._tables.add(name)
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        return SQLiteCollection(self, name)
+
+    def get_collection(self, name: str) -> SQLiteCollection:
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        rows = self.connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SQLiteClient:
+    """Stands in for `MongoClient`: `client[name]` is the single database file."""
+
+    def __init__(self, path: str):
+        self._database: Optional[SQLiteDatabase] = None
+        self.path = path
+
+    def __getitem__(self, name: str) -> SQLiteDatabase:
+        if self._database is None:
+            self._database = SQLiteDatabase(self.path, name)
+        return self._database
+
+    def close(self) -> None:
+        if self._database is not None:
+            self._database.close()
+            self._database = None
@@ -1,9 +1,12 @@
+import secrets
 import traceback
 from typing import Optional
 from fastapi import Depends, HTTPException, Header, status
 
+from server.config.app_config import app_config
 from server.collections.subscribers import Subscriber
 from server.collections.trackingAndAnalytics import TrackerAndAnalytics
+from server.collections.webhooks import Webhook
 
 
 def get_app_client_model():
@@ -54,3 +57,23 @@ def get_analytics_model(auth_data=Depends(verify_bearer_token)) -> TrackerAndAna
     if not collection_name:
         raise HTTPException(status_code=400, detail="Collection name not found in client data")
     return TrackerAndAnalytics(collection_name, name)
+
+def get_webhook_model(auth_data=Depends(verify_bearer_token)) -> Webhook:
+    if not auth_data:
+        raise HTTPException(status_code=401, detail="Unauthorized access")
+    client = auth_data.get("client_data")
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid client data in token")
+    collection_name = client.get("collection_name")
+    if not collection_name:
+        raise HTTPException(status_code=400, detail="Collection name not found in client data")
+    return Webhook(collection_name)
+
+def verify_admin_key(
+    x_admin_key: Optional[str] = Header(None, description="Operator API key (ADMIN_API_KEY)")
+):
+    """FastAPI dependency guarding operator endpoints across all tenants"""
+    if not app_config.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, app_config.ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
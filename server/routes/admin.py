@@ -0,0 +1,70 @@
+import json
+import time
+from datetime import date
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from ..collections.trackingAndAnalytics import TrackerAndAnalytics
+from ..dependencies import get_app_client_model, verify_admin_key
+from ..services.overview import tenant_overview
+from ..services.reports import report_range, tenant_traffic_reports
+from ..utils.query_monitor import slow_query_monitor
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(verify_admin_key)])
+
+
+@router.get("/reports/traffic", response_model=dict[str, Any])
+def get_traffic_reports(
+    tenants: Optional[str] = Query(None, description="Comma-separated app names; all app clients when omitted"),
+    start_date: Optional[date] = Query(None, description="First UTC day (YYYY-MM-DD), defaults to 89 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last UTC day (YYYY-MM-DD), defaults to today"),
+    app_client_model=Depends(get_app_client_model)
+):
+    """Visitor trend reports for many tenants in one call, computed together."""
+    start_date, end_date = report_range(start_date, end_date)
+    if tenants:
+        names = list(dict.fromkeys(name.strip() for name in tenants.split(",") if name.strip()))
+    else:
+        names = [client["name"] for client in app_client_model.collection.find({}, {"name": 1})]
+    analytics = [TrackerAndAnalytics(f"{name}_tracking_and_analytics", name) for name in names]
+    return tenant_traffic_reports(analytics, start_date, end_date)
+
+
+@router.get("/overview", response_model=dict[str, Any])
+async def get_overview():
+    """Subscriber and visitor counts for every tenant, from the background-refreshed snapshot."""
+    return await tenant_overview.snapshot()
+
+
+@router.get("/overview/stream")
+async def stream_overview():
+    """
+    Live pass over every tenant as NDJSON: one line per tenant in completion
+    order, then a summary line with `"done": true`.
+    """
+    async def generate():
+        started = time.perf_counter()
+        count = 0
+        async for row in tenant_overview.stream():
+            count += 1
+            yield json.dumps(row) + "\n"
+        yield json.dumps({"done": True, "tenants": count, "elapsed_seconds": round(time.perf_counter() - started, 3)}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/slow-queries", response_model=dict[str, Any])
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    flagged: bool = Query(False, description="Only shapes with a problem flag or filter hint"),
+    explain: bool = Query(False, description="Include the raw explain output")
+):
+    """Commands over the slow-query threshold in this worker, grouped by shape, slowest total first."""
+    return slow_query_monitor.report(limit=limit, flagged_only=flagged, include_explain=explain)
+
+
+@router.delete("/slow-queries", response_model=bool)
+def reset_slow_queries():
+    slow_query_monitor.reset()
+    return True
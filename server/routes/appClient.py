@@ -1,10 +1,8 @@
-import jwt
-import hashlib
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
 
-from datetime import datetime, timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from ..config.app_config import app_config
 from ..schemas import PaginatedResponse
 from ..schemas.app_client_schema import (
     AppClientCreate,
@@ -12,7 +10,10 @@ from ..schemas.app_client_schema import (
     AppClientUpdate
 )
 from ..dependencies import get_app_client_model, verify_bearer_token
-from ..collections.appClient import AppClient
+from ..collections.appClient import SPARSE_FIELDS, AppClient
+from ..config.database import read_session
+from ..utils.conditional import is_not_modified, make_etag, not_modified_response, validator_headers
+from ..utils.projection import parse_fields
 
 router = APIRouter(prefix="/app-client", tags=["AppClient"])
 
@@ -31,21 +32,44 @@ async def create_subscriber(
 @router.get("/{app_client_id}", response_model=AppClientRead)
 async def get_app_client(
     app_client_id: str,
+    request: Request,
+    response: Response,
     app_client_model: AppClient = Depends(get_app_client_model)
 ):
+    """Honours If-None-Match / If-Modified-Since; the 304 check reads only the timestamps."""
+    modified_at = app_client_model.get_modified_at(app_client_id)
+    if modified_at is None:
+        raise HTTPException(status_code=404, detail="App Client not found")
+    etag = make_etag("appClient", app_client_id, modified_at.isoformat())
+    if is_not_modified(request, etag, modified_at):
+        return not_modified_response(etag, modified_at)
+
     app_client = app_client_model.get_by_id(app_client_id)
     if not app_client:
         raise HTTPException(status_code=404, detail="App Client not found")
+    response.headers.update(validator_headers(etag, modified_at))
     return app_client
 
 
 @router.get("/", response_model=PaginatedResponse[AppClientRead])
 async def list_app_clients(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'name,collection_name'"),
     app_client_model: AppClient = Depends(get_app_client_model)
 ):
-    return app_client_model.list(skip=skip, limit=limit)
+    names = parse_fields(fields, SPARSE_FIELDS) if fields else None
+    with read_session() as session:
+        etag = make_etag("appClient", app_client_model.get_version(session), skip, limit, names)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        if names:
+            page = app_client_model.list_fields(names, skip=skip, limit=limit, session=session)
+            return JSONResponse(page, headers=validator_headers(etag))
+        response.headers.update(validator_headers(etag))
+        return app_client_model.list(skip=skip, limit=limit, session=session)
 
 
 @router.put("/{app_client_id}", response_model=dict)
@@ -88,31 +112,23 @@ async def refresh_token(
     auth_data=Depends(verify_bearer_token),
     app_client_model: AppClient = Depends(get_app_client_model)
 ):
-    """Generate a new token for the client"""
-    api_key = auth_data["api_key"]
-    client_data = auth_data["client_data"]
-    
-    # Generate new token with extended expiry
-    new_payload = {
-        "api_key": api_key,
-        "client_id": client_data["id"],
-        "client_name": client_data["name"],
-        "collection_name": client_data["collection_name"],
-        "exp": datetime.now(timezone.utc) + timedelta(days=365),
-        "iat": datetime.now(timezone.utc),
-        "iss": "your-api-service",
-        "sub": api_key
-    }
-    
-    # Get client salt from database
-    client = app_client_model.collection.find_one({"API_KEY": api_key})
-    jwt_secret = hashlib.sha256(f"{app_config.JWT_SECRET_KEY}:{client['client_salt']}".encode()).hexdigest()
-    
-    new_token = jwt.encode(new_payload, jwt_secret, algorithm="HS256")
-    
-    return {
-        "access_token": new_token,
-        "token_type": "Bearer",
-        "expires_in": 31536000,
-        "expires_at": (datetime.now(timezone.utc) + timedelta(days=365)).isoformat()
-    }
+    """
+    Generate a new token for the client. The token used for the call is
+    revoked, and the new one carries the client's current data.
+    """
+    client = app_client_model.collection.find_one({"API_KEY": auth_data["api_key"], "is_active": True})
+    if not client:
+        raise HTTPException(status_code=401, detail="Invalid API key or client inactive")
+
+    new_token = app_client_model.issue_token(client)
+    app_client_model.revoke_token(auth_data)
+    return new_token
+
+
+@router.post("/revoke-token", response_model=dict[str, bool])
+async def revoke_token(
+    auth_data=Depends(verify_bearer_token),
+    app_client_model: AppClient = Depends(get_app_client_model)
+):
+    """Revoke the token used for this call. Other workers refuse it within CLIENT_TOKEN_DENYLIST_REFRESH_SECONDS."""
+    return {"revoked": app_client_model.revoke_token(auth_data)}
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import socket
+from uuid import uuid4
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from jinja2 import TemplateError
+
+from ..config.app_config import app_config
+from ..schemas.campaign_schema import CampaignDispatchRequest, DispatchReportRead
+from ..dependencies import get_analytics_model, get_subscriber_model
+from ..collections.outbox import Outbox
+from ..collections.subscribers import CAMPAIGN_TYPES, Subscriber
+from ..collections.trackingAndAnalytics import TrackerAndAnalytics
+from ..services.dispatch import load_dispatch_report, start_dispatch
+from ..services.templates import CampaignRenderer, RenderPool
+
+router = APIRouter(prefix="/campaigns", tags=["Campaigns"])
+
+
+def validate_campaign_type(campaign_type: str) -> str:
+    if campaign_type not in CAMPAIGN_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid campaign type. Must be one of: {', '.join(CAMPAIGN_TYPES)}"
+        )
+    return campaign_type
+
+
+def engagement_tenant(analytics: TrackerAndAnalytics) -> str:
+    """Tenant whose tracking collection receives opens and clicks; empty when tracking is off."""
+    return analytics.name if app_config.ENGAGEMENT.ENABLED else ""
+
+
+def build_renderer(
+    payload: CampaignDispatchRequest,
+    campaign_type: str,
+    collection_name: str,
+    tracking_name: str = "",
+    campaign_id: str = "",
+) -> CampaignRenderer:
+    if not payload.html and not payload.text:
+        raise HTTPException(status_code=400, detail="Provide html and/or text content")
+    try:
+        return CampaignRenderer(
+            app_config.SMTP.FROM_ADDRESS,
+            payload.subject,
+            payload.html,
+            payload.text,
+            payload.context,
+            campaign_type,
+            collection_name,
+            app_config.PUBLIC_BASE_URL,
+            tracking_name,
+            campaign_id,
+        )
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid template: {e}")
+
+
+@router.post("/{campaign_type}/dispatch", response_model=DispatchReportRead, status_code=status.HTTP_202_ACCEPTED)
+async def dispatch_campaign(
+    payload: CampaignDispatchRequest,
+    campaign_type: str = Depends(validate_campaign_type),
+    subscriber_model: Subscriber = Depends(get_subscriber_model),
+    analytics: TrackerAndAnalytics = Depends(get_analytics_model)
+):
+    """
+    Send a campaign to every subscriber opted in to `campaign_type`.
+
+    Sending runs in the background; poll `GET /campaigns/dispatch/{id}` for progress.
+    Opens and clicks are reported under the dispatch id at
+    `GET /tracking/campaigns/{id}/engagement`.
+    """
+    dispatch_id = uuid4().hex
+    renderer = build_renderer(
+        payload, campaign_type, subscriber_model.collection_name, engagement_tenant(analytics), dispatch_id
+    )
+    report = start_dispatch(
+        subscriber_model.iter_campaign_recipients(campaign_type, batch_size=app_config.SMTP.BATCH_SIZE),
+        renderer,
+        campaign_type,
+        subscriber_model.collection_name,
+        render_pool=RenderPool(renderer, app_config.RENDER_PROCESSES) if app_config.RENDER_PROCESSES else None,
+        dispatch_id=dispatch_id,
+    )
+    return report.to_dict()
+
+
+@router.get("/dispatch/{dispatch_id}", response_model=DispatchReportRead)
+async def get_dispatch_report(
+    dispatch_id: str,
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    report = await asyncio.to_thread(load_dispatch_report, dispatch_id, subscriber_model.collection_name)
+    if not report:
+        raise HTTPException(status_code=404, detail="Dispatch not found")
+    return report
+
+
+def get_outbox_campaign(campaign_id: str, subscriber_model: Subscriber, outbox: Outbox) -> dict:
+    if not ObjectId.is_valid(campaign_id):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    campaign = outbox.get_campaign(ObjectId(campaign_id))
+    if not campaign or campaign["collection_name"] != subscriber_model.collection_name:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@router.post("/{campaign_type}/enqueue", response_model=dict[str, str], status_code=status.HTTP_202_ACCEPTED)
+def enqueue_campaign(
+    payload: CampaignDispatchRequest,
+    background_tasks: BackgroundTasks,
+    campaign_type: str = Depends(validate_campaign_type),
+    subscriber_model: Subscriber = Depends(get_subscriber_model),
+    analytics: TrackerAndAnalytics = Depends(get_analytics_model)
+):
+    """
+    Queue one outbox message per opted-in subscriber for the outbox workers
+    (`python -m server outbox-worker`) to send. Recipients are enqueued after
+    the response is returned; if this API worker stops first, an outbox
+    worker resumes the enqueue once its lease expires.
+    """
+    # Validates the templates up front; workers render from the stored campaign
+    build_renderer(payload, campaign_type, subscriber_model.collection_name)
+
+    outbox = Outbox()
+    worker_id = f"api:{socket.gethostname()}:{os.getpid()}"
+    campaign_id = outbox.create_campaign(
+        subscriber_model.collection_name,
+        campaign_type,
+        {**payload.model_dump(), "tracking_name": engagement_tenant(analytics)},
+        worker_id
+    )
+    background_tasks.add_task(outbox.enqueue, campaign_id, worker_id)
+    return {"campaign_id": str(campaign_id), "status": "enqueueing"}
+
+
+@router.get("/outbox/{campaign_id}", response_model=dict[str, str | int | dict[str, int]])
+def get_outbox_campaign_stats(
+    campaign_id: str,
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    outbox = Outbox()
+    campaign = get_outbox_campaign(campaign_id, subscriber_model, outbox)
+    return {
+        "campaign_id": campaign_id,
+        "status": campaign["status"],
+        "enqueued": campaign.get("enqueued", 0),
+        "messages": outbox.stats(campaign["_id"]),
+    }
+
+
+@router.post("/outbox/{campaign_id}/retry-dead", response_model=dict[str, int])
+def retry_dead_messages(
+    campaign_id: str,
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    """Move dead-lettered messages of a campaign back to pending."""
+    outbox = Outbox()
+    campaign = get_outbox_campaign(campaign_id, subscriber_model, outbox)
+    return {"requeued": outbox.retry_dead(campaign["_id"])}
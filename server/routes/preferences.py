@@ -0,0 +1,57 @@
+from html import escape
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import HTMLResponse
+
+from ..services.preferences import preference_buffer, read_preference_token
+
+router = APIRouter(prefix="/preferences", tags=["Preferences"])
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><meta name="robots" content="noindex">
+<title>Email preferences</title></head>
+<body>{body}</body></html>"""
+
+
+def read_token(token: str) -> dict:
+    try:
+        return read_preference_token(token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid link: {e}")
+
+
+def describe(payload: dict) -> tuple[str, str]:
+    campaign = "all campaigns" if payload["k"] == "*" else payload["k"]
+    return ("Subscribe to" if payload["v"] else "Unsubscribe from"), campaign
+
+
+def apply_token(token: str) -> dict[str, str]:
+    payload = read_token(token)
+    result = preference_buffer.apply(payload["c"], payload["s"], payload["k"], payload["v"])
+    _, campaign = describe(payload)
+    action = "subscribed to" if payload["v"] else "unsubscribed from"
+    return {"status": result, "message": f"You have been {action} {campaign}."}
+
+
+@router.get("/{token}", response_class=HTMLResponse)
+def confirm_preference_link(token: str):
+    """
+    Confirmation page for a signed link in an email; no authentication needed.
+
+    Nothing changes on GET, since mail scanners and link prefetchers open
+    links too. The page's button POSTs to the same URL.
+    """
+    action, campaign = describe(read_token(token))
+    return PAGE.format(body=(
+        f"<p>{escape(action)} {escape(campaign)}?</p>"
+        f'<form method="post"><button type="submit">{escape(action)} {escape(campaign)}</button></form>'
+    ))
+
+
+@router.post("/{token}", response_model=dict[str, str])
+def apply_preference_one_click(token: str, request: Request):
+    """RFC 8058 one-click unsubscribe (List-Unsubscribe-Post), and the confirmation page's button."""
+    result = apply_token(token)
+    if "text/html" in request.headers.get("accept", ""):
+        return HTMLResponse(PAGE.format(body=f"<p>{escape(result['message'])}</p>"))
+    return result
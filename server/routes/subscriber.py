@@ -1,12 +1,15 @@
 from datetime import datetime, timezone
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from ..schemas import PaginatedResponse
-from ..schemas.subcribers_schema import SubscriberCreate, SubscriberRead, SubscriberUpdate
+from ..schemas.subcribers_schema import SubscriberBulkUpdate, SubscriberCreate, SubscriberRead, SubscriberUpdate
 from ..dependencies import get_subscriber_model
-from ..collections.subscribers import Subscriber
+from ..collections.subscribers import SPARSE_FIELDS, Subscriber, active_filter, campaign_filter, selection_filter
+from ..config.database import read_session
+from ..utils.conditional import is_not_modified, make_etag, not_modified_response, validator_headers
+from ..utils.projection import parse_fields
 
 router = APIRouter(prefix="/subscribers", tags=["Subscribers"])
 
@@ -25,24 +28,78 @@ async def create_subscriber(
     }
 
 
+@router.get("/count", response_model=dict[str, int | dict[str, int]])
+async def count_subscribers(
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    """Total subscribers and per-campaign opt-ins, read from the counter document."""
+    return subscriber_model.get_counters()
+
+
+@router.post("/counters/reconcile", response_model=dict[str, int | dict[str, int]])
+async def reconcile_subscriber_counters(
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    """Recount the collection and repair any drift in the counter document."""
+    return subscriber_model.reconcile_counters()
+
+
+@router.get("/search", response_model=list[dict[str, str]])
+async def search_subscribers(
+    q: str = Query(..., min_length=1, description="Email prefix, e.g. 'jane.d'"),
+    limit: int = Query(10, ge=1, le=25, description="Maximum suggestions to return"),
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    """Prefix search over subscriber emails, sized for a typeahead UI."""
+    return subscriber_model.search_by_email(q, limit=limit)
+
+
 @router.get("/{subscriber_id}", response_model=SubscriberRead)
 async def get_subscriber(
     subscriber_id: str,
+    request: Request,
+    response: Response,
     subscriber_model: Subscriber = Depends(get_subscriber_model)
 ):
+    """Honours If-None-Match / If-Modified-Since; the 304 check reads only `updated_at`."""
+    modified_at = subscriber_model.get_modified_at(subscriber_id)
+    if modified_at is None:
+        raise HTTPException(status_code=404, detail="Subscriber not found")
+    etag = make_etag(subscriber_model.collection_name, subscriber_id, modified_at.isoformat())
+    if is_not_modified(request, etag, modified_at):
+        return not_modified_response(etag, modified_at)
+
     subscriber = subscriber_model.get_by_id(subscriber_id)
     if not subscriber:
         raise HTTPException(status_code=404, detail="Subscriber not found")
+    response.headers.update(validator_headers(etag, modified_at))
     return subscriber
 
 
 @router.get("/", response_model=PaginatedResponse[SubscriberRead])
 async def list_subscribers(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 50,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. 'email,campaigns.marketing'"),
     subscriber_model: Subscriber = Depends(get_subscriber_model)
 ):
-    return subscriber_model.list(skip=skip, limit=limit)
+    """
+    The ETag follows the collection's write version, so an unchanged page
+    costs one counter read. With `fields`, only those fields are fetched and
+    returned (`_id` only when listed), skipping model validation.
+    """
+    names = parse_fields(fields, SPARSE_FIELDS) if fields else None
+    with read_session() as session:
+        etag = make_etag(subscriber_model.collection_name, subscriber_model.get_version(session), skip, limit, names)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        if names:
+            page = subscriber_model.list_fields(names, skip=skip, limit=limit, session=session)
+            return JSONResponse(page, headers=validator_headers(etag))
+        response.headers.update(validator_headers(etag))
+        return subscriber_model.list(skip=skip, limit=limit, session=session)
 
 
 @router.put("/{subscriber_id}", response_model=bool)
@@ -58,6 +115,21 @@ async def update_subscriber(
     return updated
 
 
+@router.post("/campaigns/bulk", response_model=dict[str, int | dict[str, int]])
+def bulk_update_campaigns(
+    payload: SubscriberBulkUpdate,
+    subscriber_model: Subscriber = Depends(get_subscriber_model)
+):
+    """
+    Set campaign flags for a cohort in one call: either `ids` (up to 50,000)
+    or a `filter` with the export filters (`email_filter`, `active_only`).
+    """
+    if payload.ids is not None:
+        return subscriber_model.bulk_update_campaigns(payload.campaigns, subscriber_ids=payload.ids)
+    filters = selection_filter(payload.filter.email_filter, payload.filter.active_only, subscriber_model.mask_ready())
+    return subscriber_model.bulk_update_campaigns(payload.campaigns, filters=filters)
+
+
 @router.delete("/{subscriber_id}", response_model=bool)
 async def delete_subscriber(
     subscriber_id: str,
@@ -87,26 +159,14 @@ async def export_campaigns_csv(
     - active_only: Only export users with at least one active campaign
     """
     try:
-        # Build query filter
-        query_filter = {}
-        
-        if email_filter:
-            query_filter["email"] = {"$regex": email_filter, "$options": "i"}
-        
-        if active_only:
-            query_filter["$or"] = [
-                {"campaigns.updates": True},
-                {"campaigns.marketing": True},
-                {"campaigns.announcements": True},
-                {"campaigns.newsletters": True},
-                {"campaigns.seasonal": True}
-            ]
+        query_filter = selection_filter(email_filter, active_only, service.mask_ready())
         
         # Get data from database using existing list method
         paginated_response = service.list(
             filters=query_filter, 
             skip=skip, 
-            limit=limit or 10000  # Default limit if none provided
+            limit=limit or 10000,  # Default limit if none provided
+            operation="exports"
         )
         
         if not paginated_response.items:
@@ -144,20 +204,7 @@ async def export_campaigns_csv_stream(
     Stream large CSV exports in batches for better memory efficiency
     """
     try:
-        # Build query filter
-        query_filter = {}
-        
-        if email_filter:
-            query_filter["email"] = {"$regex": email_filter, "$options": "i"}
-        
-        if active_only:
-            query_filter["$or"] = [
-                {"campaigns.updates": True},
-                {"campaigns.marketing": True},
-                {"campaigns.announcements": True},
-                {"campaigns.newsletters": True},
-                {"campaigns.seasonal": True}
-            ]
+        query_filter = selection_filter(email_filter, active_only, service.mask_ready())
         
         async def generate_csv():
             """Generator function to stream CSV data in batches"""
@@ -173,7 +220,8 @@ async def export_campaigns_csv_stream(
                 paginated_response = service.list(
                     filters=query_filter,
                     skip=current_skip,
-                    limit=min(batch_size, (limit - total_processed) if limit else batch_size)
+                    limit=min(batch_size, (limit - total_processed) if limit else batch_size),
+                    operation="exports"
                 )
                 
                 if not paginated_response.items:
@@ -235,18 +283,10 @@ async def export_active_campaigns_csv(
 ):
     """Export only users with active campaigns"""
     
-    query_filter = {
-        "$or": [
-            {"campaigns.updates": True},
-            {"campaigns.marketing": True},
-            {"campaigns.announcements": True},
-            {"campaigns.newsletters": True},
-            {"campaigns.seasonal": True}
-        ]
-    }
+    query_filter = active_filter(service.mask_ready())
     
     try:
-        paginated_response = service.list(filters=query_filter)
+        paginated_response = service.list(filters=query_filter, operation="exports")
         
         if not paginated_response.items:
             raise HTTPException(status_code=404, detail="No active campaigns found")
@@ -287,10 +327,10 @@ async def export_by_campaign_type(
             detail=f"Invalid campaign type. Must be one of: {', '.join(valid_campaigns)}"
         )
     
-    query_filter = {f"campaigns.{campaign_type}": enabled}
+    query_filter = campaign_filter(campaign_type, enabled, service.mask_ready())
     
     try:
-        paginated_response = service.list(filters=query_filter)
+        paginated_response = service.list(filters=query_filter, operation="exports")
         
         if not paginated_response.items:
             status = "enabled" if enabled else "disabled"
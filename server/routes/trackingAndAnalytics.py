@@ -1,12 +1,19 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import RedirectResponse
 
 from ..dependencies import get_analytics_model
 from ..collections.trackingAndAnalytics import TrackerAndAnalytics
+from ..services.engagement import PIXEL, engagement_aggregator, read_engagement_token
+from ..services.reports import report_range, tenant_traffic_reports
+from ..utils.signing import TokenError
 
 router = APIRouter(prefix="/tracking", tags=["Tracking and Analytics"])
 
+NO_STORE = {"Cache-Control": "no-store, private"}
+
 @router.post("/visitors")
 def increase_visitor_count(
     analytics: TrackerAndAnalytics = Depends(get_analytics_model)
@@ -21,10 +28,7 @@ def get_visitor_count(
     analytics: TrackerAndAnalytics = Depends(get_analytics_model)
 ):
     try:
-        return {
-            "count": analytics.get_visitor_count(),
-            "nonunique_count": analytics.get_non_unique_visitor_count()
-        }
+        return analytics.get_today_counts()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -89,3 +93,84 @@ def get_visitor_count_range(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/visitors/report")
+def get_visitor_report(
+    start_date: Optional[date] = Query(None, description="First UTC day (YYYY-MM-DD), defaults to 89 days before end_date"),
+    end_date: Optional[date] = Query(None, description="Last UTC day (YYYY-MM-DD), defaults to today"),
+    analytics: TrackerAndAnalytics = Depends(get_analytics_model)
+):
+    """
+    Daily visitors with precomputed trends: 7/28-day moving averages,
+    week-over-week and month-over-month change, and percentiles.
+    Missing days count as zero.
+    """
+    start_date, end_date = report_range(start_date, end_date)
+    return tenant_traffic_reports([analytics], start_date, end_date)[analytics.name]
+
+
+@router.get("/visitors/count/tz")
+def get_visitor_count_by_timezone(
+    tz: str = Query("UTC", description="IANA timezone name, e.g. 'Africa/Lagos'"),
+    start_date: Optional[date] = Query(None, description="First local day (YYYY-MM-DD), defaults to today in tz"),
+    end_date: Optional[date] = Query(None, description="Last local day (YYYY-MM-DD), defaults to start_date"),
+    analytics: TrackerAndAnalytics = Depends(get_analytics_model)
+):
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        # ValueError covers malformed keys such as absolute paths
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz}")
+
+    try:
+        return analytics.get_visitor_count_by_timezone(tz, start_date, end_date)
+    except ValueError as e:
+        # Checked after the defaults, so an end_date before today is caught too
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/campaigns/{campaign_id}/engagement")
+def get_campaign_engagement(
+    campaign_id: str,
+    start_date: Optional[date] = Query(None, description="First UTC day (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last UTC day (YYYY-MM-DD)"),
+    analytics: TrackerAndAnalytics = Depends(get_analytics_model)
+):
+    """Opens and clicks of a dispatched or enqueued campaign. Counts are flushed every few seconds."""
+    try:
+        if start_date and end_date and start_date > end_date:
+            raise HTTPException(status_code=400, detail="start_date must be before or equal to end_date")
+
+        return analytics.get_campaign_engagement(campaign_id, start_date, end_date)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Endpoints hit from inside sent emails. They are unauthenticated (the token
+# is signed) and only bump in-memory counters, which are flushed in bulk.
+
+@router.get("/o/{token}.gif", include_in_schema=False)
+async def track_open(token: str):
+    try:
+        payload = read_engagement_token(token)
+        engagement_aggregator.record_open(payload["n"], payload["m"])
+    except (TokenError, KeyError):
+        # Mail clients show a broken image for errors, so always serve the pixel
+        pass
+    return Response(content=PIXEL, media_type="image/gif", headers=NO_STORE)
+
+
+@router.get("/c/{token}", include_in_schema=False)
+async def track_click(token: str):
+    try:
+        payload = read_engagement_token(token)
+        url = payload["u"]
+    except (TokenError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid or expired link")
+    engagement_aggregator.record_click(payload["n"], payload["m"], url)
+    return RedirectResponse(url, status_code=status.HTTP_302_FOUND, headers=NO_STORE)
@@ -0,0 +1,38 @@
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..collections.webhooks import Webhook
+from ..dependencies import get_webhook_model
+from ..schemas.webhook_schema import WebhookCreate, WebhookRead
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+@router.post("/", response_model=dict[str, Any], status_code=status.HTTP_201_CREATED)
+def create_webhook(
+    payload: WebhookCreate,
+    webhook_model: Webhook = Depends(get_webhook_model)
+):
+    """
+    Register an endpoint for subscriber events. Deliveries are POSTs of
+    `{"events": [...]}` signed with the returned `secret`, which is shown
+    only once.
+    """
+    return webhook_model.create(payload)
+
+
+@router.get("/", response_model=list[WebhookRead])
+def list_webhooks(
+    webhook_model: Webhook = Depends(get_webhook_model)
+):
+    return webhook_model.list()
+
+
+@router.delete("/{webhook_id}", response_model=bool)
+def delete_webhook(
+    webhook_id: str,
+    webhook_model: Webhook = Depends(get_webhook_model)
+):
+    if not webhook_model.delete(webhook_id):
+        raise HTTPException(status_code=404, detail="Webhook not found")
+    return True
@@ -0,0 +1,37 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+
+
+class CampaignDispatchRequest(BaseModel):
+    """
+    `subject`, `html` and `text` are Jinja2 templates. Per recipient they can
+    use `email`, `subscriber_id` and `campaigns`; `context` supplies
+    campaign-wide values.
+    """
+    subject: str = Field(..., min_length=1)
+    html: str = ""
+    text: str = ""
+    context: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchLatency(BaseModel):
+    p50: float
+    p95: float
+    max: float
+
+
+class DispatchReportRead(BaseModel):
+    id: str
+    campaign_type: str
+    status: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    sent: int
+    failed: int
+    batches: int
+    elapsed_seconds: float
+    messages_per_second: float
+    batch_latency_ms: BatchLatency
+    failures: list[dict[str, str]] = Field(default_factory=list)
+    error: Optional[str] = None
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator, model_validator
+from typing import List, Optional
 
 from ..utils import PyObjectId
 
@@ -12,6 +12,25 @@ class CampaignObj(BaseModel):
     newsletters: bool = True
     seasonal: bool = True
 
+    def to_mask(self) -> int:
+        """Pack the flags into the `campaign_mask` integer stored next to them."""
+        return campaign_mask(self.model_dump())
+
+    @classmethod
+    def from_mask(cls, mask: int) -> "CampaignObj":
+        return cls(**{name: bool(mask & bit) for name, bit in CAMPAIGN_BITS.items()})
+
+
+# One bit per campaign type, in field order. Append new types at the end:
+# existing bits must keep their positions.
+CAMPAIGN_BITS = {name: 1 << position for position, name in enumerate(CampaignObj.model_fields)}
+ALL_CAMPAIGNS_MASK = sum(CAMPAIGN_BITS.values())
+
+
+def campaign_mask(campaigns: Optional[dict]) -> int:
+    """Mask of the truthy flags in a `campaigns` subdocument; missing flags count as off."""
+    return sum(bit for name, bit in CAMPAIGN_BITS.items() if (campaigns or {}).get(name))
+
 
 class SubscriberCreate(BaseModel):
     email: EmailStr
@@ -43,3 +62,32 @@ class SubscriberUpdate(BaseModel):
     updated_at: Optional[datetime] = Field(
         default_factory=lambda: datetime.now(timezone.utc)
     )
+
+
+class SubscriberSelection(BaseModel):
+    """Same filters as the CSV exports."""
+    email_filter: Optional[str] = None
+    active_only: bool = False
+
+
+class SubscriberBulkUpdate(BaseModel):
+    """Set campaign flags on many subscribers, chosen by `ids` or by `filter`."""
+    campaigns: dict[str, bool]
+    ids: Optional[List[str]] = Field(None, max_length=50000)
+    filter: Optional[SubscriberSelection] = None
+
+    @field_validator("campaigns")
+    @classmethod
+    def known_campaigns(cls, value: dict[str, bool]) -> dict[str, bool]:
+        unknown = set(value) - set(CAMPAIGN_BITS)
+        if unknown:
+            raise ValueError(f"Unknown campaign types: {', '.join(sorted(unknown))}")
+        if not value:
+            raise ValueError("campaigns must set at least one flag")
+        return value
+
+    @model_validator(mode="after")
+    def one_selection(self) -> "SubscriberBulkUpdate":
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Give exactly one of ids or filter")
+        return self
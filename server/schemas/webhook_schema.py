@@ -0,0 +1,48 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, HttpUrl, field_validator
+from typing import List
+
+from ..config.app_config import app_config
+from ..utils import PyObjectId
+from ..utils.network import resolve_public_host
+
+# Event types delivered to webhook endpoints
+WEBHOOK_EVENTS = (
+    "subscriber.created",
+    "subscriber.updated",
+    "subscriber.deleted",
+    "subscribers.bulk_updated",
+)
+
+
+class WebhookCreate(BaseModel):
+    url: HttpUrl
+    events: List[str] = Field(default_factory=lambda: list(WEBHOOK_EVENTS))
+
+    @field_validator("url")
+    @classmethod
+    def public_host(cls, value: HttpUrl) -> HttpUrl:
+        # Deliveries check again, in case the name is re-pointed later
+        if not app_config.WEBHOOK.ALLOW_PRIVATE_NETWORKS:
+            resolve_public_host(value.host, value.port)
+        return value
+
+    @field_validator("events")
+    @classmethod
+    def known_events(cls, value: List[str]) -> List[str]:
+        unknown = set(value) - set(WEBHOOK_EVENTS)
+        if unknown:
+            raise ValueError(f"Unknown events: {', '.join(sorted(unknown))}")
+        if not value:
+            raise ValueError("events must name at least one event")
+        return value
+
+
+class WebhookRead(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    url: str
+    events: List[str]
+    created_at: datetime
+
+    class Config:
+        populate_by_name = True
@@ -0,0 +1,289 @@
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+import bson
+from bson import json_util
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from ..collections.subscribers import Subscriber
+from ..config.app_config import app_config
+from ..config.database import get_db
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+FORMATS = {"bson": ".bson.gz", "ndjson": ".ndjson.gz"}
+# Fast zlib level: dumps are bound by compression well before the network
+COMPRESS_LEVEL = 3
+# Collections smaller than this are dumped as a single part
+MIN_PART_DOCUMENTS = 10000
+DUPLICATE_KEY = 11000
+
+_RAW = CodecOptions(document_class=RawBSONDocument)
+
+
+def _raw_reads(collection: Any) -> Any:
+    """Read documents as undecoded BSON where the driver supports it (MongoDB, not SQLite)."""
+    return collection.with_options(codec_options=_RAW) if isinstance(collection, Collection) else collection
+
+
+def _id_ranges(collection: Any, parts: int) -> list[tuple[Any, Any]]:
+    """
+    Split `collection` into about `parts` `_id` ranges of similar size.
+
+    Boundaries are found by skipping along the `_id` index, so only index
+    keys are read. Ranges are half-open; the first and last are unbounded.
+    """
+    total = collection.count_documents({})
+    parts = min(parts, max(total // MIN_PART_DOCUMENTS, 1))
+    bounds = []
+    for part in range(1, parts):
+        doc = next(iter(collection.find({}, {"_id": 1}).sort("_id", 1).skip(part * total // parts).limit(1)), None)
+        if doc is not None and (not bounds or doc["_id"] != bounds[-1]):
+            bounds.append(doc["_id"])
+    edges = [None, *bounds, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _range_filter(low: Any, high: Any) -> dict[str, Any]:
+    condition = {}
+    if low is not None:
+        condition["$gte"] = low
+    if high is not None:
+        condition["$lt"] = high
+    return {"_id": condition} if condition else {}
+
+
+def _encode(doc: Any, fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return json_util.dumps(doc, json_options=json_util.CANONICAL_JSON_OPTIONS).encode() + b"\n"
+    return doc.raw if isinstance(doc, RawBSONDocument) else bson.encode(doc)
+
+
+def _decode(handle: Any, fmt: str, raw: bool) -> Iterator[Any]:
+    if fmt == "ndjson":
+        for line in handle:
+            if line.strip():
+                yield json_util.loads(line, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    else:
+        yield from bson.decode_file_iter(handle, _RAW if raw else CodecOptions())
+
+
+class Throughput:
+    """Documents and bytes moved per collection, for docs/s reporting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.collections: dict[str, dict[str, Any]] = {}
+
+    def add(self, name: str, documents: int, size: int, started: float, skipped: int = 0) -> None:
+        finished = time.perf_counter()
+        with self._lock:
+            entry = self.collections.setdefault(
+                name, {"documents": 0, "skipped": 0, "bytes": 0, "first_started": started, "last_finished": finished}
+            )
+            entry["documents"] += documents
+            entry["skipped"] += skipped
+            entry["bytes"] += size
+            entry["first_started"] = min(entry["first_started"], started)
+            entry["last_finished"] = max(entry["last_finished"], finished)
+
+    def report(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        documents = sum(entry["documents"] for entry in self.collections.values())
+        collections = {}
+        for name, entry in self.collections.items():
+            # Wall time from the first part starting to the last finishing, parallel parts overlapping
+            span = entry["last_finished"] - entry["first_started"]
+            collections[name] = {
+                "documents": entry["documents"],
+                "skipped": entry["skipped"],
+                "bytes": entry["bytes"],
+                "seconds": round(span, 3),
+                "docs_per_second": round(entry["documents"] / span, 1) if span else 0.0,
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "documents": documents,
+            "docs_per_second": round(documents / elapsed, 1) if elapsed else 0.0,
+            "collections": collections,
+        }
+
+
+def _tenant_collections(app_name: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    client = get_db()["appClient"].find_one({"name": app_name})
+    if client is None:
+        raise ValueError(f"No app client named {app_name!r}")
+    return client, [
+        {"role": "app_client", "name": "appClient", "filter": {"_id": client["_id"]}},
+        {"role": "subscribers", "name": client["collection_name"]},
+        {"role": "tracking", "name": f"{app_name}_tracking_and_analytics"},
+    ]
+
+
+def _dump_part(collection: Any, query: dict[str, Any], path: str, fmt: str, batch_size: int,
+               stats: Throughput) -> dict[str, Any]:
+    started = time.perf_counter()
+    documents = 0
+    with gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL) as handle:
+        chunk = []
+        for doc in collection.find(query).batch_size(batch_size):
+            chunk.append(_encode(doc, fmt))
+            if len(chunk) >= batch_size:
+                handle.write(b"".join(chunk))
+                documents += len(chunk)
+                chunk = []
+        handle.write(b"".join(chunk))
+        documents += len(chunk)
+    size = os.path.getsize(path)
+    stats.add(collection.name, documents, size, started)
+    return {"path": os.path.basename(path), "documents": documents, "bytes": size}
+
+
+def backup_tenant(app_name: str, directory: str, jobs: int = 4, fmt: str = "bson",
+                  batch_size: int = 1000) -> dict[str, Any]:
+    """
+    Dump one tenant's app client record, subscribers and tracking documents
+    into `directory`, with up to `jobs` `_id` ranges read in parallel.
+
+    Reads use the "exports" read preference. Parts are read independently,
+    so writes made during the backup may be partly included; the
+    subscriber counters are rebuilt on restore rather than copied.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    os.makedirs(directory, exist_ok=True)
+    client, targets = _tenant_collections(app_name)
+    db = get_db("exports")
+    stats = Throughput()
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="backup") as pool:
+        pending = []
+        for target in targets:
+            collection = _raw_reads(db[target["name"]]) if fmt == "bson" else db[target["name"]]
+            if "filter" in target:
+                ranges = [target["filter"]]
+            else:
+                # Twice as many ranges as workers evens out ranges of unequal cost
+                ranges = [_range_filter(low, high) for low, high in _id_ranges(db[target["name"]], jobs * 2)]
+            target["expected"] = db[target["name"]].count_documents(target.get("filter", {}))
+            target["parts"] = [
+                pool.submit(_dump_part, collection, query,
+                            os.path.join(directory, f"{target['role']}.{index:04d}{FORMATS[fmt]}"), fmt, batch_size, stats)
+                for index, query in enumerate(ranges)
+            ]
+            pending.extend(target["parts"])
+        for future in pending:
+            future.result()
+
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "format": fmt,
+        "app_name": app_name,
+        "collection_name": client["collection_name"],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "app_version": app_config.version,
+        "collections": [],
+    }
+    for target in targets:
+        parts = [future.result() for future in target["parts"]]
+        documents = sum(part["documents"] for part in parts)
+        if documents != target["expected"]:
+            # Written to during the dump, or `_id`s of several BSON types (ranges are per type)
+            print(f"Warning: {target['name']} had {target['expected']} document(s) when counted, {documents} dumped")
+        manifest["collections"].append({
+            "role": target["role"],
+            "name": target["name"],
+            "documents": documents,
+            "bytes": sum(part["bytes"] for part in parts),
+            "files": parts,
+        })
+    manifest["throughput"] = stats.report()
+    with open(os.path.join(directory, MANIFEST), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    return manifest
+
+
+def _restore_part(collection: Any, path: str, fmt: str, batch_size: int, stats: Throughput) -> None:
+    started = time.perf_counter()
+    inserted = skipped = 0
+    raw = isinstance(collection, Collection) and fmt == "bson"
+
+    def flush(batch: list[Any]) -> None:
+        nonlocal inserted, skipped
+        try:
+            inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY for error in errors):
+                raise
+            # Already present: a rerun over a partial restore
+            inserted += e.details.get("nInserted", 0)
+            skipped += len(errors)
+
+    with gzip.open(path, "rb") as handle:
+        batch = []
+        for doc in _decode(handle, fmt, raw):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    stats.add(collection.name, inserted, os.path.getsize(path), started, skipped)
+
+
+def restore_tenant(directory: str, jobs: int = 4, batch_size: int = 1000) -> dict[str, Any]:
+    """
+    Load a backup made by `backup_tenant`, each part file on its own worker,
+    with unordered `insert_many` batches. Documents that already exist are
+    counted as skipped, so an interrupted restore can simply be rerun.
+    Subscriber indexes and counters are rebuilt afterwards.
+    """
+    with open(os.path.join(directory, MANIFEST)) as handle:
+        manifest = json.load(handle)
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('manifest_version')}")
+    db = get_db()
+    stats = Throughput()
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="restore") as pool:
+        futures = [
+            pool.submit(_restore_part, db[entry["name"]], os.path.join(directory, part["path"]),
+                        manifest["format"], batch_size, stats)
+            for entry in manifest["collections"]
+            for part in entry["files"]
+        ]
+        for future in futures:
+            future.result()
+
+    # Indexes after the data: building them once is cheaper than maintaining them per insert
+    subscribers = Subscriber(manifest["collection_name"])
+    counters = subscribers.reconcile_counters()
+    # New list version, so ETags issued before the restore stop matching
+    subscribers._bump_counters()
+    return {"app_name": manifest["app_name"], "counters": counters, "throughput": stats.report()}
+
+
+def format_throughput(report: dict[str, Any]) -> str:
+    lines = []
+    for name, entry in report["collections"].items():
+        skipped = f", {entry['skipped']:,} already present" if entry.get("skipped") else ""
+        lines.append(
+            f"  {name}: {entry['documents']:,} docs{skipped}, {entry['bytes'] / 1e6:.1f} MB, "
+            f"{entry['docs_per_second']:,.0f} docs/s"
+        )
+    lines.append(
+        f"  total: {report['documents']:,} docs in {report['elapsed_seconds']:.2f} s "
+        f"({report['docs_per_second']:,.0f} docs/s)"
+    )
+    return "\n".join(lines)
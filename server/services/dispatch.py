@@ -0,0 +1,362 @@
+import asyncio
+import statistics
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator, Optional
+from uuid import uuid4
+
+from pymongo import ASCENDING
+
+from ..config.app_config import SMTPConfig, app_config
+from ..config.database import get_db
+from .smtp import SMTPError, SMTPPool
+from .templates import RenderPool
+from .throttle import DomainScheduler
+
+# recipient document -> RFC 5322 message bytes
+MessageBuilder = Callable[[dict], bytes]
+
+# How many failures a report keeps verbatim; the rest are only counted
+MAX_RECORDED_FAILURES = 100
+# Running reports are saved this often, so any worker can answer progress requests
+PROGRESS_SAVE_SECONDS = 2.0
+REPORT_RETENTION = timedelta(days=30)
+
+_indexes_ready = False
+
+
+async def _cancel_all(tasks: list[asyncio.Future]) -> None:
+    """Cancel `tasks` and wait for all of them to finish."""
+    # Repeated because asyncio.wait_for (3.11) drops a cancellation that
+    # arrives as its inner await completes, e.g. inside an SMTP reply read
+    while pending := [task for task in tasks if not task.done()]:
+        for task in pending:
+            task.cancel()
+        await asyncio.wait(pending, timeout=1)
+    for task in tasks:
+        # Marks errors as retrieved; the first one was already reported by gather
+        task.cancelled() or task.exception()
+
+
+def _reports_collection():
+    global _indexes_ready
+    collection = get_db()["dispatches"]
+    if not _indexes_ready:
+        collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+        _indexes_ready = True
+    return collection
+
+
+class DispatchReport:
+    """Live progress and outcome of one campaign send."""
+
+    def __init__(self, campaign_type: str, collection_name: str = "", dispatch_id: Optional[str] = None):
+        self.id = dispatch_id or uuid4().hex
+        self.campaign_type = campaign_type
+        self.collection_name = collection_name
+        self.status = "pending"
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.sent = 0
+        self.failed = 0
+        self.batch_latencies: list[float] = []
+        self.failures: list[dict[str, str]] = []
+        self.error: Optional[str] = None
+        self._clock_start = 0.0
+        self._clock_end = 0.0
+
+    def start(self) -> None:
+        self.status = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self._clock_start = time.perf_counter()
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.status = "failed" if error else "completed"
+        self.error = error
+        self.finished_at = datetime.now(timezone.utc)
+        self._clock_end = time.perf_counter()
+
+    def record_failure(self, email: str, reason: str) -> None:
+        self.failed += 1
+        if len(self.failures) < MAX_RECORDED_FAILURES:
+            self.failures.append({"email": email, "error": reason})
+
+    @property
+    def elapsed(self) -> float:
+        if not self._clock_start:
+            return 0.0
+        return (self._clock_end or time.perf_counter()) - self._clock_start
+
+    def to_dict(self) -> dict[str, Any]:
+        latencies = sorted(self.batch_latencies)
+        return {
+            "id": self.id,
+            "campaign_type": self.campaign_type,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "sent": self.sent,
+            "failed": self.failed,
+            "batches": len(latencies),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "messages_per_second": round(self.sent / self.elapsed, 2) if self.elapsed else 0.0,
+            "batch_latency_ms": {
+                "p50": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+                "p95": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2) if latencies else 0.0,
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+    def save(self) -> None:
+        """Write the report to the `dispatches` collection (blocking); errors are logged, not raised."""
+        try:
+            _reports_collection().replace_one(
+                {"_id": self.id},
+                {
+                    **self.to_dict(),
+                    "collection_name": self.collection_name,
+                    "expires_at": datetime.now(timezone.utc) + REPORT_RETENTION,
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Saving dispatch report {self.id} failed:", e)
+
+
+class CampaignDispatcher:
+    """
+    Sends recipient batches through a pool of persistent SMTP sessions.
+
+    Recipient batches come from a blocking iterator (usually a Mongo cursor),
+    which is advanced in a worker thread so the event loop never blocks on
+    the database. Each batch is sent by one worker on one pooled connection.
+    `concurrency` workers keep the pool busy. With a `render_pool`, batches
+    are rendered in worker processes instead of on the event loop. With a
+    `scheduler`, batches are regrouped per recipient domain and released
+    within each domain's budget, and 4xx replies are retried later.
+    """
+
+    def __init__(
+        self,
+        config: SMTPConfig,
+        pool: Optional[SMTPPool] = None,
+        concurrency: Optional[int] = None,
+        render_pool: Optional[RenderPool] = None,
+        scheduler: Optional[DomainScheduler] = None,
+    ):
+        self.config = config
+        self.pool = pool or SMTPPool(config)
+        self.concurrency = concurrency or self.pool.size
+        self.render_pool = render_pool
+        self.scheduler = scheduler
+
+    async def dispatch(
+        self,
+        batches: Iterable[list[dict]],
+        build_message: MessageBuilder,
+        report: DispatchReport,
+    ) -> DispatchReport:
+        report.start()
+        if self.scheduler:
+            workers = self._scheduled(batches, build_message, report, self.scheduler)
+        else:
+            workers = self._unscheduled(batches, build_message, report)
+
+        tasks = [asyncio.ensure_future(worker) for worker in workers]
+        progress = asyncio.create_task(self._save_progress(report))
+        error = None
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            error = "Interrupted by shutdown"
+            raise
+        except Exception as e:
+            error = str(e)
+        finally:
+            # gather returns on the first error; the other workers must stop
+            # before their SMTP sessions are closed
+            await _cancel_all([progress, *tasks])
+            await self.pool.close()
+            report.finish(error)
+            await asyncio.to_thread(report.save)
+        return report
+
+    @staticmethod
+    async def _save_progress(report: DispatchReport) -> None:
+        while True:
+            await asyncio.to_thread(report.save)
+            await asyncio.sleep(PROGRESS_SAVE_SECONDS)
+
+    def _unscheduled(self, batches: Iterable[list[dict]], build_message: MessageBuilder, report: DispatchReport) -> list:
+        queue: asyncio.Queue[Optional[list[dict]]] = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def produce():
+            iterator: Iterator[list[dict]] = iter(batches)
+            while True:
+                batch = await asyncio.to_thread(next, iterator, None)
+                if batch is None:
+                    break
+                await queue.put(batch)
+            # Not in a finally: after an error the consumers are cancelled, and
+            # nobody would drain a full queue
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                await self._send_batch(batch, build_message, report)
+
+        return [produce(), *(consume() for _ in range(self.concurrency))]
+
+    def _scheduled(
+        self,
+        batches: Iterable[list[dict]],
+        build_message: MessageBuilder,
+        report: DispatchReport,
+        scheduler: DomainScheduler,
+    ) -> list:
+        async def produce():
+            iterator: Iterator[list[dict]] = iter(batches)
+            try:
+                while True:
+                    batch = await asyncio.to_thread(next, iterator, None)
+                    if batch is None:
+                        break
+                    await scheduler.put(batch)
+            finally:
+                scheduler.close()
+
+        async def consume():
+            while True:
+                item = await scheduler.next_batch(self.config.BATCH_SIZE)
+                if item is None:
+                    return
+                domain, batch = item
+                deferred: list[tuple[dict, str]] = []
+                sent = 0
+                try:
+                    sent = await self._send_batch(batch, build_message, report, deferred)
+                finally:
+                    for recipient, error in scheduler.done(domain, sent, deferred):
+                        report.record_failure(recipient["email"], error)
+
+        return [produce(), *(consume() for _ in range(self.concurrency))]
+
+    async def _render(self, batch: list[dict], build_message: MessageBuilder, report: DispatchReport) -> list[tuple[dict, bytes]]:
+        if self.render_pool:
+            return list(zip(batch, await self.render_pool.render(batch)))
+        rendered = []
+        for recipient in batch:
+            try:
+                rendered.append((recipient, build_message(recipient)))
+            except Exception as e:
+                report.record_failure(recipient.get("email", ""), f"Render failed: {e}")
+        return rendered
+
+    async def _send_batch(
+        self,
+        batch: list[dict],
+        build_message: MessageBuilder,
+        report: DispatchReport,
+        deferred: Optional[list[tuple[dict, str]]] = None,
+    ) -> int:
+        """
+        Send one batch and return how many messages were accepted. With a
+        `deferred` list, recipients that get a 4xx reply are collected there
+        instead of being reported as failed.
+        """
+        started = time.perf_counter()
+        try:
+            pending = await self._render(batch, build_message, report)
+        except Exception as e:
+            for recipient in batch:
+                report.record_failure(recipient.get("email", ""), f"Render failed: {e}")
+            return 0
+        sent = 0
+        last_error = ""
+        # One retry on a fresh connection if the session drops mid-batch
+        for _ in range(2):
+            if not pending:
+                break
+            try:
+                async with self.pool.connection() as connection:
+                    while pending:
+                        recipient, data = pending[0]
+                        try:
+                            await connection.send_message(self.config.FROM_ADDRESS, [recipient["email"]], data)
+                            report.sent += 1
+                            sent += 1
+                        except SMTPError as e:
+                            if e.code == 0:
+                                raise
+                            if deferred is not None and not e.is_permanent:
+                                deferred.append((recipient, str(e)))
+                            else:
+                                report.record_failure(recipient["email"], str(e))
+                        pending.pop(0)
+            except (SMTPError, OSError, asyncio.TimeoutError) as e:
+                last_error = str(e)
+                continue
+        else:
+            for recipient, _ in pending:
+                report.record_failure(recipient["email"], last_error)
+        report.batch_latencies.append(time.perf_counter() - started)
+        return sent
+
+
+# Recent dispatches of this worker process, newest last; other workers read the saved copies
+dispatch_reports: "OrderedDict[str, DispatchReport]" = OrderedDict()
+MAX_TRACKED_DISPATCHES = 100
+_running: set[asyncio.Task] = set()
+
+
+def start_dispatch(
+    batches: Iterable[list[dict]],
+    build_message: MessageBuilder,
+    campaign_type: str,
+    collection_name: str = "",
+    config: Optional[SMTPConfig] = None,
+    render_pool: Optional[RenderPool] = None,
+    dispatch_id: Optional[str] = None,
+) -> DispatchReport:
+    """Run a dispatch in the background of the current event loop."""
+    report = DispatchReport(campaign_type, collection_name, dispatch_id)
+    dispatch_reports[report.id] = report
+    while len(dispatch_reports) > MAX_TRACKED_DISPATCHES:
+        dispatch_reports.popitem(last=False)
+
+    scheduler = DomainScheduler(app_config.THROTTLE) if app_config.THROTTLE.ENABLED else None
+    dispatcher = CampaignDispatcher(config or app_config.SMTP, render_pool=render_pool, scheduler=scheduler)
+    task = asyncio.create_task(dispatcher.dispatch(batches, build_message, report))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return report
+
+
+def load_dispatch_report(dispatch_id: str, collection_name: str) -> Optional[dict[str, Any]]:
+    """A tenant's dispatch report, live when this worker runs it, otherwise as last saved."""
+    report = dispatch_reports.get(dispatch_id)
+    if report is not None:
+        return report.to_dict() if report.collection_name == collection_name else None
+    return _reports_collection().find_one({"_id": dispatch_id, "collection_name": collection_name})
+
+
+async def stop_dispatches() -> None:
+    """Cancel this worker's running dispatches and wait until their reports are saved."""
+    await _cancel_all(list(_running))
+
+
+def dispatch_stats() -> dict[str, Any]:
+    reports = list(dispatch_reports.values())
+    return {
+        "running": sum(1 for r in reports if r.status == "running"),
+        "tracked": len(reports),
+        "sent": sum(r.sent for r in reports),
+        "failed": sum(r.failed for r in reports),
+    }
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from pymongo import UpdateOne
+
+from ..config.app_config import EngagementConfig, app_config
+from ..config.database import get_db
+from ..utils.signing import sign_token, verify_token
+
+ENGAGEMENT_PURPOSE = "engagement"
+
+# 1x1 transparent GIF
+PIXEL = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+    b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+
+def link_key(url: str) -> str:
+    """Stable short key for a link; URLs cannot be used as field names."""
+    return hashlib.sha1(url.encode()).hexdigest()[:12]
+
+
+def engagement_token(name: str, campaign_id: str, url: Optional[str] = None) -> str:
+    payload = {"n": name, "m": campaign_id}
+    if url is not None:
+        payload["u"] = url
+    return sign_token(payload, ENGAGEMENT_PURPOSE, app_config.ENGAGEMENT.TOKEN_TTL_DAYS * 86400)
+
+
+def read_engagement_token(token: str) -> dict[str, Any]:
+    return verify_token(token, ENGAGEMENT_PURPOSE)
+
+
+def open_pixel_url(name: str, campaign_id: str, base_url: Optional[str] = None) -> str:
+    base = (base_url or app_config.PUBLIC_BASE_URL).rstrip("/")
+    return f"{base}/tracking/o/{engagement_token(name, campaign_id)}.gif"
+
+
+def click_url(name: str, campaign_id: str, url: str, base_url: Optional[str] = None) -> str:
+    # The destination travels inside the signed token, so the redirect cannot be abused
+    base = (base_url or app_config.PUBLIC_BASE_URL).rstrip("/")
+    return f"{base}/tracking/c/{engagement_token(name, campaign_id, url)}"
+
+
+class EngagementAggregator:
+    """
+    In-memory open/click counters, flushed as bulk `$inc` upserts.
+
+    Request handlers only bump a counter under a lock. Counts are keyed by
+    (tenant, campaign, day, link) and written to the tenant's tracking
+    collection every `FLUSH_INTERVAL` seconds, when `MAX_KEYS` distinct keys
+    are pending, and on shutdown. A failed flush is merged back for the next
+    one.
+    """
+
+    def __init__(self, settings: EngagementConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._opens: Counter = Counter()
+        self._clicks: Counter = Counter()
+        self._urls: dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.flushes = 0
+        self.documents_written = 0
+
+    @staticmethod
+    def _day() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def record_open(self, name: str, campaign_id: str) -> None:
+        with self._lock:
+            self._opens[(name, campaign_id, self._day())] += 1
+            self.recorded += 1
+            pending = len(self._opens) + len(self._clicks)
+        self._maybe_request_flush(pending)
+
+    def record_click(self, name: str, campaign_id: str, url: str) -> None:
+        key = link_key(url)
+        with self._lock:
+            self._clicks[(name, campaign_id, self._day(), key)] += 1
+            self._urls[key] = url
+            self.recorded += 1
+            pending = len(self._opens) + len(self._clicks)
+        self._maybe_request_flush(pending)
+
+    def _maybe_request_flush(self, pending: int) -> None:
+        if pending >= self.settings.MAX_KEYS and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def _take(self) -> tuple[Counter, Counter, dict[str, str]]:
+        with self._lock:
+            taken = self._opens, self._clicks, self._urls
+            self._opens, self._clicks, self._urls = Counter(), Counter(), {}
+        return taken
+
+    def _restore(self, opens: Counter, clicks: Counter, urls: dict[str, str]) -> None:
+        with self._lock:
+            self._opens.update(opens)
+            self._clicks.update(clicks)
+            self._urls.update(urls)
+
+    def flush(self) -> int:
+        opens, clicks, urls = self._take()
+        if not opens and not clicks:
+            return 0
+
+        # One upsert per (tenant, campaign, day) document
+        updates: dict[tuple[str, str, str], dict[str, Any]] = {}
+        for (name, campaign_id, day), count in opens.items():
+            update = updates.setdefault((name, campaign_id, day), {"$inc": {}, "$set": {}})
+            update["$inc"]["opens"] = count
+        for (name, campaign_id, day, key), count in clicks.items():
+            update = updates.setdefault((name, campaign_id, day), {"$inc": {}, "$set": {}})
+            update["$inc"]["clicks"] = update["$inc"].get("clicks", 0) + count
+            update["$inc"][f"links.{key}.clicks"] = count
+            update["$set"][f"links.{key}.url"] = urls[key]
+
+        by_tenant: dict[str, list[UpdateOne]] = {}
+        for (name, campaign_id, day), update in updates.items():
+            update["$set"].update({"campaign_id": campaign_id, "date": day})
+            by_tenant.setdefault(name, []).append(
+                UpdateOne({"_id": f"{name}_e_{campaign_id}_{day}"}, update, upsert=True)
+            )
+
+        written = 0
+        done: set[str] = set()
+        try:
+            for name, operations in by_tenant.items():
+                get_db()[f"{name}_tracking_and_analytics"].bulk_write(operations, ordered=False)
+                written += len(operations)
+                done.add(name)
+        except Exception as e:
+            print("Engagement flush failed, will retry:", e)
+            # $inc upserts are not idempotent, so only tenants not yet written are retried
+            self._restore(
+                Counter({k: v for k, v in opens.items() if k[0] not in done}),
+                Counter({k: v for k, v in clicks.items() if k[0] not in done}),
+                urls,
+            )
+        self.flushes += 1
+        self.documents_written += written
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.settings.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            pending = len(self._opens) + len(self._clicks)
+        return {
+            "recorded": self.recorded,
+            "pending_keys": pending,
+            "flushes": self.flushes,
+            "documents_written": self.documents_written,
+        }
+
+
+engagement_aggregator = EngagementAggregator(app_config.ENGAGEMENT)
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from typing import Any, Optional
+
+from bson import ObjectId
+
+from ..collections.outbox import Outbox
+from ..config.app_config import OutboxConfig, SMTPConfig, app_config
+from .dispatch import MessageBuilder
+from .smtp import SMTPError, SMTPPool
+from .templates import CampaignRenderer
+
+
+class OutboxWorker:
+    """
+    Claims leased batches from the outbox and sends them over pooled SMTP sessions.
+
+    Each message is acknowledged as soon as the relay accepts it. If the
+    worker crashes, only a message whose 250 arrived but whose ack was not
+    yet written can be sent again after its lease expires. Its Message-ID
+    is derived from the outbox id, so downstream systems can deduplicate
+    even that case. Leases of the batch in flight are renewed every third
+    of `LEASE_SECONDS`, so a slow batch is not claimed by another worker.
+
+    Between batches the worker also takes over enqueueing of campaigns
+    whose enqueuer stopped, e.g. an API worker that died mid-enqueue.
+    """
+
+    def __init__(
+        self,
+        smtp: SMTPConfig,
+        settings: OutboxConfig,
+        outbox: Optional[Outbox] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.smtp = smtp
+        self.settings = settings
+        self.outbox = outbox or Outbox()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.pool = SMTPPool(smtp)
+        self._builders: dict[ObjectId, Optional[MessageBuilder]] = {}
+        # Ids of the batch in flight whose lease this worker still holds
+        self._held: set[ObjectId] = set()
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.lost_leases = 0
+        self.enqueued = 0
+        self.started = time.perf_counter()
+
+    def _builder(self, campaign_id: ObjectId) -> Optional[MessageBuilder]:
+        if campaign_id not in self._builders:
+            campaign = self.outbox.get_campaign(campaign_id)
+            self._builders[campaign_id] = CampaignRenderer(
+                self.smtp.FROM_ADDRESS,
+                campaign["subject"],
+                campaign.get("html", ""),
+                campaign.get("text", ""),
+                campaign.get("context", {}),
+                campaign.get("campaign_type", ""),
+                campaign.get("collection_name", ""),
+                app_config.PUBLIC_BASE_URL,
+                campaign.get("tracking_name", ""),
+                str(campaign_id),
+            ) if campaign else None
+        return self._builders[campaign_id]
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        stop = stop or asyncio.Event()
+        print(f"Outbox worker {self.worker_id} started")
+        enqueue_stop = threading.Event()
+        enqueueing: Optional[asyncio.Task] = None
+        try:
+            while not stop.is_set():
+                if enqueueing is None or enqueueing.done():
+                    campaign = await asyncio.to_thread(self.outbox.claim_enqueue, self.worker_id)
+                    if campaign:
+                        enqueueing = asyncio.create_task(self._enqueue(campaign["_id"], enqueue_stop))
+                batch = await asyncio.to_thread(
+                    self.outbox.claim, self.worker_id, self.settings.BATCH_SIZE, self.settings.LEASE_SECONDS
+                )
+                if not batch:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=self.settings.IDLE_SLEEP_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.process(batch)
+        finally:
+            # An unfinished enqueue hands its campaign back after the current batch
+            enqueue_stop.set()
+            if enqueueing:
+                await asyncio.gather(enqueueing, return_exceptions=True)
+            await self.pool.close()
+            print(f"Outbox worker {self.worker_id} stopped: {self.stats()}")
+
+    async def _enqueue(self, campaign_id: ObjectId, stop: threading.Event) -> None:
+        print(f"Resuming enqueue of campaign {campaign_id}")
+        try:
+            self.enqueued += await asyncio.to_thread(self.outbox.enqueue, campaign_id, self.worker_id, stop=stop)
+        except Exception as e:
+            # The lease runs out and another worker (or this one) tries again
+            print(f"Enqueue of campaign {campaign_id} failed:", e)
+
+    async def process(self, batch: list[dict]) -> None:
+        self._held = {message["_id"] for message in batch}
+        heartbeat = asyncio.create_task(self._renew_leases())
+        try:
+            # Spread the leased batch over the pool, one slice per connection
+            slices = [batch[i::self.pool.size] for i in range(self.pool.size)]
+            await asyncio.gather(*(self._send_slice(s) for s in slices if s))
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _renew_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.LEASE_SECONDS / 3)
+            if not self._held:
+                continue
+            try:
+                held = await asyncio.to_thread(
+                    self.outbox.renew, list(self._held), self.worker_id, self.settings.LEASE_SECONDS
+                )
+            except Exception as e:
+                print("Renewing outbox leases failed:", e)
+                continue
+            # Acks and failures during the renewal already removed their ids
+            self._held &= held
+
+    async def _send_slice(self, messages: list[dict]) -> None:
+        pending = list(messages)
+        while pending:
+            try:
+                async with self.pool.connection() as connection:
+                    while pending:
+                        message = pending.pop(0)
+                        if message["_id"] not in self._held:
+                            # Expired before it was sent; another worker owns it now
+                            self.lost_leases += 1
+                            continue
+                        try:
+                            builder = self._builder(message["campaign_id"])
+                            if builder is None:
+                                await self._fail(message, "Campaign not found", permanent=True)
+                                continue
+                            data = builder({**message, "message_id": self._message_id(message)})
+                        except Exception as e:
+                            await self._fail(message, f"Render failed: {e}", permanent=True)
+                            continue
+                        try:
+                            await connection.send_message(self.smtp.FROM_ADDRESS, [message["email"]], data)
+                        except SMTPError as e:
+                            if e.code == 0:
+                                pending.insert(0, message)
+                                raise
+                            await self._fail(message, str(e), permanent=e.is_permanent)
+                            continue
+                        self._held.discard(message["_id"])
+                        if await asyncio.to_thread(self.outbox.ack, message["_id"], self.worker_id):
+                            self.sent += 1
+                        else:
+                            self.lost_leases += 1
+            except (SMTPError, OSError, asyncio.TimeoutError) as e:
+                # Connection-level failure: every message not yet handled goes back for retry
+                for message in pending:
+                    await self._fail(message, str(e))
+                return
+
+    def _message_id(self, message: dict) -> str:
+        domain = self.smtp.FROM_ADDRESS.rpartition("@")[2] or "localhost"
+        return f"<{message['_id']}.{message['campaign_id']}@{domain}>"
+
+    async def _fail(self, message: dict, error: str, permanent: bool = False) -> None:
+        self._held.discard(message["_id"])
+        state = await asyncio.to_thread(self.outbox.fail, message, self.worker_id, error, permanent)
+        if state == "dead":
+            self.dead += 1
+        else:
+            self.retried += 1
+
+    def stats(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "worker_id": self.worker_id,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "lost_leases": self.lost_leases,
+            "enqueued": self.enqueued,
+            "messages_per_second": round(self.sent / elapsed, 2) if elapsed else 0.0,
+        }
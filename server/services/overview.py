@@ -0,0 +1,206 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from ..collections.subscribers import Subscriber
+from ..collections.trackingAndAnalytics import TrackerAndAnalytics
+from ..config.app_config import OverviewConfig, app_config
+from ..config.database import get_db
+
+
+def _tenant_row(client: dict[str, Any]) -> dict[str, Any]:
+    """Subscriber counters and today's visitors of one tenant (blocking)."""
+    started = time.perf_counter()
+    counters = Subscriber(client["collection_name"]).get_counters()
+    today = TrackerAndAnalytics(f'{client["name"]}_tracking_and_analytics', client["name"]).get_today_counts()
+    return {
+        "app_name": client["name"],
+        "collection_name": client["collection_name"],
+        "subscribers": counters["total"],
+        "campaigns": counters["campaigns"],
+        "visitors_today": today["count"],
+        "nonunique_visitors_today": today["nonunique_count"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+class TenantOverview:
+    """
+    Per-tenant subscriber and visitor counts for operators.
+
+    Tenants are queried concurrently, at most `CONCURRENCY` at a time, and
+    rows are yielded in completion order so a slow tenant holds back only
+    its own row. A full pass is kept as a snapshot and refreshed in the
+    background every `REFRESH_SECONDS` by one worker, the holder of a lease
+    in the `overview` collection; it saves the snapshot there and the
+    other workers load it from there.
+    """
+
+    def __init__(self, settings: OverviewConfig):
+        self.settings = settings
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._snapshot: Optional[dict[str, Any]] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.leader = False
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @property
+    def collection(self):
+        return get_db()["overview"]
+
+    def _lead(self) -> bool:
+        """Take or renew the refresh lease (blocking); True while this worker holds it."""
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.insert_one({"_id": "lease", "owner": None, "expires_at": now})
+        except DuplicateKeyError:
+            pass
+        result = self.collection.update_one(
+            {"_id": "lease", "$or": [{"owner": self.worker_id}, {"expires_at": {"$lte": now}}]},
+            {"$set": {
+                "owner": self.worker_id,
+                "expires_at": now + timedelta(seconds=3 * self.settings.REFRESH_SECONDS),
+            }}
+        )
+        self.leader = result.matched_count > 0
+        return self.leader
+
+    def _release(self) -> None:
+        """Hand the lease over at once (blocking), so another worker refreshes without waiting for it to expire."""
+        self.collection.update_one(
+            {"_id": "lease", "owner": self.worker_id},
+            {"$set": {"expires_at": datetime.now(timezone.utc)}}
+        )
+        self.leader = False
+
+    def _save(self, snapshot: dict[str, Any]) -> None:
+        self.collection.replace_one({"_id": "snapshot"}, {**snapshot, "_id": "snapshot"}, upsert=True)
+
+    def _load(self) -> Optional[dict[str, Any]]:
+        return self.collection.find_one({"_id": "snapshot"}, {"_id": 0})
+
+    async def _row(self, client: dict[str, Any], slots: asyncio.Semaphore) -> dict[str, Any]:
+        await slots.acquire()
+        work = asyncio.ensure_future(asyncio.to_thread(_tenant_row, client))
+
+        def done(task: asyncio.Future) -> None:
+            # The slot is held until the thread returns, even after a timeout
+            # or cancellation, so no more than CONCURRENCY threads ever run
+            slots.release()
+            task.cancelled() or task.exception()
+
+        work.add_done_callback(done)
+        try:
+            return await asyncio.wait_for(asyncio.shield(work), self.settings.TENANT_TIMEOUT)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.settings.TENANT_TIMEOUT} s"
+        except Exception as e:
+            error = str(e)
+        return {"app_name": client.get("name"), "collection_name": client.get("collection_name"), "error": error}
+
+    async def stream(self) -> AsyncIterator[dict[str, Any]]:
+        """Yield one row per tenant as each completes."""
+        clients = await asyncio.to_thread(
+            lambda: list(get_db()["appClient"].find({}, {"name": 1, "collection_name": 1}))
+        )
+        # Shared by concurrent passes, e.g. a refresh and a live stream
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings.CONCURRENCY)
+        tasks = [asyncio.create_task(self._row(client, self._slots)) for client in clients]
+        try:
+            for next_row in asyncio.as_completed(tasks):
+                yield await next_row
+        finally:
+            # The consumer may stop early, e.g. a client disconnecting mid-stream
+            for task in tasks:
+                task.cancel()
+
+    async def refresh(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        rows = [row async for row in self.stream()]
+        rows.sort(key=lambda row: row.get("app_name") or "")
+        self._snapshot = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "tenants": len(rows),
+            "errors": sum(1 for row in rows if "error" in row),
+            "rows": rows,
+        }
+        self.refreshes += 1
+        return self._snapshot
+
+    async def snapshot(self) -> dict[str, Any]:
+        """
+        The last full pass, from this worker or saved by the refreshing one;
+        computed now if there is none yet. Concurrent callers share one pass.
+        """
+        if self._snapshot is not None:
+            return self._snapshot
+        self._snapshot = await asyncio.to_thread(self._load)
+        if self._snapshot is not None:
+            return self._snapshot
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self.refresh())
+        return await asyncio.shield(self._refreshing)
+
+    async def _refresh_leased(self) -> dict[str, Any]:
+        """`refresh`, renewing the lease every `REFRESH_SECONDS` while a long pass runs."""
+        refreshing = asyncio.create_task(self.refresh())
+        try:
+            while True:
+                done, _ = await asyncio.wait({refreshing}, timeout=self.settings.REFRESH_SECONDS)
+                if done:
+                    return refreshing.result()
+                await asyncio.to_thread(self._lead)
+        finally:
+            refreshing.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await asyncio.to_thread(self._lead):
+                    await asyncio.to_thread(self._save, await self._refresh_leased())
+                else:
+                    self._snapshot = await asyncio.to_thread(self._load) or self._snapshot
+            except Exception as e:
+                self.refresh_errors += 1
+                print("Tenant overview refresh failed:", e)
+            await asyncio.sleep(self.settings.REFRESH_SECONDS)
+
+    def start(self) -> None:
+        # Only worth the background reads when operators can reach the endpoint
+        if self._task is None and app_config.ADMIN_API_KEY and self.settings.REFRESH_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.leader:
+            try:
+                await asyncio.to_thread(self._release)
+            except Exception as e:
+                print("Releasing the tenant overview lease failed:", e)
+
+    def stats(self) -> dict[str, Any]:
+        snapshot = self._snapshot or {}
+        return {
+            "generated_at": snapshot.get("generated_at"),
+            "elapsed_seconds": snapshot.get("elapsed_seconds"),
+            "tenants": snapshot.get("tenants", 0),
+            "errors": snapshot.get("errors", 0),
+            "leader": self.leader,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+        }
+
+
+tenant_overview = TenantOverview(app_config.OVERVIEW)
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from ..collections.subscribers import CAMPAIGN_TYPES, Subscriber
+from ..config.app_config import PreferenceConfig, app_config
+from ..utils.signing import sign_token, verify_token
+
+PREFERENCE_PURPOSE = "preferences"
+
+
+def make_preference_token(
+    collection_name: str,
+    subscriber_id: str,
+    campaign_type: str,
+    enabled: bool = False,
+    expires_in: Optional[int] = None,
+) -> str:
+    """Token that sets `campaigns.<campaign_type>` ("*" for all) to `enabled`."""
+    return sign_token(
+        {"c": collection_name, "s": subscriber_id, "k": campaign_type, "v": enabled},
+        PREFERENCE_PURPOSE,
+        expires_in or app_config.PREFERENCES.TOKEN_TTL_DAYS * 86400,
+    )
+
+
+def is_absolute_base_url(base_url: Optional[str] = None) -> bool:
+    """Whether links built on `base_url` (default PUBLIC_BASE_URL) work outside this server."""
+    parsed = urlparse(base_url or app_config.PUBLIC_BASE_URL)
+    return parsed.scheme in ("http", "https") and bool(parsed.netloc)
+
+
+def preference_url(token: str, base_url: Optional[str] = None) -> str:
+    return f"{(base_url or app_config.PUBLIC_BASE_URL).rstrip('/')}/preferences/{token}"
+
+
+def read_preference_token(token: str) -> dict[str, Any]:
+    payload = verify_token(token, PREFERENCE_PURPOSE)
+    if payload.get("k") != "*" and payload.get("k") not in CAMPAIGN_TYPES:
+        raise ValueError("Unknown campaign type")
+    return payload
+
+
+class PreferenceBuffer:
+    """
+    Coalesces preference changes into bulk_write batches during click spikes.
+
+    Below `BUFFER_SPIKE_THRESHOLD` changes per second each change is written
+    straight away. Above it, changes are grouped by (collection, campaign,
+    value) and flushed when a group reaches `BUFFER_MAX_BATCH`, every
+    `BUFFER_FLUSH_INTERVAL` seconds, and on shutdown.
+    """
+
+    def __init__(self, settings: PreferenceConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str, bool], list[str]] = defaultdict(list)
+        self._window = 0
+        self._window_count = 0
+        self._task: Optional[asyncio.Task] = None
+        self.direct = 0
+        self.buffered = 0
+        self.flushed_batches = 0
+        self.modified = 0
+
+    def _spiking(self) -> bool:
+        second = int(time.monotonic())
+        with self._lock:
+            if second != self._window:
+                self._window, self._window_count = second, 0
+            self._window_count += 1
+            return self._window_count > self.settings.BUFFER_SPIKE_THRESHOLD
+
+    def apply(self, collection_name: str, subscriber_id: str, campaign_type: str, enabled: bool) -> str:
+        """Apply or queue one change; returns "updated", "unchanged" or "queued"."""
+        if not (self.settings.BUFFER_ENABLED and self._spiking()):
+            self.direct += 1
+            changed = Subscriber(collection_name).set_campaign_preference(subscriber_id, campaign_type, enabled)
+            return "updated" if changed else "unchanged"
+
+        full = []
+        with self._lock:
+            for campaign in (CAMPAIGN_TYPES if campaign_type == "*" else (campaign_type,)):
+                key = (collection_name, campaign, enabled)
+                self._pending[key].append(subscriber_id)
+                if len(self._pending[key]) >= self.settings.BUFFER_MAX_BATCH:
+                    full.append((key, self._pending.pop(key)))
+            self.buffered += 1
+        for key, ids in full:
+            self._write(key, ids)
+        return "queued"
+
+    def _write(self, key: tuple[str, str, bool], ids: list[str]) -> None:
+        collection_name, campaign_type, enabled = key
+        try:
+            self.modified += Subscriber(collection_name).set_campaign_preference_bulk(ids, campaign_type, enabled)
+            self.flushed_batches += 1
+        except Exception as e:
+            print(f"Preference flush for {collection_name} failed, will retry:", e)
+            # Opt-outs must not be lost; keep them for the next flush
+            with self._lock:
+                self._pending[key].extend(ids)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+        for key, ids in pending.items():
+            self._write(key, ids)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.BUFFER_FLUSH_INTERVAL)
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self.settings.BUFFER_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            queued = sum(len(ids) for ids in self._pending.values())
+        return {
+            "direct": self.direct,
+            "buffered": self.buffered,
+            "queued": queued,
+            "flushed_batches": self.flushed_batches,
+            "modified": self.modified,
+        }
+
+
+preference_buffer = PreferenceBuffer(app_config.PREFERENCES)
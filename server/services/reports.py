@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..collections.trackingAndAnalytics import TrackerAndAnalytics
+
+MOVING_AVERAGE_WINDOWS = (7, 28)
+PERCENTILES = (50, 90, 99)
+# Longest range a report may cover (about ten years)
+MAX_REPORT_DAYS = 3660
+
+
+def report_range(start_date: Optional[date], end_date: Optional[date]) -> tuple[date, date]:
+    """Defaults to the last 90 days (UTC) ending today; rejects reversed or oversized ranges."""
+    end_date = end_date or datetime.now(timezone.utc).date()
+    start_date = start_date or end_date - timedelta(days=89)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before or equal to end_date")
+    if (end_date - start_date).days + 1 > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Reports cover at most {MAX_REPORT_DAYS} days")
+    return start_date, end_date
+
+
+def _moving_average(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` days per row; NaN until a full window exists."""
+    sums = np.full(series.shape, np.nan)
+    if series.shape[1] >= window:
+        cumulative = np.cumsum(np.pad(series, ((0, 0), (1, 0))), axis=1)
+        sums[:, window - 1:] = cumulative[:, window:] - cumulative[:, :-window]
+    return sums / window
+
+
+def _change(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """Relative change; NaN where the previous value is zero or missing."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, (current - previous) / previous, np.nan)
+
+
+def _week_over_week(series: np.ndarray) -> np.ndarray:
+    """Trailing 7-day total against the 7 days before it, per day."""
+    weekly = _moving_average(series, 7) * 7
+    previous = np.full(series.shape, np.nan)
+    previous[:, 7:] = weekly[:, :-7]
+    return _change(weekly, previous)
+
+
+def _monthly(series: np.ndarray, days: np.ndarray) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Calendar-month totals per row, with day counts and month-over-month change."""
+    months = days.astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    totals = np.add.reduceat(series, starts, axis=1)
+    lengths = np.diff(np.r_[starts, len(days)])
+    previous = np.full(totals.shape, np.nan)
+    previous[:, 1:] = totals[:, :-1]
+    return [str(month) for month in months[starts]], lengths, totals, _change(totals, previous)
+
+
+def _values(row: np.ndarray, digits: int = 2) -> list[Any]:
+    """JSON list with NaN as null."""
+    return np.where(np.isnan(row), None, np.round(row, digits)).tolist()
+
+
+def traffic_reports(
+    start: date,
+    end: date,
+    series: dict[str, np.ndarray],
+    missing_days: Iterable[int]
+) -> list[dict[str, Any]]:
+    """
+    Trend reports for several tenants at once.
+
+    `series` maps a metric name to a (tenants x days) array of daily counts,
+    gap-filled with zeros, for `start`..`end`. Every statistic is computed
+    over the whole matrix in one vectorised pass. Per-day series are aligned
+    with the days of the range; values that need more history than the
+    range holds are null.
+    """
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    missing_days = list(missing_days)
+    reports = [
+        {"start": str(start), "end": str(end), "days": len(days), "missing_days": missing, "metrics": {}}
+        for missing in missing_days
+    ]
+    for metric, matrix in series.items():
+        matrix = matrix.astype(np.float64)
+        averages = {window: _moving_average(matrix, window) for window in MOVING_AVERAGE_WINDOWS}
+        week_over_week = _week_over_week(matrix)
+        months, lengths, month_totals, month_change = _monthly(matrix, days)
+        percentiles = np.percentile(matrix, PERCENTILES, axis=1) if len(days) else np.zeros((len(PERCENTILES), len(matrix)))
+        totals = matrix.sum(axis=1)
+
+        for row, report in enumerate(reports):
+            report["metrics"][metric] = {
+                "total": int(totals[row]),
+                "daily": matrix[row].astype(np.int64).tolist(),
+                "moving_average": {str(window): _values(average[row]) for window, average in averages.items()},
+                "week_over_week": _values(week_over_week[row], 4),
+                "monthly": [
+                    {"month": month, "days": int(length), "total": int(total), "change": change}
+                    for month, length, total, change in zip(
+                        months, lengths, month_totals[row], _values(month_change[row], 4)
+                    )
+                ],
+                "percentiles": {f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles[:, row])},
+            }
+    return reports
+
+
+def tenant_traffic_reports(tenants: list[TrackerAndAnalytics], start: date, end: date) -> dict[str, dict[str, Any]]:
+    """Visitor trend reports for each tenant in `tenants`, keyed by app name."""
+    if not tenants:
+        return {}
+    loaded = [tenant.get_daily_series(start, end) for tenant in tenants]
+    series = {metric: np.vstack([daily[metric] for daily in loaded]) for metric in ("unique", "non_unique")}
+    reports = traffic_reports(start, end, series, [daily["missing_days"] for daily in loaded])
+    return {tenant.name: {"app_name": tenant.name, **report} for tenant, report in zip(tenants, reports)}
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from pymongo import ASCENDING
+
+from ..config.app_config import ClientTokenConfig, app_config
+from ..config.database import get_db
+
+_indexes_ready = False
+
+
+class RevocationList:
+    """
+    In-memory denylist for offline-verified client tokens.
+
+    Holds revoked token ids (`jti`) and clients whose tokens are all
+    refused: deleted or inactive ones, and those whose tokens issued before
+    a cut-off were revoked. It is reloaded from `revokedTokens` and
+    `appClient` every `DENYLIST_REFRESH_SECONDS`, so checking a token never
+    touches the database. Revocations made by this process apply at once;
+    other workers see them after their next refresh.
+    """
+
+    def __init__(self, settings: ClientTokenConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._jtis: set[str] = set()
+        self._not_before: dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at = 0.0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.rejected = 0
+
+    @property
+    def collection(self):
+        global _indexes_ready
+        collection = get_db()["revokedTokens"]
+        if not _indexes_ready:
+            # Entries are only needed until the tokens they cover expire
+            collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+            _indexes_ready = True
+        return collection
+
+    def is_revoked(self, payload: dict[str, Any]) -> bool:
+        with self._lock:
+            revoked = (
+                payload.get("jti") in self._jtis
+                or payload.get("iat", 0) < self._not_before.get(payload.get("client_id"), 0)
+            )
+        if revoked:
+            self.rejected += 1
+        return revoked
+
+    def revoke_token(self, jti: str, expires_at: datetime) -> None:
+        self.collection.update_one(
+            {"_id": f"jti:{jti}"},
+            {"$set": {"jti": jti, "expires_at": expires_at}},
+            upsert=True
+        )
+        with self._lock:
+            self._jtis.add(jti)
+
+    def revoke_client(self, client_id: str, before: Optional[datetime] = None) -> None:
+        """Refuse every token of `client_id` issued before `before` (all of them when omitted)."""
+        cutoff = before or datetime.max.replace(tzinfo=timezone.utc)
+        self.collection.update_one(
+            {"_id": f"client:{client_id}"},
+            {"$set": {
+                "client_id": client_id,
+                "not_before": cutoff,
+                "expires_at": datetime.now(timezone.utc) + timedelta(days=self.settings.TTL_DAYS),
+            }},
+            upsert=True
+        )
+        with self._lock:
+            self._not_before[client_id] = cutoff.timestamp()
+
+    def refresh(self) -> None:
+        jtis: set[str] = set()
+        not_before: dict[str, float] = {}
+        now = datetime.now(timezone.utc)
+        for doc in self.collection.find({"expires_at": {"$gt": now}}):
+            if doc.get("jti"):
+                jtis.add(doc["jti"])
+            elif doc.get("client_id"):
+                cutoff = doc["not_before"]
+                if cutoff.tzinfo is None:
+                    cutoff = cutoff.replace(tzinfo=timezone.utc)
+                not_before[doc["client_id"]] = cutoff.timestamp()
+        for client in get_db()["appClient"].find({"is_active": False}, {"_id": 1}):
+            not_before[str(client["_id"])] = float("inf")
+        with self._lock:
+            self._jtis, self._not_before = jtis, not_before
+        self.loaded_at = time.time()
+        self.refreshes += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.DENYLIST_REFRESH_SECONDS)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                # Keep serving with the last good list
+                self.refresh_errors += 1
+                print("Revocation list refresh failed:", e)
+
+    async def start(self) -> None:
+        if self._task is None:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                self.refresh_errors += 1
+                print("Initial revocation list load failed, retrying in the background:", e)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            jtis, clients = len(self._jtis), len(self._not_before)
+        return {
+            "revoked_tokens": jtis,
+            "revoked_clients": clients,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "rejected": self.rejected,
+        }
+
+
+revocation_list = RevocationList(app_config.CLIENT_TOKEN)
@@ -0,0 +1,249 @@
+import asyncio
+import base64
+import socket
+import ssl
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from ..config.app_config import SMTPConfig
+
+
+class SMTPError(Exception):
+    """An SMTP reply outside the expected range, or a broken connection (code 0)."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def is_permanent(self) -> bool:
+        return 500 <= self.code < 600
+
+
+class SMTPConnection:
+    """
+    Minimal asyncio SMTP client that keeps one session open across messages.
+
+    When the server advertises PIPELINING (RFC 2920) the whole envelope,
+    MAIL FROM, every RCPT TO and DATA, goes out in one write and the replies
+    are read back together. That is one round trip per message instead of
+    2 + recipients.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = False,
+        starttls: bool = False,
+        timeout: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.starttls = starttls
+        self.timeout = timeout
+        self.extensions: set[str] = set()
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    @classmethod
+    def from_config(cls, config: SMTPConfig) -> "SMTPConnection":
+        return cls(
+            config.HOST,
+            config.PORT,
+            username=config.USERNAME,
+            password=config.PASSWORD,
+            use_tls=config.USE_TLS,
+            starttls=config.STARTTLS,
+            timeout=config.TIMEOUT,
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    @property
+    def pipelining(self) -> bool:
+        return "PIPELINING" in self.extensions
+
+    async def connect(self) -> None:
+        context = ssl.create_default_context() if self.use_tls else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context),
+            timeout=self.timeout,
+        )
+        await self._expect(220)
+        await self._ehlo()
+
+        if self.starttls:
+            await self._command("STARTTLS", 220)
+            await self.writer.start_tls(ssl.create_default_context())
+            await self._ehlo()
+
+        if self.username:
+            credentials = base64.b64encode(f"\0{self.username}\0{self.password}".encode()).decode()
+            await self._command(f"AUTH PLAIN {credentials}", 235)
+
+    async def send_message(self, sender: str, recipients: list[str], data: bytes) -> None:
+        """Send one message; raises SMTPError if it was not accepted."""
+        envelope = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{r}>" for r in recipients] + ["DATA"]
+
+        if self.pipelining:
+            self.writer.write("".join(f"{line}\r\n" for line in envelope).encode())
+            await self._drain()
+            replies = [await self._read_reply() for _ in envelope]
+        else:
+            replies = []
+            for line in envelope:
+                self.writer.write(f"{line}\r\n".encode())
+                await self._drain()
+                replies.append(await self._read_reply())
+                if len(replies) == 1 and replies[0][0] != 250:
+                    break
+
+        mail_reply, rcpt_replies = replies[0], replies[1:len(envelope) - 1]
+        data_reply = replies[-1] if len(replies) == len(envelope) else (503, "DATA not sent")
+        accepted = [reply for reply in rcpt_replies if reply[0] in (250, 251)]
+
+        if mail_reply[0] != 250 or not accepted or data_reply[0] != 354:
+            if data_reply[0] == 354:
+                # The server is waiting for a body; end it empty and discard
+                self.writer.write(b".\r\n")
+                await self._drain()
+                await self._read_reply()
+            await self.reset()
+            code, message = next(
+                (reply for reply in [mail_reply, *rcpt_replies, data_reply] if reply[0] >= 400),
+                data_reply,
+            )
+            raise SMTPError(code, message)
+
+        self.writer.write(self._dot_stuff(data) + b".\r\n")
+        await self._drain()
+        code, message = await self._read_reply()
+        if code != 250:
+            raise SMTPError(code, message)
+
+    async def reset(self) -> None:
+        await self._command("RSET", 250)
+
+    async def noop(self) -> None:
+        await self._command("NOOP", 250)
+
+    async def quit(self) -> None:
+        if not self.is_connected:
+            return
+        try:
+            await self._command("QUIT", 221)
+        except (SMTPError, OSError):
+            pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    @staticmethod
+    def _dot_stuff(data: bytes) -> bytes:
+        data = data.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        if data.startswith(b"."):
+            data = b"." + data
+        return data.replace(b"\r\n.", b"\r\n..")
+
+    async def _ehlo(self) -> None:
+        self.writer.write(f"EHLO {socket.getfqdn()}\r\n".encode())
+        await self._drain()
+        code, message = await self._read_reply()
+        if code != 250:
+            raise SMTPError(code, message)
+        self.extensions = {line.split(" ", 1)[0].upper() for line in message.splitlines()[1:] if line}
+
+    async def _command(self, line: str, expected: int) -> str:
+        self.writer.write(f"{line}\r\n".encode())
+        await self._drain()
+        return await self._expect(expected)
+
+    async def _expect(self, expected: int) -> str:
+        code, message = await self._read_reply()
+        if code != expected:
+            raise SMTPError(code, message)
+        return message
+
+    async def _drain(self) -> None:
+        try:
+            await asyncio.wait_for(self.writer.drain(), timeout=self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.close()
+            raise SMTPError(0, f"Connection lost: {e}")
+
+    async def _read_reply(self) -> tuple[int, str]:
+        lines = []
+        while True:
+            try:
+                raw = await asyncio.wait_for(self.reader.readline(), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.close()
+                raise SMTPError(0, f"Connection lost: {e}")
+            if not raw:
+                self.close()
+                raise SMTPError(0, "Connection closed by server")
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if len(line) < 4 or line[3] != "-":
+                try:
+                    return int(line[:3]), "\n".join(lines)
+                except ValueError:
+                    raise SMTPError(0, f"Malformed reply: {line!r}")
+
+
+class SMTPPool:
+    """A fixed-size pool of persistent SMTP sessions, opened lazily."""
+
+    def __init__(self, config: SMTPConfig, size: Optional[int] = None):
+        self.config = config
+        self.size = size or config.POOL_SIZE
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: list[SMTPConnection] = []
+
+    async def acquire(self) -> SMTPConnection:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+                if connection.is_connected:
+                    return connection
+            connection = SMTPConnection.from_config(self.config)
+            await connection.connect()
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: SMTPConnection) -> None:
+        # Broken sessions are dropped; the next acquire opens a fresh one
+        if connection.is_connected:
+            self._idle.append(connection)
+        self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SMTPConnection]:
+        connection = await self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(connection.quit() for connection in idle))
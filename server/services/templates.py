@@ -0,0 +1,287 @@
+import asyncio
+import binascii
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Optional
+from uuid import uuid4
+
+from jinja2 import StrictUndefined, meta
+from jinja2.sandbox import SandboxedEnvironment
+
+from .engagement import click_url, open_pixel_url
+from .preferences import is_absolute_base_url, make_preference_token, preference_url
+
+# Names a template can use that change per recipient. A template that uses
+# none of them is rendered once per campaign instead of once per message.
+RECIPIENT_VARIABLES = frozenset({
+    "email", "subscriber_id", "campaigns", "recipient", "unsubscribe_url", "unsubscribe_all_url",
+})
+
+# Templates come from API clients, so they run sandboxed
+_environment = SandboxedEnvironment(
+    autoescape=False,
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_html_environment = SandboxedEnvironment(
+    autoescape=True,
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+@lru_cache(maxsize=256)
+def _compile(source: str, html: bool) -> tuple[CodeType, bool]:
+    """Compile a template source once per process; returns (code, per_recipient)."""
+    environment = _html_environment if html else _environment
+    names = meta.find_undeclared_variables(environment.parse(source))
+    return environment.compile(source), bool(names & RECIPIENT_VARIABLES)
+
+
+class _Part:
+    """A compiled template bound to one campaign's context."""
+
+    def __init__(self, source: str, context: dict[str, Any], html: bool = False):
+        environment = _html_environment if html else _environment
+        code, self.per_recipient = _compile(source, html)
+        # Campaign-level values become template globals, bound once
+        self.template = environment.template_class.from_code(environment, code, environment.make_globals(context))
+        self.static = None if self.per_recipient else self.template.render()
+
+    def render(self, variables: dict[str, Any]) -> str:
+        return self.static if self.static is not None else self.template.render(variables)
+
+
+def _with_open_pixel(html: str, pixel_url: str) -> str:
+    tag = f'<img src="{pixel_url}" width="1" height="1" alt="" style="display:none">'
+    head, body_end, tail = html.rpartition("</body>")
+    return f"{head}{tag}{body_end}{tail}" if body_end else html + tag
+
+
+def _qp(text: str) -> bytes:
+    encoded = binascii.b2a_qp(text.encode("utf-8"), istext=True)
+    return encoded.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+class CampaignRenderer:
+    """
+    Renders personalised campaign messages from Jinja2 templates.
+
+    Everything that does not depend on the recipient is done once per
+    campaign: template compilation (cached per process by source), binding of
+    the campaign context, fully static parts, and the fixed headers. Per
+    recipient, only the personalised parts are rendered. The MIME envelope is
+    assembled by hand, which is much cheaper than the email package.
+
+    With `tracking_name` and `campaign_id` set, an open pixel is added to the
+    HTML part and templates can wrap links as `{{ track("https://...") }}`.
+    Both are per campaign, so they do not make a part per-recipient.
+    """
+
+    def __init__(
+        self,
+        sender: str,
+        subject: str,
+        html: str = "",
+        text: str = "",
+        context: Optional[dict[str, Any]] = None,
+        campaign_type: str = "",
+        collection_name: str = "",
+        base_url: str = "",
+        tracking_name: str = "",
+        campaign_id: str = "",
+    ):
+        self.spec = {
+            "sender": sender,
+            "subject": subject,
+            "html": html,
+            "text": text,
+            "context": context or {},
+            "campaign_type": campaign_type,
+            "collection_name": collection_name,
+            "base_url": base_url,
+            "tracking_name": tracking_name,
+            "campaign_id": campaign_id,
+        }
+        self.campaign_type = campaign_type
+        self.collection_name = collection_name
+        self.base_url = base_url
+        # RFC 2369 and 8058 need absolute URLs; without PUBLIC_BASE_URL there are no links
+        self.preference_links = is_absolute_base_url(base_url)
+        self.tracking_name = tracking_name
+        self.campaign_id = campaign_id
+        self._tracked_links: dict[str, str] = {}
+        context = {**(context or {}), "campaign_type": campaign_type, "track": self.track}
+        if html and self.tracking_enabled:
+            html = _with_open_pixel(html, open_pixel_url(tracking_name, campaign_id, base_url))
+        self.subject = _Part(subject, context)
+        self.html = _Part(html, context, html=True) if html else None
+        self.text = _Part(text or "This message requires an HTML capable mail client.", context)
+        self.domain = sender.rpartition("@")[2] or "localhost"
+
+        self._fixed_headers = f"From: {sender}\r\nMIME-Version: 1.0\r\n".encode()
+        self._static_subject = None if self.subject.per_recipient else self._subject_header(self.subject.static)
+
+    @property
+    def tracking_enabled(self) -> bool:
+        return bool(self.tracking_name and self.campaign_id)
+
+    def track(self, url: str) -> str:
+        """Click-tracking URL for `url`; returns `url` unchanged when tracking is off."""
+        if not self.tracking_enabled:
+            return url
+        if url not in self._tracked_links:
+            self._tracked_links[url] = click_url(self.tracking_name, self.campaign_id, url, self.base_url)
+        return self._tracked_links[url]
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any]) -> "CampaignRenderer":
+        return cls(**spec)
+
+    @staticmethod
+    def _subject_header(subject: str) -> bytes:
+        subject = " ".join(subject.split())
+        if not subject.isascii():
+            subject = Header(subject, "utf-8").encode()
+        return f"Subject: {subject}\r\n".encode()
+
+    def recipient_variables(self, recipient: dict) -> dict[str, Any]:
+        subscriber_id = str(recipient.get("subscriber_id") or recipient.get("_id", ""))
+        variables = {
+            "email": recipient["email"],
+            "subscriber_id": subscriber_id,
+            "campaigns": recipient.get("campaigns", {}),
+            "recipient": recipient,
+            "unsubscribe_url": "",
+            "unsubscribe_all_url": "",
+        }
+        if self.collection_name and subscriber_id and self.preference_links:
+            # Signed, expiring links; the handler verifies them without a lookup
+            if self.campaign_type:
+                variables["unsubscribe_url"] = preference_url(
+                    make_preference_token(self.collection_name, subscriber_id, self.campaign_type), self.base_url
+                )
+            variables["unsubscribe_all_url"] = preference_url(
+                make_preference_token(self.collection_name, subscriber_id, "*"), self.base_url
+            )
+        return variables
+
+    def extra_headers(self, recipient: dict, variables: dict[str, Any]) -> bytes:
+        url = variables["unsubscribe_url"] or variables["unsubscribe_all_url"]
+        if not url:
+            return b""
+        return (
+            f"List-Unsubscribe: <{url}>\r\n"
+            "List-Unsubscribe-Post: List-Unsubscribe=One-Click\r\n"
+        ).encode()
+
+    def build(self, recipient: dict) -> bytes:
+        """Render one complete RFC 5322 message for `recipient`."""
+        variables = self.recipient_variables(recipient)
+        message_id = recipient.get("message_id") or make_msgid(domain=self.domain)
+        head = (
+            self._fixed_headers
+            + f"To: {recipient['email']}\r\nMessage-ID: {message_id}\r\nDate: {formatdate(usegmt=True)}\r\n".encode()
+            + (self._static_subject or self._subject_header(self.subject.render(variables)))
+            + self.extra_headers(recipient, variables)
+        )
+
+        text = _qp(self.text.render(variables))
+        if self.html is None:
+            return head + (
+                b"Content-Type: text/plain; charset=utf-8\r\n"
+                b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+            ) + text + b"\r\n"
+
+        boundary = uuid4().hex.encode()
+        return head + (
+            b'Content-Type: multipart/alternative; boundary="' + boundary + b'"\r\n\r\n'
+            b"--" + boundary + b"\r\n"
+            b"Content-Type: text/plain; charset=utf-8\r\n"
+            b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+        ) + text + (
+            b"\r\n--" + boundary + b"\r\n"
+            b"Content-Type: text/html; charset=utf-8\r\n"
+            b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+        ) + _qp(self.html.render(variables)) + b"\r\n--" + boundary + b"--\r\n"
+
+    __call__ = build
+
+    def render_batch(self, recipients: list[dict]) -> list[bytes]:
+        return [self.build(recipient) for recipient in recipients]
+
+
+# Render processes shared by every dispatch of this server process
+_executor: Optional[ProcessPoolExecutor] = None
+# Renderers a render process keeps, most recently used last
+MAX_WORKER_RENDERERS = 8
+_worker_renderers: "OrderedDict[str, CampaignRenderer]" = OrderedDict()
+
+
+def _render_in_worker(key: str, renderer_class: type, spec: dict[str, Any], recipients: list[dict]) -> list[bytes]:
+    renderer = _worker_renderers.get(key)
+    if renderer is None:
+        renderer = _worker_renderers[key] = renderer_class.from_spec(spec)
+        while len(_worker_renderers) > MAX_WORKER_RENDERERS:
+            _worker_renderers.popitem(last=False)
+    else:
+        _worker_renderers.move_to_end(key)
+    return renderer.render_batch(recipients)
+
+
+def _shared_executor(processes: Optional[int]) -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned, not forked: the parent runs the MongoDB client's threads
+        _executor = ProcessPoolExecutor(
+            max_workers=processes or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def close_render_pools() -> None:
+    """Stop the shared render processes without blocking the event loop."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+class RenderPool:
+    """
+    Renders recipient batches for one campaign in worker processes.
+
+    The processes are started once per server process and shared by all
+    campaigns, with `processes` only sizing them on first use. Each process
+    builds a campaign's renderer (and compiles its templates) on the first
+    batch it gets and keeps it for the following ones.
+    """
+
+    def __init__(self, renderer: CampaignRenderer, processes: Optional[int] = None):
+        self.key = uuid4().hex
+        self.renderer_class = type(renderer)
+        self.spec = renderer.spec
+        self.executor = _shared_executor(processes)
+
+    async def render(self, recipients: list[dict]) -> list[bytes]:
+        global _executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self.executor, _render_in_worker, self.key, self.renderer_class, self.spec, recipients
+            )
+        except BrokenProcessPool:
+            # A render process died; the next campaign gets fresh processes
+            if _executor is self.executor:
+                _executor = None
+            raise
@@ -0,0 +1,195 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+from typing import Any, Optional
+
+from ..config.app_config import DomainBudget, ThrottleConfig
+
+# Window for the per-domain send rate shown in metrics
+RATE_WINDOW_SECONDS = 10.0
+
+
+def recipient_domain(email: str) -> str:
+    return email.rpartition("@")[2].strip().lower()
+
+
+class DomainQueue:
+    """Pending recipients of one domain with its token bucket and in-flight count."""
+
+    def __init__(self, domain: str, budget: DomainBudget):
+        self.domain = domain
+        self.budget = budget
+        self.recipients: deque[dict] = deque()
+        self.in_flight = 0
+        self.tokens = float(budget.burst)
+        self.refilled_at = time.monotonic()
+        self.deferred_until = 0.0
+        self.sent = 0
+        self.deferrals = 0
+        self._recent: deque[tuple[float, int]] = deque()
+
+    def refill(self, now: float) -> None:
+        if self.budget.rate:
+            self.tokens = min(float(self.budget.burst), self.tokens + (now - self.refilled_at) * self.budget.rate)
+        self.refilled_at = now
+
+    def batch_size(self, max_size: int) -> int:
+        size = min(max_size, len(self.recipients))
+        return min(size, max(self.budget.burst, 1)) if self.budget.rate else size
+
+    def ready_at(self, now: float, max_size: int) -> float:
+        """When this domain can next take a batch; `now` when it can right away."""
+        if not self.recipients or 0 < self.budget.max_in_flight <= self.in_flight:
+            return float("inf")
+        ready = max(now, self.deferred_until)
+        # Wait for a full batch worth of tokens rather than sending many tiny batches
+        need = self.batch_size(max_size)
+        if self.budget.rate and self.tokens < need:
+            ready = max(ready, now + (need - self.tokens) / self.budget.rate)
+        return ready
+
+    def record_sent(self, count: int, now: float) -> None:
+        self.sent += count
+        self._recent.append((now, count))
+
+    def send_rate(self, now: float) -> float:
+        while self._recent and self._recent[0][0] < now - RATE_WINDOW_SECONDS:
+            self._recent.popleft()
+        return sum(count for _, count in self._recent) / RATE_WINDOW_SECONDS
+
+
+# Schedulers of running dispatches, for /metrics
+_active: "weakref.WeakSet[DomainScheduler]" = weakref.WeakSet()
+
+
+class DomainScheduler:
+    """
+    Hands out single-domain recipient batches within per-domain budgets.
+
+    Recipients are grouped by email domain. A domain gets a batch only while
+    it has fewer than `max_in_flight` batches out and tokens left in its rate
+    bucket, and is paused for `DEFER_SECONDS` after a 4xx reply. Ready domains
+    are served round-robin, so large providers cannot starve the rest and
+    workers keep sending to other domains while one is rate limited.
+
+    Budgets apply per scheduler, i.e. per dispatch.
+    """
+
+    def __init__(self, settings: ThrottleConfig):
+        self.settings = settings
+        self.domains: dict[str, DomainQueue] = {}
+        self._rotation: deque[str] = deque()
+        self._pending = 0
+        self._closed = False
+        self._changed = asyncio.Event()
+        _active.add(self)
+
+    def _queue(self, domain: str) -> DomainQueue:
+        queue = self.domains.get(domain)
+        if queue is None:
+            budget = self.settings.DOMAINS.get(domain, self.settings.DEFAULT)
+            queue = self.domains[domain] = DomainQueue(domain, budget)
+            self._rotation.append(domain)
+        return queue
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    async def _wait(self, timeout: Optional[float] = None) -> None:
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def put(self, recipients: list[dict]) -> None:
+        """Queue recipients, waiting while `MAX_PENDING` are already buffered."""
+        while self._pending >= self.settings.MAX_PENDING:
+            await self._wait()
+        for recipient in recipients:
+            self._queue(recipient_domain(recipient["email"])).recipients.append(recipient)
+        self._pending += len(recipients)
+        self._notify()
+
+    def close(self) -> None:
+        """No more recipients will be put; `next_batch` returns None once drained."""
+        self._closed = True
+        self._notify()
+
+    async def next_batch(self, max_size: int) -> Optional[tuple[str, list[dict]]]:
+        """Wait for the next ready domain and take up to `max_size` of its recipients."""
+        while True:
+            now = time.monotonic()
+            earliest = float("inf")
+            for _ in range(len(self._rotation)):
+                domain = self._rotation[0]
+                self._rotation.rotate(-1)
+                queue = self.domains[domain]
+                queue.refill(now)
+                ready = queue.ready_at(now, max_size)
+                if ready <= now:
+                    size = queue.batch_size(max_size)
+                    if queue.budget.rate:
+                        queue.tokens -= size
+                    batch = [queue.recipients.popleft() for _ in range(size)]
+                    queue.in_flight += 1
+                    self._pending -= size
+                    self._notify()
+                    return domain, batch
+                earliest = min(earliest, ready)
+            if self._closed and not self._pending:
+                _active.discard(self)
+                return None
+            await self._wait(None if earliest == float("inf") else earliest - now)
+
+    def done(self, domain: str, sent: int, deferred: list[tuple[dict, str]]) -> list[tuple[dict, str]]:
+        """
+        Release a batch taken by `next_batch`. Recipients that got a 4xx reply
+        are queued again and the domain is paused; those over `MAX_DEFERRALS`
+        are returned as failed.
+        """
+        queue = self.domains[domain]
+        now = time.monotonic()
+        queue.in_flight -= 1
+        queue.record_sent(sent, now)
+        failed = []
+        if deferred:
+            queue.deferrals += len(deferred)
+            queue.deferred_until = now + self.settings.DEFER_SECONDS
+            for recipient, error in deferred:
+                recipient["_deferrals"] = recipient.get("_deferrals", 0) + 1
+                if recipient["_deferrals"] > self.settings.MAX_DEFERRALS:
+                    failed.append((recipient, error))
+                else:
+                    queue.recipients.append(recipient)
+                    self._pending += 1
+        self._notify()
+        return failed
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        now = time.monotonic()
+        return {
+            domain: {
+                "queued": len(queue.recipients),
+                "in_flight": queue.in_flight,
+                "sent": queue.sent,
+                "deferrals": queue.deferrals,
+                "send_rate": round(queue.send_rate(now), 2),
+                "paused": queue.deferred_until > now,
+            }
+            for domain, queue in self.domains.items()
+        }
+
+
+def throttle_stats() -> dict[str, dict[str, Any]]:
+    """Per-domain queue depth and send rate summed over running dispatches."""
+    totals: dict[str, dict[str, Any]] = {}
+    for scheduler in list(_active):
+        for domain, stats in scheduler.stats().items():
+            total = totals.setdefault(domain, {key: 0 for key in stats})
+            for key, value in stats.items():
+                total[key] = (total[key] or value) if key == "paused" else total[key] + value
+    for total in totals.values():
+        total["send_rate"] = round(total["send_rate"], 2)
+    return totals
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import uuid4
+
+import httpx
+
+from ..collections.webhooks import Webhook
+from ..config.app_config import WebhookConfig, app_config
+from ..utils.network import resolve_public_host
+from ..utils.projection import json_value
+
+# Latency samples kept per endpoint for /metrics
+LATENCY_SAMPLES = 500
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """`X-Webhook-Signature` value: HMAC-SHA256 over "<timestamp>.<body>"."""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"v1={digest}"
+
+
+class EndpointStats:
+    """
+    Delivery counters of one endpoint, published on /metrics under its
+    webhook id. URLs and error details stay out of them; they are logged.
+    """
+
+    def __init__(self):
+        self.events = 0
+        self.delivered = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def to_dict(self) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "events": self.events,
+            "delivered_batches": self.delivered,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failed_batches": self.failed,
+            "last_error": self.last_error,
+            "latency_ms": {
+                "p50": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+                "p95": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000, 2) if latencies else 0.0,
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+        }
+
+
+class WebhookDispatcher:
+    """
+    Delivers subscriber lifecycle events to tenant webhook endpoints.
+
+    `emit` only appends to an in-memory queue under a lock, so it is safe
+    from request handlers on the loop or in the threadpool and never waits
+    on delivery. A background task drains the queue every
+    `BATCH_WAIT_SECONDS` (sooner once `BATCH_SIZE` events are waiting),
+    posts up to `BATCH_SIZE` events per request through one pooled httpx
+    client and retries failures with exponential backoff. Events are lost
+    when the queue is full or the process exits before delivery.
+    """
+
+    def __init__(self, settings: WebhookConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._pending: deque[tuple[str, dict[str, Any]]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._deliveries: set[asyncio.Task] = set()
+        self._endpoints: dict[str, EndpointStats] = {}
+        self.emitted = 0
+        self.dropped = 0
+
+    def emit(self, collection_name: str, event_type: str, data: dict[str, Any]) -> None:
+        if self._loop is None:
+            return
+        event = {
+            "id": uuid4().hex,
+            "type": event_type,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "data": json_value(data),
+        }
+        with self._lock:
+            if len(self._pending) >= self.settings.MAX_QUEUE:
+                self.dropped += 1
+                return
+            self._pending.append((collection_name, event))
+            self.emitted += 1
+            full = len(self._pending) >= self.settings.BATCH_SIZE
+        if full:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> list[tuple[str, dict[str, Any]]]:
+        with self._lock:
+            taken = list(self._pending)
+            self._pending.clear()
+        return taken
+
+    async def _dispatch(self, events: list[tuple[str, dict[str, Any]]]) -> None:
+        by_tenant: dict[str, list[dict[str, Any]]] = {}
+        for collection_name, event in events:
+            by_tenant.setdefault(collection_name, []).append(event)
+
+        endpoints = await asyncio.to_thread(
+            lambda: {name: Webhook(name).endpoints() for name in by_tenant}
+        )
+        size = self.settings.BATCH_SIZE
+        for name, tenant_events in by_tenant.items():
+            for endpoint in endpoints[name]:
+                wanted = [event for event in tenant_events if event["type"] in endpoint["events"]]
+                for start in range(0, len(wanted), size):
+                    task = asyncio.create_task(self._deliver(endpoint, wanted[start:start + size]))
+                    self._deliveries.add(task)
+                    task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, endpoint: dict[str, Any], events: list[dict[str, Any]]) -> None:
+        stats = self._endpoints.setdefault(str(endpoint["_id"]), EndpointStats())
+        stats.events += len(events)
+        body = json.dumps({"events": events}).encode()
+        delivery_id = uuid4().hex
+        url = httpx.URL(endpoint["url"])
+
+        for attempt in range(1, self.settings.MAX_ATTEMPTS + 1):
+            timestamp = str(int(time.time()))
+            headers = {
+                "Host": url.netloc.decode("ascii"),
+                "Content-Type": "application/json",
+                "X-Webhook-Id": delivery_id,
+                "X-Webhook-Timestamp": timestamp,
+                "X-Webhook-Signature": sign_payload(endpoint["secret"], timestamp, body),
+            }
+            started = time.perf_counter()
+            try:
+                async with self._slots:
+                    target, extensions = await self._target(url)
+                    response = await self._client.post(target, content=body, headers=headers, extensions=extensions)
+                error = None if response.is_success else f"HTTP {response.status_code}"
+                summary = error
+                retryable = response.status_code >= 500 or response.status_code in (408, 429)
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+                summary = type(e).__name__
+                retryable = True
+            except ValueError as e:
+                # The host now resolves to a non-public address
+                error = str(e)
+                summary = "Non-public address"
+                retryable = False
+            stats.latencies.append(time.perf_counter() - started)
+            stats.attempts += 1
+
+            if error is None:
+                stats.delivered += 1
+                return
+            stats.last_error = summary
+            if not retryable or attempt == self.settings.MAX_ATTEMPTS:
+                stats.failed += 1
+                print(f"Webhook delivery to {endpoint['url']} failed after {attempt} attempt(s):", error)
+                return
+            stats.retries += 1
+            delay = min(self.settings.RETRY_BASE_SECONDS * 2 ** (attempt - 1), self.settings.RETRY_MAX_SECONDS)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def _target(self, url: httpx.URL) -> tuple[httpx.URL, dict[str, Any]]:
+        """
+        `url` with its host replaced by a checked public address of it, so the
+        name cannot be re-pointed at an internal address after the check.
+        TLS still verifies the certificate against the original host name.
+        """
+        if self.settings.ALLOW_PRIVATE_NETWORKS:
+            return url, {}
+        port = url.port or (443 if url.scheme == "https" else 80)
+        address = await asyncio.to_thread(resolve_public_host, url.host, port)
+        extensions = {"sni_hostname": url.host} if url.scheme == "https" else {}
+        return url.copy_with(host=address), extensions
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.settings.BATCH_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            events = self._take()
+            if not events:
+                continue
+            try:
+                await self._dispatch(events)
+            except Exception as e:
+                print("Webhook dispatch failed, dropping", len(events), "event(s):", e)
+
+    def start(self) -> None:
+        if self._task is None and self.settings.ENABLED:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.settings.MAX_CONNECTIONS)
+            self._client = httpx.AsyncClient(
+                timeout=self.settings.TIMEOUT,
+                limits=httpx.Limits(max_connections=self.settings.MAX_CONNECTIONS),
+                headers={"User-Agent": f"{app_config.app_name}-webhooks/{app_config.version}"},
+            )
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Send what is queued (one attempt's worth of waiting at most), then close the client."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        self._loop = None
+        events = self._take()
+        try:
+            if events:
+                await self._dispatch(events)
+            if self._deliveries:
+                await asyncio.wait(set(self._deliveries), timeout=self.settings.TIMEOUT)
+        finally:
+            for task in list(self._deliveries):
+                task.cancel()
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            queued = len(self._pending)
+        return {
+            "queued": queued,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "in_flight": len(self._deliveries),
+            "endpoints": {key: stats.to_dict() for key, stats in self._endpoints.items()},
+        }
+
+
+webhook_dispatcher = WebhookDispatcher(app_config.WEBHOOK)
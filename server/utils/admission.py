@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+from typing import Any, Optional
+
+import anyio.to_thread
+
+from ..config.app_config import AdmissionBudget, app_config
+
+
+class Budget:
+    """Concurrency budget for one class of routes, with a bounded wait queue."""
+
+    def __init__(self, name: str, settings: AdmissionBudget):
+        self.name = name
+        self.max_in_flight = settings.max_in_flight
+        self.max_queue = settings.max_queue
+        self.max_queue_wait = settings.max_queue_wait_ms / 1000
+        self._slots = asyncio.Semaphore(settings.max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+
+    async def acquire(self) -> bool:
+        """Wait for a slot; False means the request should be shed."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            return False
+
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.max_queue_wait)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - started
+        self.total_wait += waited
+        self.max_wait_seen = max(self.max_wait_seen, waited)
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "avg_queue_wait_ms": round(self.total_wait / self.admitted * 1000, 3) if self.admitted else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_seen * 1000, 3),
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load with 503 + Retry-After once a route class is saturated.
+
+    A request waits for a slot in its budget for at most `max_queue_wait_ms`;
+    if the queue is already `max_queue` deep it is rejected straight away.
+    The slot is held until the response body has been sent, so streaming
+    exports count for their whole duration.
+    """
+
+    # Longest prefix first: exports are a sub-tree of /subscribers
+    ROUTE_CLASSES = (
+        ("/subscribers/campaigns/export", "export"),
+        ("/subscribers", "subscriber"),
+        ("/tracking", "tracking"),
+    )
+
+    def __init__(self, app):
+        self.app = app
+        settings = app_config.ADMISSION
+        self.enabled = settings.ENABLED
+        self.retry_after = str(settings.RETRY_AFTER_SECONDS)
+        self.budgets = {
+            "tracking": Budget("tracking", settings.TRACKING),
+            "subscriber": Budget("subscriber", settings.SUBSCRIBER),
+            "export": Budget("export", settings.EXPORT),
+        }
+        admission_budgets.update(self.budgets)
+
+    def classify(self, path: str) -> Optional[Budget]:
+        for prefix, name in self.ROUTE_CLASSES:
+            if path.startswith(prefix):
+                return self.budgets[name]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+
+        budget = self.classify(scope["path"])
+        if budget is None:
+            return await self.app(scope, receive, send)
+
+        if not await budget.acquire():
+            return await self._reject(send, budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
+
+    async def _reject(self, send, budget: Budget) -> None:
+        body = json.dumps({"detail": f"Server busy ({budget.name}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", self.retry_after.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Budgets of the running middleware, for the metrics endpoint
+admission_budgets: dict[str, Budget] = {}
+
+
+def configure_threadpool() -> None:
+    """Size the anyio pool that runs sync (`def`) routes and dependencies."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = app_config.THREADPOOL_SIZE
+
+
+def threadpool_stats() -> dict[str, Any]:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        "size": stats.total_tokens,
+        "busy": stats.borrowed_tokens,
+        "queued": stats.tasks_waiting,
+    }
+
+
+def admission_stats() -> dict[str, Any]:
+    return {name: budget.stats() for name, budget in admission_budgets.items()}
@@ -0,0 +1,99 @@
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from ..config.app_config import AnalyticsCacheConfig, app_config
+
+
+class _Call:
+    """One in-flight load that concurrent callers of the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlightCache:
+    """
+    Short-TTL cache with request coalescing.
+
+    Concurrent `get` calls for a key that is being loaded wait for that one
+    load instead of issuing their own; the result is then served from memory
+    for `TTL_SECONDS`. Errors are handed to every waiter and never cached.
+    Sync route handlers run in the threadpool, so this is thread-based.
+    """
+
+    def __init__(self, settings: AnalyticsCacheConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        self._calls: dict[Hashable, _Call] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        if not self.settings.ENABLED:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    if len(self._entries) >= self.settings.MAX_ENTRIES:
+                        self._prune(time.monotonic())
+                    self._entries[key] = (time.monotonic() + self.settings.TTL_SECONDS, call.value)
+            call.done.set()
+        return call.value
+
+    def _prune(self, now: float) -> None:
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+        # Still full of live entries: drop the ones closest to expiry
+        excess = len(self._entries) - self.settings.MAX_ENTRIES + 1
+        if excess > 0:
+            for key in sorted(self._entries, key=lambda k: self._entries[k][0])[:excess]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._calls),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / requests, 3) if requests else 0.0,
+            "coalesce_ratio": round(self.coalesced / requests, 3) if requests else 0.0,
+        }
+
+
+analytics_cache = SingleFlightCache(app_config.ANALYTICS_CACHE)
@@ -0,0 +1,42 @@
+import inspect
+import traceback
+from typing import Any, Callable
+
+# Hooks run by the app lifespan. Background loops register on startup;
+# anything that buffers writes in memory registers a flush on shutdown.
+_startup_hooks: list[Callable[[], Any]] = []
+_shutdown_hooks: list[Callable[[], Any]] = []
+
+
+def on_startup(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Register a sync or async callable to run when the app starts."""
+    if fn not in _startup_hooks:
+        _startup_hooks.append(fn)
+    return fn
+
+
+def on_shutdown(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Register a sync or async callable to run when the app stops."""
+    if fn not in _shutdown_hooks:
+        _shutdown_hooks.append(fn)
+    return fn
+
+
+async def _run(hooks: list[Callable[[], Any]]) -> None:
+    for fn in hooks:
+        try:
+            result = fn()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"Lifecycle hook {getattr(fn, '__qualname__', fn)} failed:", e)
+            traceback.print_exc()
+
+
+async def run_startup_hooks() -> None:
+    await _run(_startup_hooks)
+
+
+async def run_shutdown_hooks() -> None:
+    # Reverse order so later hooks (which may depend on earlier ones) stop first
+    await _run(list(reversed(_shutdown_hooks)))
@@ -0,0 +1,19 @@
+from typing import Any, Callable
+
+# name -> zero-argument callable returning a JSON-serialisable snapshot
+_providers: dict[str, Callable[[], Any]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Any]) -> None:
+    """Expose `provider()` under `name` on the /metrics endpoint."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict[str, Any]:
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,32 @@
+import ipaddress
+import socket
+
+
+def is_public_address(address: str) -> bool:
+    """Whether `address` is a globally routable unicast IP address."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def resolve_public_host(host: str, port: int) -> str:
+    """
+    Resolve `host` (blocking) and return one of its addresses.
+
+    Raises ValueError when the host does not resolve or any of its
+    addresses is loopback, private, link-local or otherwise not public, so
+    a name cannot pass by also resolving to an internal address.
+    """
+    host = host.strip("[]")
+    if host.lower() == "localhost" or host.lower().endswith(".localhost"):
+        raise ValueError(f"{host} is not a public host")
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"{host} does not resolve: {e}")
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    blocked = [address for address in addresses if not is_public_address(address)]
+    if blocked or not addresses:
+        raise ValueError(f"{host} resolves to a non-public address")
+    return addresses[0]
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Any, Collection
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+
+def parse_fields(fields: str, allowed: Collection[str]) -> list[str]:
+    """
+    Split a `fields=email,campaigns.marketing` query value into known field
+    names; `id` is accepted as an alias of `_id`. Unknown names are a 400.
+    """
+    names = []
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        name = "_id" if name == "id" else name
+        if name not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field '{name}'. Allowed: {', '.join(allowed)}"
+            )
+        if name not in names:
+            names.append(name)
+    if not names:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fields must name at least one field")
+    return names
+
+
+def json_value(value: Any) -> Any:
+    """The JSON form FastAPI would give `value`, without going through a model."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: json_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [json_value(item) for item in value]
+    return value
+
+
+def sparse_page(total: int, skip: int, limit: int, items: list[dict]) -> dict[str, Any]:
+    """A `PaginatedResponse`-shaped dict around already reduced items."""
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit,
+        "items": items,
+    }
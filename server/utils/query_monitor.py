@@ -0,0 +1,331 @@
+import asyncio
+import json
+import queue
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from bson.regex import Regex
+from pymongo import MongoClient, monitoring
+
+from ..config.app_config import SlowQueryConfig, app_config
+
+# Commands whose plans can be explained
+WATCHED_COMMANDS = {"find", "count", "distinct", "aggregate", "update", "delete", "findAndModify"}
+# Driver and session fields that explain does not accept or does not need
+_DRIVER_FIELDS = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction",
+    "apiVersion", "apiStrict", "apiDeprecationErrors", "readConcern", "writeConcern", "ordered",
+    "batchSize", "singleBatch", "comment",
+}
+# Plan stages reported as problems
+PROBLEM_STAGES = {"COLLSCAN": "COLLSCAN", "SORT": "IN_MEMORY_SORT"}
+SUMMARY_TOP = 10
+
+
+def _shape(value: Any, key: str = "") -> Any:
+    """`value` with every literal replaced by "?"; operators and field names kept."""
+    if isinstance(value, dict):
+        return {k: _shape(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if key in ("$or", "$and", "$nor"):
+            return [_shape(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def _regex_hints(value: Any, hints: set[str]) -> None:
+    """Collect filter features that defeat or weaken index use."""
+    if isinstance(value, dict):
+        if "$or" in value:
+            hints.add("$or")
+        pattern = value.get("$regex")
+        if pattern is not None:
+            options = value.get("$options", "")
+            if isinstance(pattern, (Regex, re.Pattern)):
+                options += "i" if pattern.flags & re.IGNORECASE else ""
+                pattern = pattern.pattern
+            if not str(pattern).startswith("^"):
+                hints.add("unanchored_regex")
+            if "i" in options:
+                hints.add("case_insensitive_regex")
+        for item in value.values():
+            _regex_hints(item, hints)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _regex_hints(item, hints)
+    elif isinstance(value, (Regex, re.Pattern)):
+        _regex_hints({"$regex": value}, hints)
+
+
+def _query_parts(name: str, command: dict[str, Any]) -> tuple[Any, Any]:
+    """The filter and sort of a watched command."""
+    if name == "find":
+        return command.get("filter", {}), command.get("sort")
+    if name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {}), command.get("sort")
+    if name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        return statements[0].get("q", {}), None
+    pipeline = command.get("pipeline", [])
+    match = next((stage["$match"] for stage in pipeline if "$match" in stage), {})
+    sort = next((stage["$sort"] for stage in pipeline if "$sort" in stage), None)
+    return match, sort
+
+
+def _explainable(name: str, command: dict[str, Any]) -> dict[str, Any]:
+    explainable = {key: value for key, value in command.items() if key not in _DRIVER_FIELDS}
+    # Bulk writes send many statements; the first stands in for the batch
+    for field in ("updates", "deletes"):
+        if field in explainable:
+            explainable[field] = explainable[field][:1]
+    return explainable
+
+
+def _plan_summary(explain: dict[str, Any]) -> dict[str, Any]:
+    """Stages and indexes of every winning plan in an explain result."""
+    stages: list[str] = []
+    indexes: list[str] = []
+
+    def walk(node: Any, in_plan: bool) -> None:
+        if isinstance(node, dict):
+            if in_plan and isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+                if node.get("indexName"):
+                    indexes.append(node["indexName"])
+            for key, value in node.items():
+                if key != "rejectedPlans":
+                    walk(value, in_plan or key == "winningPlan")
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_plan)
+
+    walk(explain, False)
+    return {
+        "stages": list(dict.fromkeys(stages)),
+        "indexes": list(dict.fromkeys(indexes)),
+        "flags": [flag for stage, flag in PROBLEM_STAGES.items() if stage in stages],
+    }
+
+
+class QueryShape:
+    def __init__(self, namespace: str, command: str, shape: dict[str, Any], hints: set[str]):
+        self.namespace = namespace
+        self.command = command
+        self.shape = shape
+        self.hints = sorted(hints)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.first_seen = datetime.now(timezone.utc)
+        self.last_seen = self.first_seen
+        self.plan: Optional[dict[str, Any]] = None
+        self.explain: Optional[dict[str, Any]] = None
+        self.explain_error: Optional[str] = None
+        self.unreported = 0
+
+    @property
+    def flags(self) -> list[str]:
+        return (self.plan or {}).get("flags", [])
+
+    def to_dict(self, include_explain: bool = False) -> dict[str, Any]:
+        data = {
+            "namespace": self.namespace,
+            "command": self.command,
+            "shape": self.shape,
+            "hints": self.hints,
+            "flags": self.flags,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "first_seen": self.first_seen.isoformat(),
+            "last_seen": self.last_seen.isoformat(),
+            "plan": self.plan,
+            "explain_error": self.explain_error,
+        }
+        if include_explain:
+            data["explain"] = self.explain
+        return data
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    """
+    Records database commands slower than `THRESHOLD_MS`, grouped by shape.
+
+    Registered on the MongoClient, so every query from the collection
+    classes passes through it; the embedded SQLite backend is not covered.
+    Literal values are dropped from the recorded filters. The first time a
+    shape is seen, the command is explained (queryPlanner verbosity) on a
+    background thread using a separate client, so request threads never
+    wait on it. Winning plans with a collection scan or an in-memory sort
+    are flagged. Filters with unanchored or case-insensitive regexes and
+    `$or` are hinted even before their explain completes.
+    """
+
+    def __init__(self, settings: SlowQueryConfig):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[Any, int], tuple[str, str, dict[str, Any]]] = {}
+        self._shapes: "OrderedDict[str, QueryShape]" = OrderedDict()
+        self._explain_queue: "queue.Queue[tuple[QueryShape, str, dict[str, Any]]]" = queue.Queue(settings.EXPLAIN_QUEUE)
+        self._explain_thread: Optional[threading.Thread] = None
+        self._explain_client: Optional[MongoClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self.commands = 0
+        self.slow = 0
+        self.explained = 0
+        self.explain_skipped = 0
+
+    # CommandListener -----------------------------------------------------
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in WATCHED_COMMANDS:
+            self._inflight[(event.connection_id, event.request_id)] = (event.database_name, event.command_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        started = self._inflight.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        self.commands += 1
+        elapsed_ms = event.duration_micros / 1000
+        if elapsed_ms >= self.settings.THRESHOLD_MS:
+            self._record(*started, elapsed_ms)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._inflight.pop((event.connection_id, event.request_id), None)
+
+    # recording -----------------------------------------------------------
+
+    def _record(self, database: str, name: str, command: dict[str, Any], elapsed_ms: float) -> None:
+        filters, sort = _query_parts(name, command)
+        shape = {"filter": _shape(filters)}
+        if sort:
+            shape["sort"] = _shape(sort)
+        namespace = f"{database}.{command.get(name)}"
+        key = f"{namespace}:{name}:{json.dumps(shape, sort_keys=True)}"
+        with self._lock:
+            self.slow += 1
+            entry = self._shapes.get(key)
+            new = entry is None
+            if new:
+                hints: set[str] = set()
+                _regex_hints(filters, hints)
+                entry = self._shapes[key] = QueryShape(namespace, name, shape, hints)
+                while len(self._shapes) > self.settings.MAX_SHAPES:
+                    self._shapes.popitem(last=False)
+            else:
+                self._shapes.move_to_end(key)
+            entry.count += 1
+            entry.unreported += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_seen = datetime.now(timezone.utc)
+        if new and self.settings.EXPLAIN:
+            self._queue_explain(entry, database, _explainable(name, command))
+
+    def _queue_explain(self, entry: QueryShape, database: str, command: dict[str, Any]) -> None:
+        try:
+            self._explain_queue.put_nowait((entry, database, command))
+        except queue.Full:
+            self.explain_skipped += 1
+            entry.explain_error = "explain queue full"
+            return
+        if self._explain_thread is None:
+            with self._lock:
+                if self._explain_thread is None:
+                    self._explain_thread = threading.Thread(target=self._explain_loop, name="slow-query-explain", daemon=True)
+                    self._explain_thread.start()
+
+    def _explain_loop(self) -> None:
+        while True:
+            entry, database, command = self._explain_queue.get()
+            try:
+                if self._explain_client is None:
+                    # Outside the app's strict server API, which excludes explain, and unmonitored
+                    self._explain_client = MongoClient(app_config.DB.URL, serverSelectionTimeoutMS=5000)
+                explain = self._explain_client[database].command({"explain": command, "verbosity": "queryPlanner"})
+                explain.pop("$clusterTime", None)
+                explain.pop("operationTime", None)
+                entry.explain = explain
+                entry.plan = _plan_summary(explain)
+                entry.explain_error = None
+                self.explained += 1
+            except Exception as e:
+                entry.explain_error = f"{type(e).__name__}: {e}"
+
+    # reporting -----------------------------------------------------------
+
+    def report(self, limit: int = 50, flagged_only: bool = False, include_explain: bool = False) -> dict[str, Any]:
+        with self._lock:
+            shapes = list(self._shapes.values())
+        if flagged_only:
+            shapes = [shape for shape in shapes if shape.flags or shape.hints]
+        shapes.sort(key=lambda shape: shape.total_ms, reverse=True)
+        return {
+            "threshold_ms": self.settings.THRESHOLD_MS,
+            **self.stats(),
+            "results": [shape.to_dict(include_explain) for shape in shapes[:limit]],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self.commands = self.slow = self.explained = self.explain_skipped = 0
+
+    def summary(self) -> Optional[str]:
+        """Slow commands seen since the previous summary, worst shapes first; None if there were none."""
+        with self._lock:
+            recent = [(shape, shape.unreported) for shape in self._shapes.values() if shape.unreported]
+            for shape, _ in recent:
+                shape.unreported = 0
+        if not recent:
+            return None
+        recent.sort(key=lambda item: item[0].max_ms * item[1], reverse=True)
+        lines = [
+            f"Slow queries: {sum(count for _, count in recent)} command(s) over "
+            f"{self.settings.THRESHOLD_MS:g} ms in {len(recent)} shape(s)"
+        ]
+        for shape, count in recent[:SUMMARY_TOP]:
+            problems = ",".join(shape.flags + shape.hints) or "-"
+            lines.append(
+                f"  {shape.namespace} {shape.command} x{count} max {shape.max_ms:.0f} ms "
+                f"[{problems}] {json.dumps(shape.shape, sort_keys=True)}"
+            )
+        return "\n".join(lines)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.settings.LOG_INTERVAL_SECONDS)
+            summary = self.summary()
+            if summary:
+                print(summary)
+
+    def start(self) -> None:
+        if self._task is None and self.settings.ENABLED and self.settings.LOG_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._explain_client is not None:
+            self._explain_client.close()
+            self._explain_client = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            shapes = list(self._shapes.values())
+        return {
+            "commands": self.commands,
+            "slow_commands": self.slow,
+            "shapes": len(shapes),
+            "flagged_shapes": sum(1 for shape in shapes if shape.flags),
+            "explained": self.explained,
+            "explain_skipped": self.explain_skipped,
+        }
+
+
+slow_query_monitor = SlowQueryMonitor(app_config.SLOW_QUERY)
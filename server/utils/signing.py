@@ -0,0 +1,86 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from functools import lru_cache
+from typing import Any
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from ..config.app_config import app_config
+
+
+class TokenError(ValueError):
+    """The token is malformed, tampered with or expired."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _key(purpose: str) -> bytes:
+    # One key per purpose, so a token minted for one use is useless for another
+    return hashlib.sha256(f"{app_config.JWT_SECRET_KEY}:{purpose}".encode()).digest()
+
+
+def sign_token(payload: dict[str, Any], purpose: str, expires_in: int) -> str:
+    """Compact `<payload>.<hmac>` token carrying `payload` and an expiry."""
+    body = _b64encode(json.dumps({**payload, "exp": int(time.time()) + expires_in}, separators=(",", ":")).encode())
+    signature = hmac.new(_key(purpose), body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64encode(signature)}"
+
+
+def verify_token(token: str, purpose: str) -> dict[str, Any]:
+    """Check signature and expiry with no storage lookup; returns the payload."""
+    try:
+        body, signature = token.split(".")
+        expected = hmac.new(_key(purpose), body.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            raise TokenError("Invalid signature")
+        payload = json.loads(_b64decode(body))
+    except TokenError:
+        raise
+    except (ValueError, TypeError) as e:
+        raise TokenError(f"Malformed token: {e}")
+    if payload.get("exp", 0) < time.time():
+        raise TokenError("Token has expired")
+    return payload
+
+
+@lru_cache(maxsize=1)
+def client_signing_key() -> Ed25519PrivateKey:
+    """Ed25519 key for app-client tokens: CLIENT_TOKEN_PRIVATE_KEY, or derived from JWT_SECRET_KEY."""
+    pem = app_config.CLIENT_TOKEN.PRIVATE_KEY
+    if pem:
+        return serialization.load_pem_private_key(pem.encode(), password=None)
+    seed = hashlib.sha256(f"{app_config.JWT_SECRET_KEY}:client-token-ed25519".encode()).digest()
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+@lru_cache(maxsize=1)
+def client_verify_key() -> Ed25519PublicKey:
+    return client_signing_key().public_key()
+
+
+def client_public_key_pem() -> str:
+    return client_verify_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+
+def encode_client_token(payload: dict[str, Any]) -> str:
+    return jwt.encode(
+        payload, client_signing_key(), algorithm="EdDSA", headers={"kid": app_config.CLIENT_TOKEN.KEY_ID}
+    )
+
+
+def decode_client_token(token: str) -> dict[str, Any]:
+    """Verify an EdDSA client token with the public key alone; raises jwt.InvalidTokenError."""
+    return jwt.decode(token, client_verify_key(), algorithms=["EdDSA"], options={"require": ["exp", "jti"]})